@@ -9,10 +9,11 @@ class CRUDRepositoryInterface(ABC):
         - url_request
         - url_posts
         - url_patch
-        - url_delete"""
+        - url_delete
+        - url_batch"""
 
     @abstractmethod
-    def url_request(self, url):
+    def url_request(self, url, headers={}):
         """Método abstracto encargado de hacer el requerimiento al sitio de sharepoint."""
         pass
 
@@ -31,3 +32,7 @@ class CRUDRepositoryInterface(ABC):
         """Método abstracto encargado de hacer el delete al sitio de sharepoint."""
         pass
 
+    @abstractmethod
+    def url_batch(self, url, requests_batch, max_attempts=1):
+        """Método abstracto encargado de enviar varias solicitudes en un solo lote al sitio de sharepoint."""
+        pass
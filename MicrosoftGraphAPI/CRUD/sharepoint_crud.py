@@ -1,7 +1,13 @@
 from .base_repository import CRUDRepositoryInterface
 import requests
+import json
 from typing import Any
+import re
+from time import time, sleep
+from collections import deque
 from ..decorators import *
+from ..helpers.helpers import segundos_reintento
+from ..monitoring.metrics import RequestMetrics
 
 class CRUDSharepointGraphAPI(CRUDRepositoryInterface):
     """
@@ -20,6 +26,9 @@ class CRUDSharepointGraphAPI(CRUDRepositoryInterface):
     Nota: Esta versión contiene específicamente el manejo de las listas de sharepoint de un sitio de sharepoint, está basado en la API disponibilizada por Microsoft llamada Microsoft Graph. Este paquete contiene toda la lógica interna para que el manejo de las listas sea fácil y amigable, sin embargo si se desea saber como funciona el paquete o se quire usar alguna de las funcionalidades de este paqeute por separado por favor refrenciarse en el siguiente link: https://learn.microsoft.com/es-es/graph/api/list-list?view=graph-rest-1.0&tabs=http
     """
 
+    # Status codes of the requests of a $batch worth sending again: timeouts, throttling and server errors
+    BATCH_RETRY_STATUS = (408, 429, 500, 502, 503, 504)
+
     def __init__(self, token: str ="") -> None:
         
         if isinstance(token, str):
@@ -27,6 +36,8 @@ class CRUDSharepointGraphAPI(CRUDRepositoryInterface):
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json"
             }
+            self._latencias = {}
+            self._metrics = RequestMetrics()
         else:
             raise TypeError("Error de tipo en el parámetro de entrada. El token debe ser tipo string")
         
@@ -48,13 +59,14 @@ class CRUDSharepointGraphAPI(CRUDRepositoryInterface):
         }
     
     @check_type_args
-    def url_request(self, url: str) -> dict[str: Any]:
+    def url_request(self, url: str, headers: dict[str, str] = {}) -> dict[str: Any]:
 
         """
         Método encargado de hacer las solicitudes al sitio de sharepoint. Este método ya toma el token establecido en la clase o en el método de set_token. El content Type de la solicitud es JSON.
         
         Args:
             url (str): Este sería la url con la solicitud puntual que se desea enviar al sitio de sharepoint.
+            headers (dict[str, str], optional): Encabezados adicionales de la solicitud, por ejemplo Prefer para filtrar por columnas sin índice. Por defecto ninguno.
                 
             
         Raises: 
@@ -71,14 +83,18 @@ class CRUDSharepointGraphAPI(CRUDRepositoryInterface):
         Nota: Esta versión contiene específicamente el manejo de las listas de sharepoint de un sitio de sharepoint, está basado en la API disponibilizada por Microsoft llamada Microsoft Graph. Este paquete contiene toda la lógica interna para que el manejo de las listas sea fácil y amigable, sin embargo si se desea saber como funciona el paquete o se quire usar alguna de las funcionalidades de este paqeute por separado por favor refrenciarse en el siguiente link: https://learn.microsoft.com/es-es/graph/api/list-list?view=graph-rest-1.0&tabs=http
         """
 
-        self._response = requests.get(url, headers= self._headers)
+        start_time = time()
+        self._response = requests.get(url, headers= {**self._headers, **headers})
+        segundos = time() - start_time
 
         self.status_request = self._response.status_code
 
         if self.status_request ==200:
             data = self._response.json()
+            self._registrar_solicitud("GET", url, start_time, segundos, rows=len(data.get("value", [])))
         else:
-            raise requests.HTTPError(f"Error {self.status_request}: {self._response.text}")
+            self._registrar_solicitud("GET", url, start_time, segundos)
+            raise requests.HTTPError(f"Error {self.status_request}: {self._response.text}", response=self._response)
         
         return data
         
@@ -112,13 +128,15 @@ class CRUDSharepointGraphAPI(CRUDRepositoryInterface):
         Nota: Esta versión contiene específicamente el manejo de las listas de sharepoint de un sitio de sharepoint, está basado en la API disponibilizada por Microsoft llamada Microsoft Graph. Este paquete contiene toda la lógica interna para que el manejo de las listas sea fácil y amigable, sin embargo si se desea saber como funciona el paquete o se quire usar alguna de las funcionalidades de este paqeute por separado por favor refrenciarse en el siguiente link: https://learn.microsoft.com/es-es/graph/api/list-list?view=graph-rest-1.0&tabs=http
         """
 
+        start_time = time()
         self._response = requests.post(url, headers= self._headers, data= data)
         self.status_request = self._response.status_code
+        self._registrar_solicitud("POST", url, start_time, time() - start_time, data)
 
         if self.status_request in (200, 201):
             return 200
         else:
-            raise requests.HTTPError(f"Error {self.status_request}: {self._response.text}")
+            raise requests.HTTPError(f"Error {self.status_request}: {self._response.text}", response=self._response)
     
     @check_type_args
     def url_patch(self, url: str, data: str) -> int:
@@ -149,14 +167,15 @@ class CRUDSharepointGraphAPI(CRUDRepositoryInterface):
         Nota: Esta versión contiene específicamente el manejo de las listas de sharepoint de un sitio de sharepoint, está basado en la API disponibilizada por Microsoft llamada Microsoft Graph. Este paquete contiene toda la lógica interna para que el manejo de las listas sea fácil y amigable, sin embargo si se desea saber como funciona el paquete o se quire usar alguna de las funcionalidades de este paqeute por separado por favor refrenciarse en el siguiente link: https://learn.microsoft.com/es-es/graph/api/list-list?view=graph-rest-1.0&tabs=http
         """
  
+        start_time = time()
         self._response = requests.patch(url, headers=self._headers, data= data)
-
         self.status_request = self._response.status_code
+        self._registrar_solicitud("PATCH", url, start_time, time() - start_time, data)
 
         if self.status_request in (200, 204):
             return 200
         else:
-            raise requests.HTTPError(f"Error {self.status_request}: {self._response.text}")
+            raise requests.HTTPError(f"Error {self.status_request}: {self._response.text}", response=self._response)
 
     @check_type_args    
     def url_delete(self, url: str) -> int:
@@ -180,15 +199,209 @@ class CRUDSharepointGraphAPI(CRUDRepositoryInterface):
         Nota: Esta versión contiene específicamente el manejo de las listas de sharepoint de un sitio de sharepoint, está basado en la API disponibilizada por Microsoft llamada Microsoft Graph. Este paquete contiene toda la lógica interna para que el manejo de las listas sea fácil y amigable, sin embargo si se desea saber como funciona el paquete o se quire usar alguna de las funcionalidades de este paqeute por separado por favor refrenciarse en el siguiente link: https://learn.microsoft.com/es-es/graph/api/list-list?view=graph-rest-1.0&tabs=http
         """
 
+        start_time = time()
         self._response = requests.delete(url, headers= self._headers)
         self.status_request = self._response.status_code
+        self._registrar_solicitud("DELETE", url, start_time, time() - start_time)
 
         if self.status_request in (200, 204):
             return 200
         else: 
-            raise requests.HTTPError(f"Error {self.status_request}: {self._response.text}")
-        
+            raise requests.HTTPError(f"Error {self.status_request}: {self._response.text}", response=self._response)
 
-        
+    @check_type_args
+    def url_batch(self, url: str, requests_batch: list[dict[str, Any]], max_attempts: int = 1) -> list[dict[str, Any]]:
+        """
+        Método encargado de enviar varias solicitudes en una sola con el endpoint $batch de Microsoft Graph (máximo 20 por lote). Este método ya toma el token establecido en la clase o en el método de set_token.
+        Con max_attempts mayor a 1 las solicitudes del lote que fallan con un error transitorio (BATCH_RETRY_STATUS, por ejemplo throttling) se vuelven a enviar solas en otro lote,
+        esperando lo que indique su encabezado Retry-After (o el doble de la espera anterior), hasta max_attempts intentos.
+
+        Args:
+            url (str): URL del endpoint $batch, por ejemplo "https://graph.microsoft.com/v1.0/$batch".
+            requests_batch (list[dict[str, Any]]): Solicitudes del lote, cada una con id, method, url (relativa a la versión, por ejemplo "/sites/{site-id}/lists/{list-id}/items") y opcionalmente headers y body.
+            max_attempts (int, optional): Intentos máximos de cada solicitud del lote, contando el primero. Por defecto 1.
+
+        Raises:
+            HTTPError: Se levanta si falla el lote o alguna de sus solicitudes después de los intentos, con el código de error y el mensaje de error correspondiente.
+                Si falla una solicitud del lote, la respuesta del error es la de esa solicitud (su código de estado, encabezados y cuerpo) y no la del lote.
+
+        Returns:
+            list[dict[str, Any]]: Respuesta de cada solicitud (id, status, headers y body), en el mismo orden de requests_batch.
+
+        Ejemplo:
+            crud = CRUDSharepointGraphAPI(token = "token_autenticación")
+            respuestas = crud.url_batch(url = "https://graph.microsoft.com/v1.0/$batch",
+                                        requests_batch = [{"id": "1", "method": "GET", "url": "/sites/{site-id}/lists/{list-id}/items?$filter=fields/Title eq 'a'"}], max_attempts = 4)
+            print(respuestas[0]["body"]["value"])
+
+        Nota: Esta versión contiene específicamente el manejo de las listas de sharepoint de un sitio de sharepoint, está basado en la API disponibilizada por Microsoft llamada Microsoft Graph. Este paquete contiene toda la lógica interna para que el manejo de las listas sea fácil y amigable, sin embargo si se desea saber como funciona el paquete o se quire usar alguna de las funcionalidades de este paqeute por separado por favor refrenciarse en el siguiente link: https://learn.microsoft.com/es-es/graph/api/list-list?view=graph-rest-1.0&tabs=http
+        """
+
+        respuestas = {}
+        pendientes = requests_batch
+        for intento in range(1, max_attempts + 1):
+            for respuesta in self._enviar_lote(url, pendientes):
+                respuestas[respuesta["id"]] = respuesta
+
+            fallidas = [respuestas[solicitud["id"]] for solicitud in pendientes if respuestas[solicitud["id"]].get("status", 500) >= 400]
+            if not fallidas:
+                break
+            if intento == max_attempts or any(respuesta.get("status", 500) not in self.BATCH_RETRY_STATUS for respuesta in fallidas):
+                raise self._error_lote(fallidas[0])
+
+            # Throttled requests say how long to wait; the longest wait covers all of them
+            espera = max(segundos_reintento(respuesta.get("headers"), intento) for respuesta in fallidas)
+            collection_id = self._clasificar_solicitud("GET", pendientes[0]["url"])[1]
+            self._metrics.record_retry("batch", collection_id, len(fallidas))
+            self._metrics.record_throttle_wait("batch", collection_id, espera)
+            sleep(espera)
+            ids = {respuesta["id"] for respuesta in fallidas}
+            pendientes = [solicitud for solicitud in pendientes if solicitud["id"] in ids]
+
+        return [respuestas[solicitud["id"]] for solicitud in requests_batch]
+
+    def _enviar_lote(self, url: str, requests_batch: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Envía un lote $batch y devuelve las respuestas de sus solicitudes en el orden de requests_batch, sin revisar su código de estado. Levanta HTTPError si falla el lote."""
+
+        data = json.dumps({"requests": requests_batch})
+        start_time = time()
+        self._response = requests.post(url, headers= self._headers, data= data)
+        segundos = time() - start_time
+        self.status_request = self._response.status_code
+
+        if self.status_request != 200:
+            self._registrar_solicitud("POST", url, start_time, segundos, data)
+            raise requests.HTTPError(f"Error {self.status_request}: {self._response.text}", response=self._response)
+
+        # The responses of a batch come in any order
+        orden = {solicitud["id"]: num for num, solicitud in enumerate(requests_batch)}
+        respuestas = sorted(self._response.json().get("responses", []), key=lambda respuesta: orden.get(respuesta["id"], len(orden)))
+        self._registrar_solicitud("POST", url, start_time, segundos, data, rows=sum(len((respuesta.get("body") or {}).get("value", [])) for respuesta in respuestas))
+
+        return respuestas
+
+    @staticmethod
+    def _error_lote(respuesta: dict[str, Any]) -> requests.HTTPError:
+        """Crea el HTTPError de una solicitud del lote que falló, con una respuesta que lleva el código de estado, los encabezados y el cuerpo de esa solicitud."""
+
+        response = requests.Response()
+        response.status_code = respuesta.get("status", 500)
+        response.headers.update(respuesta.get("headers") or {})
+        response._content = json.dumps(respuesta.get("body")).encode()
+
+        return requests.HTTPError(f"Error {response.status_code} in the batch request {respuesta['id']}: {json.dumps(respuesta.get('body'))}", response=response)
+
+    def get_last_response(self) -> dict[str: Any]:
+        """
+        Método encargado de devolver el cuerpo JSON de la última solicitud realizada. Útil cuando se necesita la información que devuelve el sitio de sharepoint después de un post, por ejemplo el id de una lista o de un elemento recién creado.
+
+        Returns:
+            dict[str: Any]: Se devuelve la respuesta en formato JSON de la última solicitud. Si no se ha hecho ninguna solicitud o la respuesta no tiene cuerpo se devuelve un diccionario vacío.
+
+        Ejemplo:
+            crud = CRUDSharepointGraphAPI(token = "token_autenticación")
+            crud.url_posts(url= "https://graph.microsoft.com/v1.0/sites/{site-id}/lists", data = data_str_lista)
+            nueva_lista = crud.get_last_response()
+            print(nueva_lista["id"])
+        """
+
+        response = getattr(self, "_response", None)
+
+        if response is None or not response.content:
+            return {}
+
+        return response.json()
+
+    def get_metrics(self) -> RequestMetrics:
+        """
+        Método encargado de devolver las métricas de las solicitudes hechas con este CRUD: latencia, código de estado, bytes, filas, reintentos y esperas, por operación y colección.
+
+        Returns:
+            RequestMetrics: Métricas de las solicitudes, ver `RequestMetrics.snapshot`, `RequestMetrics.to_json` y `RequestMetrics.to_prometheus`.
+
+        Ejemplo:
+            crud = CRUDSharepointGraphAPI(token = "token_autenticación")
+            crud.url_request(url= url_con_la_soliciud_al_sharepoint)
+            print(crud.get_metrics().to_prometheus())
+        """
+
+        return self._metrics
+
+    def _registrar_solicitud(self, method: str, url: str, start_time: float, segundos: float, data: str = "", rows: int | None = None) -> None:
+        """Registra la latencia de la solicitud y sus métricas (operación, colección, código de estado, bytes y filas). Solo cuentan filas las páginas de items y las escrituras exitosas (una fila cada una)."""
+
+        self._registrar_latencia(method, segundos)
+
+        operation, collection_id = self._clasificar_solicitud(method, url)
+        if operation in ("list", "columns"):
+            rows = 0
+        elif rows is None:
+            rows = 1 if self.status_request in (200, 201, 204) and operation in ("post", "patch", "delete") else 0
+
+        self._metrics.record(operation=operation, collection_id=collection_id, status=self.status_request, seconds=segundos,
+                             bytes_in=len(self._response.content or b""), bytes_out=len(data.encode()), rows=rows, started=start_time)
+
+    @staticmethod
+    def _clasificar_solicitud(method: str, url: str) -> tuple[str, str]:
+        """Obtiene la operación (list, columns, items-page, post, patch, delete o batch) y el id de la colección a partir del método y la URL de la solicitud."""
+
+        path = url.split("?")[0].rstrip("/")
+        match = re.search(r"/lists/([^/]+)", path)
+        collection_id = match.group(1) if match else ""
+
+        if path.endswith("/$batch"):
+            return "batch", collection_id
+        if path.endswith("/columns"):
+            return "columns", collection_id
+        if "/items" in path:
+            return {"GET": "items-page", "POST": "post", "PATCH": "patch", "DELETE": "delete"}[method], collection_id
+
+        return "list", collection_id
+
+    def _registrar_latencia(self, method: str, segundos: float) -> None:
+        """Guarda la latencia de las últimas solicitudes por método HTTP para poder calcular el promedio y los percentiles."""
+        self._latencias.setdefault(method, deque(maxlen=1000)).append(segundos)
+
+    def get_latency(self, method: str) -> float | None:
+        """
+        Método encargado de devolver la latencia promedio en segundos de las últimas 1000 solicitudes hechas con un método HTTP (GET, POST, PATCH o DELETE).
+
+        Args:
+            method (str): Método HTTP del que se quiere conocer la latencia promedio.
+
+        Returns:
+            float | None: Latencia promedio en segundos. Si no se ha hecho ninguna solicitud con ese método se devuelve None.
+
+        Ejemplo:
+            crud = CRUDSharepointGraphAPI(token = "token_autenticación")
+            crud.url_request(url= url_con_la_soliciud_al_sharepoint)
+            print(crud.get_latency("GET"))
+        """
+
+        latencias = self._latencias.get(method.upper())
+
+        return sum(latencias) / len(latencias) if latencias else None
+
+    def get_latency_percentile(self, method: str, percentile: float) -> float | None:
+        """
+        Método encargado de devolver un percentil de la latencia en segundos de las últimas 1000 solicitudes hechas con un método HTTP.
+
+        Args:
+            method (str): Método HTTP del que se quiere conocer la latencia (GET, POST, PATCH o DELETE).
+            percentile (float): Percentil entre 0 y 100.
+
+        Returns:
+            float | None: Latencia en segundos del percentil pedido. Si no se ha hecho ninguna solicitud con ese método se devuelve None.
+
+        Ejemplo:
+            crud = CRUDSharepointGraphAPI(token = "token_autenticación")
+            crud.url_request(url= url_con_la_soliciud_al_sharepoint)
+            print(crud.get_latency_percentile("GET", 95))
+        """
+
+        latencias = sorted(self._latencias.get(method.upper(), []))
 
+        if not latencias:
+            return None
 
+        return latencias[min(len(latencias) - 1, int(len(latencias) * percentile / 100))]
@@ -4,11 +4,14 @@ Incluye la clase `ListSharepoint` que implementa la interfaz `HandlerSharepointS
 Clase:
     - ListSharepoint: Implementa la interfaz `HandlerSharepointStrategyInterface` para manejar listas de SharePoint.
     - HandlerSharepointStrategyInterface: Interfaz para definir las operaciones que deben implementarse para manejar listas de SharePoint.
+    - ItemQuery: Consulta de `get_items` (filtros, orden, límite y columnas) que se resuelve en SharePoint.
 
 Autor: Juan Esteban Rivera Pérez
 """
 from .list_strategy import ListSharepoint
 from .strategy_interface import HandlerSharepointStrategyInterface
+from .item_query import ItemQuery
 
 __all__ = ["ListSharepoint", 
-           "HandlerSharepointStrategyInterface"]
\ No newline at end of file
+           "HandlerSharepointStrategyInterface",
+           "ItemQuery"]
\ No newline at end of file
@@ -0,0 +1,176 @@
+import pandas as pd
+from datetime import date, datetime, timezone
+from urllib.parse import quote
+from typing import List, Any
+from ..decorators import *
+
+
+class ItemQuery:
+    """
+    Clase encargada de armar la consulta de `get_items` para que SharePoint filtre, ordene, limite y proyecte los elementos, y así solo viajen las filas y columnas que se necesitan.
+    Las columnas se nombran como se ven en SharePoint (name de `get_fields`); `get_items` las traduce a su name_id y escribe cada valor según el tipo de dato de la columna.
+    Los filtros se unen con AND y cada método devuelve la misma consulta para poder encadenarlos.
+
+    Operadores de `where`:
+        - eq, ne, gt, ge, lt, le: Comparaciones con un valor.
+        - startswith: Texto que empieza por el valor.
+        - in: Igual a alguno de los valores de una lista (se envía como varios eq unidos con OR).
+
+    Ejemplo:
+        query = ItemQuery().where("Ciudad", "eq", "Medellín").where("Edad", "ge", 30).order_by("Edad", descending=True).top(100).select(["Documento", "Edad"])
+        items = list_sharepoint.get_items(colection_name="Clientes", query=query)
+        print(items)
+    """
+
+    OPERATORS = ("eq", "ne", "gt", "ge", "lt", "le", "startswith", "in")
+
+    def __init__(self) -> None:
+        self.filters = []
+        self.ordering = []
+        self.limit = 0
+        self.columns = None
+
+    def __repr__(self) -> str:
+        return f"ItemQuery(filters={self.filters}, ordering={self.ordering}, limit={self.limit}, columns={self.columns})"
+
+    @check_type_args
+    def where(self, column: str, operator: str, value: str | int | float | bool | date | list) -> "ItemQuery":
+        """
+        Agrega un filtro sobre una columna.
+
+        Args:
+            column (str): Nombre de la columna como se ve en SharePoint.
+            operator (str): Uno de OPERATORS.
+            value (str | int | float | bool | date | list): Valor a comparar. Con "in" es la lista de valores.
+
+        Raises:
+            ValueError: Si el operador no es válido, si "in" no recibe una lista con valores o si otro operador recibe una lista.
+        """
+
+        if operator not in self.OPERATORS:
+            raise ValueError(f"The operator must be one of {self.OPERATORS}, got '{operator}'.")
+        if (operator == "in") != isinstance(value, list) or (operator == "in" and not value):
+            raise ValueError("The operator 'in' takes a non empty list of values and the other operators a single value.")
+
+        self.filters.append((column, operator, value))
+        return self
+
+    @check_type_args
+    def order_by(self, column: str, descending: bool = False) -> "ItemQuery":
+        """Ordena los elementos por la columna. Se puede llamar varias veces para ordenar por varias columnas."""
+
+        self.ordering.append((column, descending))
+        return self
+
+    @check_type_args
+    def top(self, limit: int) -> "ItemQuery":
+        """
+        Trae como máximo limit elementos.
+
+        Raises:
+            ValueError: Si limit no es mayor que 0.
+        """
+
+        if limit < 1:
+            raise ValueError("The limit of the query must be greater than 0.")
+
+        self.limit = limit
+        return self
+
+    @check_type_args
+    def select(self, columns: List[str]) -> "ItemQuery":
+        """Trae solo estas columnas (además de index_sharepoint). Con una lista vacía solo se trae el id de cada elemento."""
+
+        self.columns = list(columns)
+        return self
+
+    @check_type_args
+    def columns_for(self, data_columns: pd.DataFrame) -> pd.DataFrame:
+        """
+        Método encargado de devolver las filas de `get_fields` de las columnas a traer, en el orden de `select`.
+
+        Raises:
+            ValueError: Si alguna columna de la consulta no existe en la lista.
+        """
+
+        self._revisar_columnas(data_columns)
+        if self.columns is None:
+            return data_columns
+
+        return data_columns.set_index('name').loc[self.columns].reset_index()[data_columns.columns]
+
+    @check_type_args
+    def non_indexed(self, data_columns: pd.DataFrame) -> List[str]:
+        """Devuelve las columnas de los filtros y del orden que no tienen índice en la lista. SharePoint puede rechazar esas consultas en listas de más de 5000 elementos."""
+
+        indexed = dict(zip(data_columns['name'], data_columns['indexed'])) if 'indexed' in data_columns.columns else {}
+        used = dict.fromkeys([column for column, _, _ in self.filters] + [column for column, _ in self.ordering])
+
+        return [column for column in used if not indexed.get(column, False)]
+
+    @check_type_args
+    def to_params(self, data_columns: pd.DataFrame) -> str:
+        """
+        Método encargado de escribir los parámetros $filter, $orderby y $top de la URL de los elementos, ya codificados.
+
+        Args:
+            data_columns (pd.DataFrame): Columnas de la lista, como las devuelve `get_fields`.
+
+        Returns:
+            str: Parámetros para agregar a la URL, cada uno empezando por "&". Vacío si la consulta no filtra, ordena ni limita.
+
+        Raises:
+            ValueError: Si alguna columna no existe en la lista o si un valor no corresponde con el tipo de dato de su columna.
+        """
+
+        self._revisar_columnas(data_columns)
+        columnas = data_columns.set_index('name')
+        params = ""
+
+        if self.filters:
+            condiciones = []
+            for column, operator, value in self.filters:
+                campo = f"fields/{columnas.at[column, 'name_id']}"
+                data_type = columnas.at[column, 'dataType']
+                if operator == "in":
+                    condiciones.append("(" + " or ".join(f"{campo} eq {self._literal(item, data_type, column)}" for item in value) + ")")
+                elif operator == "startswith":
+                    condiciones.append(f"startswith({campo}, {self._literal(value, data_type, column)})")
+                else:
+                    condiciones.append(f"{campo} {operator} {self._literal(value, data_type, column)}")
+            params += "&$filter=" + quote(" and ".join(condiciones))
+
+        if self.ordering:
+            params += "&$orderby=" + quote(",".join(f"fields/{columnas.at[column, 'name_id']}" + (" desc" if descending else "") for column, descending in self.ordering))
+
+        if self.limit:
+            params += f"&$top={self.limit}"
+
+        return params
+
+    def _revisar_columnas(self, data_columns: pd.DataFrame) -> None:
+        """Revisa que las columnas de los filtros, del orden y de select existan en la lista."""
+
+        used = [column for column, _, _ in self.filters] + [column for column, _ in self.ordering] + (self.columns or [])
+        missing = [column for column in dict.fromkeys(used) if column not in set(data_columns['name'])]
+        if missing:
+            raise ValueError(f"The following columns of the query were not found in the collection: {missing}")
+
+    @staticmethod
+    def _literal(value: Any, data_type: str, column: str) -> str:
+        """Escribe el valor en el formato de OData según el tipo de dato de la columna: números sin comillas, fechas en ISO 8601 (UTC) y texto entre comillas."""
+
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if data_type.startswith("num"):
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"The column '{column}' is a number, got {value!r}.")
+            return str(int(number)) if number.is_integer() else repr(number)
+        if isinstance(value, datetime):
+            value = (value.astimezone(timezone.utc) if value.tzinfo else value).strftime("%Y-%m-%dT%H:%M:%SZ")
+        elif isinstance(value, date):
+            value = value.strftime("%Y-%m-%dT00:00:00Z")
+
+        return "'" + str(value).replace("'", "''") + "'"
@@ -1,11 +1,34 @@
 from .strategy_interface import HandlerSharepointStrategyInterface
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Callable
 from ..auth import AuthContext, MSGraphAuth
 from ..decorators import *
 import pandas as pd
+import numpy as np
 from ..CRUD.sharepoint_crud import CRUDSharepointGraphAPI
 from ..helpers.helpers import *
-from time import time
+from ..sync.planner import SyncPlanner
+from ..sync.plan import SyncPlan
+from ..sync.rate_limit import SharedRateLimiter
+from ..sync.journal import SyncJournal
+from ..sync.diff_interface import DiffBackendInterface
+from ..sync.diff_backends import PandasDiffBackend, SortedMergeDiffBackend, SQLiteDiffBackend
+from ..sync.sorted_merge import SortedMergeDiff
+from ..sync.error_policy import ErrorPolicy
+from ..sync.key_index import KeyIndex
+from .item_query import ItemQuery
+from ..monitoring.progress_interface import ProgressReporterInterface
+from ..monitoring.progress import TerminalProgressReporter
+from ..monitoring.tracing import Tracer, traced
+from ..monitoring.memory import MemoryTracker, MB
+from math import ceil
+from functools import partial
+from urllib.parse import quote
+from itertools import chain
+from time import time, sleep
+import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 class ListSharepoint(HandlerSharepointStrategyInterface):
 
@@ -16,9 +39,11 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
     Args:
         crud (CRUDSharepointGraphAPI): Objeto que maneja las operaciones CRUD en SharePoint.
         auth (AuthContext): Contexto de autenticación que contiene el token y la URL de SharePoint.
+        progress (ProgressReporterInterface, optional): Reporte del avance de create_item, delete_items y update_collection. Por defecto una barra en la terminal (`TerminalProgressReporter`), para no mostrar nada usar `NullProgressReporter`.
+        tracer (Tracer, optional): Tracer que mide las fases de cada operación. Por defecto un `Tracer` con `MemoryTracker` que guarda en memoria los árboles de tiempos (y la memoria de cada fase) de las últimas operaciones, ver `get_timing_tree` y `get_memory_report`.
         
     Raises:
-        TypeError: Si los argumentos crud o auth no son del tipo esperado.
+        TypeError: Si los argumentos crud, auth, progress o tracer no son del tipo esperado.
     
     Ejemplo:
         crud = CRUDSharepointGraphAPI()
@@ -31,26 +56,62 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
         - get_collections: Obtiene el nombre y el id de las listas del sitio.
         - get_collection_id: Obtiene el id de una colección (lista) a partir de su nombre.
         - get_fields: Obtiene el nombre, displayName y id de las columnas de una lista.
-        - get_items: Obtiene la información de una lista específica.
+        - get_items: Obtiene la información de una lista específica, o solo las filas y columnas de una consulta (`ItemQuery`) que filtra, ordena y limita en SharePoint.
         - create_item: Crea elementos en una lista específica.
         - delete_items: Elimina elementos de una lista específica. Se elimina por id o se eliminan todos los elementos de la lista.
+        - get_collection_definition: Obtiene la definición (columnas, nombre y configuración) de una lista.
+        - create_collection: Crea una lista a partir de su definición. Devuelve el id de la lista.
+        - truncate_collection: Vacía una lista recreándola con el mismo esquema y el mismo nombre. Devuelve el id de la nueva lista.
+        - clear_collection_cache: Limpia la caché de ids de las colecciones.
         - update_collection: Actualiza una colección (lista) específica.
+        - upsert_items: Inserta o actualiza pocos registros buscando su id en el índice de llaves, sin descargar la lista.
+        - plan_update: Calcula el plan de actualización de una colección y lo guarda en disco.
+        - apply_plan: Aplica un plan guardado en disco, o una porción del plan.
         - quitar_duplicados_en_collections: Elimina duplicados en las colecciones de SharePoint.    
+        - set_progress_reporter: Cambia el reporte de avance de las operaciones largas.
+        - get_timing_tree: Obtiene el árbol de tiempos por fase de una operación (descarga, diff, construcción de payloads, escritura...).
+        - set_tracer: Cambia el tracer que mide las fases de las operaciones.
+        - set_diff_backend: Registra un motor de comparación para escogerlo por nombre en update_collection y plan_update.
+        - set_key_index: Activa el índice en disco que lleva la PK de cada registro al id del elemento, para upsert_items.
+        - get_memory_report: Obtiene el pico de memoria de cada fase de una operación.
+        - get_metrics: Obtiene las métricas de las solicitudes hechas a SharePoint (latencia, códigos de estado, bytes, filas por segundo) en diccionario, JSON o texto de Prometheus.
     """
 
-    def __init__(self, crud: CRUDSharepointGraphAPI, auth: AuthContext) -> None:
+    # Largest block of rows whose payloads are built together while the requests go out
+    PAYLOAD_CHUNK_SIZE = 1000
+    # Partitions of the in-memory diff before falling back to the sorted merge on disk
+    MAX_DIFF_PARTITIONS = 64
+    # Rows of both sides below which the diff does not start processes
+    PARALLEL_DIFF_MIN_ROWS = 50000
+    # Keys joined with OR in each $filter of the lookup by keys, and requests per $batch (the Graph limit is 20)
+    LOOKUP_KEYS_PER_FILTER = 15
+    BATCH_MAX_REQUESTS = 20
+    # Attempts of each lookup of a $batch, so a throttled one is sent again after its Retry-After
+    LOOKUP_BATCH_ATTEMPTS = 5
+    # Lets SharePoint filter by columns that are not indexed
+    PREFER_NON_INDEXED = {"Prefer": "HonorNonIndexedQueriesWarningMayFailRandomly"}
+    # Attempts to create a list, waiting between them while throttled or while the deleted list with the same name goes away
+    CREATE_COLLECTION_ATTEMPTS = 5
+
+    def __init__(self, crud: CRUDSharepointGraphAPI, auth: AuthContext, progress: ProgressReporterInterface | None = None, tracer: Tracer | None = None) -> None:
 
         # Create list of argument's types and the error lists.        
-        expected_types = [CRUDSharepointGraphAPI, AuthContext]
+        expected_types = [CRUDSharepointGraphAPI, AuthContext, ProgressReporterInterface, Tracer]
         error_types = []
 
         # Check if the arguments are of the expected types.
         if not isinstance(crud, CRUDSharepointGraphAPI):
-            error_types(f"- The argument crud should be of type {excepted_types[0].__name__}, but got {type(crud).__name__}")
+            error_types.append(f"- The argument crud should be of type {expected_types[0].__name__}, but got {type(crud).__name__}")
 
         if not isinstance(auth, AuthContext):
             error_types.append(f"- The argument auth should be of type {expected_types[1].__name__}, but got {type(auth).__name__}")
 
+        if progress is not None and not isinstance(progress, ProgressReporterInterface):
+            error_types.append(f"- The argument progress should be of type {expected_types[2].__name__}, but got {type(progress).__name__}")
+
+        if tracer is not None and not isinstance(tracer, Tracer):
+            error_types.append(f"- The argument tracer should be of type {expected_types[3].__name__}, but got {type(tracer).__name__}")
+
         
         # If there are type errors, raise a TypeError with the error messages. Else initialize the attributes.
         if error_types:
@@ -58,11 +119,191 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
         else:
             self._crud = crud
             self._auth = auth
+            self._collection_ids = {}
+            self._progress = progress or TerminalProgressReporter()
+            self._tracer = tracer or Tracer(memory=MemoryTracker())
+            self._diff_backends = {backend.name: backend for backend in (PandasDiffBackend(), SortedMergeDiffBackend(), SQLiteDiffBackend())}
+            self._key_index_dir = ""
+            self._key_indexes = {}
+
+    ##############################################################################
+    ### Cambiar el reporte de avance
+    ##############################################################################
+    def set_progress_reporter(self, progress: ProgressReporterInterface) -> None:
+        """
+        Método para cambiar el reporte de avance de create_item, delete_items y update_collection.
+
+        Args:
+            progress (ProgressReporterInterface): Reporte de avance, por ejemplo `NullProgressReporter`, `LogProgressReporter`, `TerminalProgressReporter` o `CallbackProgressReporter`.
+
+        Raises:
+            TypeError: Si progress no implementa `ProgressReporterInterface`.
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            list_sharepoint.set_progress_reporter(LogProgressReporter(interval=60.0))
+        """
+
+        if not isinstance(progress, ProgressReporterInterface):
+            raise TypeError(f"The argument progress should be of type ProgressReporterInterface, but got {type(progress).__name__}")
+
+        self._progress = progress
+
+    ##############################################################################
+    ### Cambiar el tracer y obtener el árbol de tiempos de una operación
+    ##############################################################################
+    def set_tracer(self, tracer: Tracer) -> None:
+        """
+        Método para cambiar el tracer que mide las fases de las operaciones, por ejemplo para enviar los tramos a OpenTelemetry.
+
+        Args:
+            tracer (Tracer): Tracer con sus exportadores (`SpanRecorder`, `OpenTelemetryExporter`).
+
+        Raises:
+            TypeError: Si tracer no es un `Tracer`.
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            list_sharepoint.set_tracer(Tracer(exporters=[SpanRecorder(), OpenTelemetryExporter()]))
+        """
+
+        if not isinstance(tracer, Tracer):
+            raise TypeError(f"The argument tracer should be of type Tracer, but got {type(tracer).__name__}")
+
+        self._tracer = tracer
+
+    ##############################################################################
+    ### Registrar un motor de comparación
+    ##############################################################################
+    def set_diff_backend(self, backend: DiffBackendInterface) -> None:
+        """
+        Método para registrar un motor de comparación, o reemplazar el que tiene el mismo nombre. Los motores registrados se escogen por nombre con el argumento diff_backend de `update_collection` y `plan_update`.
+        Por defecto están registrados "pandas" (`PandasDiffBackend`), "sorted_merge" (`SortedMergeDiffBackend`) y "sqlite" (`SQLiteDiffBackend`).
+
+        Args:
+            backend (DiffBackendInterface): Motor de comparación.
+
+        Raises:
+            TypeError: Si backend no implementa `DiffBackendInterface`.
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            list_sharepoint.set_diff_backend(SQLiteDiffBackend(path="/data/diff.sqlite"))
+            list_sharepoint.update_collection(data=data, pk=["Documento"], collection_name="My Collection", diff_backend="sqlite")
+        """
+
+        if not isinstance(backend, DiffBackendInterface):
+            raise TypeError(f"The argument backend should implement DiffBackendInterface, but got {type(backend).__name__}")
+
+        self._diff_backends[backend.name] = backend
+
+    @check_type_args
+    def set_key_index(self, directory: str) -> None:
+        """
+        Método para activar el índice de llaves de las colecciones (ver `KeyIndex`): un archivo por colección en directory que lleva la PK de cada registro al id del elemento en SharePoint.
+        Con el índice activo `update_collection` lo reconstruye con cada descarga completa y lo mantiene con sus escrituras, `delete_items` quita los elementos eliminados y `upsert_items` lo usa para no descargar la lista.
+
+        Args:
+            directory (str): Carpeta donde se guardan los índices. Si es vacío se desactiva el índice.
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            list_sharepoint.set_key_index("/data/key_index")
+            list_sharepoint.update_collection(data=data, pk=["Documento"], collection_name="My Collection")  # Construye el índice
+            list_sharepoint.upsert_items(data=cambios, pk=["Documento"], collection_name="My Collection")
+        """
+
+        for key_index in self._key_indexes.values():
+            key_index.close()
+        self._key_indexes = {}
+        self._key_index_dir = directory
+
+    @check_type_args
+    def get_timing_tree(self, run: int = -1) -> Dict[str, Any]:
+        """
+        Método para obtener el árbol de tiempos de una operación terminada (update_collection, get_items, create_item...). Cada nodo es una fase con name, start (segundos desde el inicio de la operación), seconds, attributes y children.
+        En update_collection las fases son: get_collection_id, journal, metadata, download (con get_items adentro), dedupe, pk_normalization, diff, planning, payload, truncate_collection y apply. Así se ve si una ejecución lenta fue la red, el diff o la construcción de los JSON.
+
+        Args:
+            run (int, optional): Posición de la operación entre las últimas guardadas, como en una lista. Por defecto -1, la última.
+
+        Returns:
+            Dict[str, Any]: Árbol de tiempos de la operación. Vacío si el tracer no tiene un `SpanRecorder` o si no hay operaciones guardadas.
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            list_sharepoint.update_collection(data=data, pk=["Documento"], collection_name="My Collection")
+            tree = list_sharepoint.get_timing_tree()
+            print([(fase["name"], fase["seconds"]) for fase in tree["children"]])
+        """
+
+        recorder = self._tracer.recorder
+
+        return recorder.timing_tree(run) if recorder is not None else {}
+
+    @check_type_args
+    def get_memory_report(self, run: int = -1) -> Dict[str, Dict[str, float]]:
+        """
+        Método para obtener la memoria residente del proceso en cada fase de una operación terminada: al inicio, el pico y al final de la fase, en MB.
+        Requiere que el tracer mida la memoria (`Tracer(memory=MemoryTracker())`, el tracer por defecto lo hace).
+
+        Args:
+            run (int, optional): Posición de la operación entre las últimas guardadas, como en una lista. Por defecto -1, la última.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Memoria de cada fase (rss_start_mb, rss_peak_mb, rss_end_mb, rss_delta_mb) con el camino de la fase como llave, por ejemplo "update_collection/diff".
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            list_sharepoint.update_collection(data=data, pk=["Documento"], collection_name="My Collection")
+            for fase, memoria in list_sharepoint.get_memory_report().items():
+                print(fase, memoria["rss_peak_mb"])
+        """
+
+        return MemoryTracker.report(self.get_timing_tree(run))
+
+    ##############################################################################
+    ### Obtener las métricas de las solicitudes
+    ##############################################################################
+    @check_type_args
+    def get_metrics(self, format: str = "dict") -> Dict[str, Any] | str:
+        """
+        Método para obtener las métricas de las solicitudes hechas a SharePoint con el CRUD de esta clase: latencia (histograma, p50 y p95), códigos de estado, bytes enviados y recibidos, filas, reintentos y esperas por el límite de solicitudes.
+        Las métricas se separan por operación (list, columns, items-page, post, patch, delete, batch) y por colección, y se resumen por colección con las filas por segundo.
+
+        Args:
+            format (str, optional): "dict" para el resumen en un diccionario, "json" para el resumen en JSON o "prometheus" para el formato de texto de Prometheus. Por defecto "dict".
+
+        Returns:
+            Dict[str, Any] | str: Resumen de las métricas, ver `RequestMetrics.snapshot`.
+
+        Raises:
+            ValueError: Si el formato no es "dict", "json" ni "prometheus".
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            list_sharepoint.update_collection(data=data, pk=["Documento"], collection_name="My Collection")
+            print(list_sharepoint.get_metrics()["collections"])
+            open("/var/lib/node_exporter/msgraph.prom", "w").write(list_sharepoint.get_metrics(format="prometheus"))
+        """
+
+        metrics = self._crud.get_metrics()
+
+        if format == "dict":
+            return metrics.snapshot()
+        elif format == "json":
+            return metrics.to_json()
+        elif format == "prometheus":
+            return metrics.to_prometheus()
+        else:
+            raise ValueError(f"The format '{format}' is not available. Use 'dict', 'json' or 'prometheus'.")
 
     ##############################################################################
     ### Obtener el nombre y el id de las listas del sitio
     ##############################################################################
     @check_type_args
+    @traced("get_collections")
+    @profiled
     def get_collections(self) -> pd.DataFrame:
 
         """
@@ -99,6 +340,8 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
     ### Obtengo el id de una coleccion (lista) a partir de su nombre
     ##############################################################################    
     @check_type_args
+    @traced("get_collection_id")
+    @profiled
     def get_collection_id(self, collection_name: str = "") -> str:
         """
         Método para obtener el id de una colección (lista) a partir de su nombre.
@@ -119,23 +362,53 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
             print(collection_id)
         """
 
+        # Return the cached id if the collection was already resolved
+        cache_key = str(collection_name).upper().strip()
+        if cache_key in self._collection_ids:
+            return self._collection_ids[cache_key]
+
         # Check if collection_name is provided
         collections = self.get_collections()
         collections["list_name"] = collections["list_name"].str.upper().str.strip()
-        collection = collections[collections["list_name"]== str(collection_name).upper().strip()]
+        collection = collections[collections["list_name"]== cache_key]
 
         # If collection_name is not found, raise an error
         if collection.empty:
             raise ValueError(f"Collection '{collection_name}' not found.")
         else:
             collection_id = collection["id_list"].values[0]
+            self._collection_ids[cache_key] = collection_id
         
         return collection_id
+
+    ##############################################################################
+    ### Limpiar la caché de ids de las colecciones
+    ##############################################################################
+    @check_type_args
+    def clear_collection_cache(self, collection_id: str = "") -> None:
+        """
+        Método para limpiar la caché de ids de colecciones que usa `get_collection_id`.
+        Si se pasa un collection_id solo se eliminan las entradas que apuntan a ese id, si no se limpia toda la caché.
+
+        Args:
+            collection_id (str, optional): ID de la colección (lista) que se quiere sacar de la caché. Por defecto se limpia toda la caché.
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            list_sharepoint.clear_collection_cache()
+        """
+
+        if collection_id:
+            self._collection_ids = {name: id_list for name, id_list in self._collection_ids.items() if id_list != collection_id}
+        else:
+            self._collection_ids = {}
          
     ##############################################################################
     ### Obtengo el name, displayName y id de las columnas de una lista
     ##############################################################################     
     @check_type_args
+    @traced("get_fields")
+    @profiled
     def get_fields(self, collection_name: str = "", collection_id: str = "") -> pd.DataFrame:
 
         """
@@ -147,7 +420,7 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
             collection_id (str): ID de la colección (lista) de SharePoint. Si no se proporciona, se buscará una colección con un ID vacío.
         
         Returns:
-            pd.DataFrame: DataFrame que contiene los nombres, displayNames, IDs y tipos de datos de las columnas de la lista de SharePoint.
+            pd.DataFrame: DataFrame que contiene los nombres, displayNames, IDs y tipos de datos de las columnas de la lista de SharePoint, y si cada columna tiene índice (indexed).
 
         Raises:
             ValueError: Si no se encuentra una colección con el nombre o ID proporcionado, o si no se encuentran datos en la respuesta de la API. Tambien se lanza si no se proporciona ni el nombre ni el ID de la colección.
@@ -174,23 +447,26 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
             if "value" in data:
                 data = data["value"]
                 # Create a DataFrame with the relevant columns
-                df_columns = pd.DataFrame(columns=['name_id', 'name','column_id', 'dataType'])
+                df_columns = pd.DataFrame(columns=['name_id', 'name','column_id', 'dataType', 'indexed'])
                 # Create a list with columns to delete
                 delete_columns = ['ContentType', 'Attachments']
                 # Create a lambda function to determine the data type of the column
+                # Numbers keep the decimal places of the list ("num" when they are automatic), "date" is a date and time and "datetime" a date only
+                decimal_places = {"none": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5}
                 determine_data_type = lambda x: (
-                    "num(1)" if "number" in x and x['number']['decimalPlaces'] == "one" 
-                    else "num(0)" if "number" in x and (x['number']['decimalPlaces'] == "none") 
-                    else "num(2)" if "number" in x and (x['number']['decimalPlaces'] != "one" and x['number']['decimalPlaces'] == "none") 
-                    else "str" if ("text" in x or "choice" in x) 
-                    else "datetime" if "dateTime" in x and x['dateTime']['format'] == 'dateOnly' else "date"
+                    f"num({decimal_places[x['number'].get('decimalPlaces')]})" if "number" in x and x['number'].get('decimalPlaces') in decimal_places
+                    else "num" if "number" in x
+                    else "datetime" if "dateTime" in x and x['dateTime'].get('format') == 'dateOnly'
+                    else "date" if "dateTime" in x
+                    else "str"
                 )
                 # Create a list of dictionaries with the relevant columns
                 columns_dict = [
                             {'name_id': row['name'].strip(), 
                               'name': row['displayName'], 
                               'column_id': row['id'], 
-                              'dataType': determine_data_type(row)
+                              'dataType': determine_data_type(row),
+                              'indexed': bool(row.get('indexed', False))
                             }
                              for row in data 
                              if row["readOnly"] == False and row['displayName'] != 'Título' and row['displayName'] != 'Index' and row['displayName'] != 'index'
@@ -213,32 +489,37 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
     ### Obtengo la información de una lista en específica
     ############################################################################## 
     @check_type_args
-    def get_items(self, colection_name: str ="", collection_id: str ="") -> pd.DataFrame:
+    @traced("get_items")
+    @profiled
+    def get_items(self, colection_name: str ="", collection_id: str ="", query: ItemQuery | None = None) -> pd.DataFrame:
 
         """
         Método para obtener la información de una lista específica de SharePoint.
         Este método realiza una solicitud a la API de SharePoint para obtener los items de una lista específica y devuelve un DataFrame con los datos de los items, incluyendo los nombres de las columnas y sus respectivos IDs.
+        Con query SharePoint filtra, ordena, limita y proyecta los items (ver `ItemQuery`), así solo se descargan las filas y columnas que se necesitan. Si un filtro o el orden usan columnas sin índice
+        se envía el encabezado Prefer: HonorNonIndexedQueriesWarningMayFailRandomly y se escribe una advertencia en el log, porque SharePoint puede rechazar esas consultas en listas de más de 5000 elementos.
 
         Args:
             colection_name (str): Nombre de la colección (lista) de SharePoint. Si no se proporciona, se buscará una colección con un nombre vacío.
             collection_id (str): ID de la colección (lista) de SharePoint. Si no se proporciona, se buscará una colección con un ID vacío.
+            query (ItemQuery, optional): Filtros, orden, límite y columnas de la consulta. Por defecto se traen todos los items con todas las columnas.
 
         Returns:
             pd.DataFrame: DataFrame que contiene los datos de los items de la lista de SharePoint, incluyendo los nombres de las columnas y sus respectivos IDs.
 
         Raises:
-            ValueError: Si no se encuentra una colección con el nombre o ID proporcionado, o si no se encuentran columnas en la lista. Tambien se lanza si no se proporciona ni el nombre ni el ID de la colección.
+            ValueError: Si no se encuentra una colección con el nombre o ID proporcionado, o si no se encuentran columnas en la lista. Tambien se lanza si no se proporciona ni el nombre ni el ID de la colección,
+                o si la consulta usa columnas que no existen en la lista o valores que no corresponden con el tipo de dato de su columna.
 
         Ejemplo:
             list_sharepoint = ListSharepoint(crud=crud, auth=auth)
             items = list_sharepoint.get_items(collection_name="My Collection")
             print(items)
-        """
 
-        print('''
-                ---------------------------------------------------------------------------------------------------
-                                    Inicio Descarga de items de Lista de Sharepoint
-                ---------------------------------------------------------------------------------------------------''')
+            # Solo los clientes de Medellín mayores de 30, los 100 mayores, con dos columnas
+            query = ItemQuery().where("Ciudad", "eq", "Medellín").where("Edad", "gt", 30).order_by("Edad", descending=True).top(100).select(["Documento", "Edad"])
+            items = list_sharepoint.get_items(collection_name="My Collection", query=query)
+        """
 
         if collection_id or colection_name:
             # Get token from the authentication context
@@ -247,70 +528,37 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
             if not collection_id:
                 # If collection_id is not provided, get the collections to find the id
                 collection_id = self.get_collection_id(colection_name)
+            logger.info("Inicio descarga de items de la lista %s", collection_id)
             data_columns = self.get_fields(collection_id=collection_id)
-            print(f"Columns: \n{data_columns}")
+            logger.debug("Columnas de la lista: %s", DataFrameSummary(data_columns, rows=len(data_columns)))
 
             if not data_columns.empty:
-                list_col_name_id = data_columns['name_id'].tolist() # Name_id of the columns (field_1, field_2, etc.)
-                name_id_selected = ','.join(list_col_name_id) # Create a string with the name_id of the columns to select
-                list_col_name = data_columns['name'].tolist() # Name of the columns, like you see on Sharepoint (Documento, Telefono, etc.)
-
-                url = f"{self._auth.get_url()}/lists/{collection_id}/items?expand=fields(select={name_id_selected})"
-
-                data = self._crud.url_request(url)
-
-                try:
-                    next_link = data["@odata.nextLink"]
-                except Exception as solo_una_pag:
-                    next_link = None
-
-                primera_pagina = 1
-                paginar = 0 if next_link is None else 1
-
-                df_list_itmes = pd.DataFrame(columns=list_col_name)
                 dict_total_items = []
                 list_index_sharepoint = []
+                num_paginas = 0
 
-                while paginar == 1 or primera_pagina == 1:
-                    if primera_pagina != 1:
-                        url = next_link
-                        data = self._crud.url_request(url)
-
-                        try:
-                            next_link = data['@odata.nextLink']
-                        except Exception as solo_una_pag:
-                            next_link = None
-                        
-                        paginar = 0 if next_link is None else 1
-
-                    primera_pagina = 0
-                    data = data['value']
-                    dict_items = [{col: reg['fields'][col] if col in reg['fields'] else "" for col in list_col_name_id} for reg in data]
+                for dict_items, ids_items in self._paginas_items(collection_id, data_columns, query):
                     dict_total_items += dict_items
-                    list_index_sharepoint += [reg['id'] for reg in data]
-                    url = next_link
-                    print(dict_total_items)
-                
-                df_list_itmes = pd.DataFrame(dict_total_items)
-                df_list_itmes = cambiar_col_df(data= df_list_itmes, df_columns= data_columns, col_name_id="name_id", col_name= "name")
-                df_list_itmes['index_sharepoint'] = list_index_sharepoint
-
-                if df_list_itmes.empty:
-                    name_columns = [col for col in list_col_name]
-                    name_columns += ['index_sharepoint']
-                    df_list_itmes = pd.DataFrame(columns=name_columns)
-                    print(df_list_itmes)
-                    print(df_list_itmes.columns.tolist())
+                    list_index_sharepoint += ids_items
+                    num_paginas += 1
+
+                if query is not None:
+                    data_columns = query.columns_for(data_columns)
+                df_list_itmes = self._items_a_df(dict_total_items, list_index_sharepoint, data_columns)
+
+                logger.info("Finalizo descarga de items de la lista %s: %s items en %s páginas", collection_id, df_list_itmes.shape[0], num_paginas)
+                span = self._tracer.current()
+                if span is not None:
+                    span.set_attribute("collection_id", collection_id)
+                    span.set_attribute("pages", num_paginas)
+                    span.set_attribute("rows", df_list_itmes.shape[0])
+                    if query is not None:
+                        span.set_attribute("query", repr(query))
             else:
                 df_list_itmes = []
-                print("No hay columnas en la lista. No se pueden obtener los items.")
+                logger.warning("No hay columnas en la lista %s. No se pueden obtener los items.", collection_id)
         else:
             raise ValueError("Collection name or ID must be provided.")
-    
-        print('''
-                    ---------------------------------------------------------------------------------------------------
-                                        Finalizo Descarga de items de Lista de Sharepoint
-                    ---------------------------------------------------------------------------------------------------''')
             
         return df_list_itmes
     
@@ -318,22 +566,86 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
     
 
 
+    def _paginas_items(self, collection_id: str, data_columns: pd.DataFrame, query: ItemQuery | None = None) -> Iterator[tuple[List[Dict[str, Any]], List[str]]]:
+        """
+        Recorre las páginas de items de la lista siguiendo @odata.nextLink y entrega, por cada página, los campos de sus items (por name_id, vacío si el item no trae el campo) y sus ids.
+        data_columns son las columnas de `get_fields`; con query se agregan sus parámetros, solo se piden sus columnas y el límite corta la paginación (ver `ItemQuery`).
+        Las páginas no se acumulan: quien las recorre decide qué guarda, así `update_collection` puede volcarlas a disco a medida que llegan.
+        """
+
+        headers = {}
+        params = ""
+        limit = 0
+        if query is not None:
+            params = query.to_params(data_columns)
+            non_indexed = query.non_indexed(data_columns)
+            if non_indexed:
+                logger.warning("The query on the list %s filters or orders by columns without an index %s. SharePoint may reject it on lists with more than 5000 items.", collection_id, non_indexed)
+                headers = self.PREFER_NON_INDEXED
+            data_columns = query.columns_for(data_columns)
+            limit = query.limit
+        list_col_name_id = data_columns['name_id'].tolist() # Name_id of the columns (field_1, field_2, etc.)
+        name_id_selected = ','.join(list_col_name_id) # Create a string with the name_id of the columns to select
+
+        if list_col_name_id:
+            url = f"{self._auth.get_url()}/lists/{collection_id}/items?expand=fields(select={name_id_selected}){params}"
+        else:
+            # Only the id of each item
+            url = f"{self._auth.get_url()}/lists/{collection_id}/items?$select=id{params}"
+
+        num_paginas = 0
+        num_items = 0
+        while url:
+            data = self._crud.url_request(url, headers=headers)
+            url = data.get('@odata.nextLink')
+            data = data['value']
+            if limit:
+                # $top only sets the size of the page, the limit of the query stops the paging
+                data = data[:limit - num_items]
+            num_paginas += 1
+            num_items += len(data)
+            logger.debug("Página %s descargada: %s items, %s acumulados", num_paginas, len(data), num_items)
+
+            yield [{col: reg['fields'][col] if col in reg['fields'] else "" for col in list_col_name_id} for reg in data], [reg['id'] for reg in data]
+
+            if limit and num_items >= limit:
+                break
+
+    def _items_a_df(self, dict_items: List[Dict[str, Any]], ids_items: List[str], data_columns: pd.DataFrame) -> pd.DataFrame:
+        """Arma el DataFrame de items como lo devuelve `get_items`: las columnas con su nombre (name) y la columna index_sharepoint."""
+
+        df_items = pd.DataFrame(dict_items, columns=data_columns['name_id'].tolist())
+        df_items = cambiar_col_df(data=df_items, df_columns=data_columns, col_name_id="name_id", col_name="name")
+        df_items['index_sharepoint'] = ids_items
+
+        if df_items.empty:
+            df_items = pd.DataFrame(columns=data_columns['name'].tolist() + ['index_sharepoint'])
+
+        return df_items
+
     ##############################################################################
     ### Crear elementos en una lista específica
     ############################################################################## 
     @check_type_args
-    def create_item (self, data: pd.DataFrame, collection_name: str ="", collection_id: str ="") -> pd.DataFrame:
+    @traced("create_item")
+    @profiled
+    def create_item (self, data: pd.DataFrame | str | Iterator[pd.DataFrame], collection_name: str ="", collection_id: str ="", chunksize: int = 100000, error_policy: ErrorPolicy | None = None) -> pd.DataFrame:
         """
         Método para crear elementos en una lista específica de SharePoint.
         Este método toma un DataFrame con los datos a insertar y los envía a la lista de SharePoint especificada.
 
         Args:
-            data (pd.DataFrame): DataFrame que contiene los datos a insertar en la lista de SharePoint. Debe contener las columnas correspondientes a los campos de la lista. No es necesario que se envien todas las columnas, solo las que se desean insertar.
+            data (pd.DataFrame | str | Iterator[pd.DataFrame]): DataFrame que contiene los datos a insertar en la lista de SharePoint. Debe contener las columnas correspondientes a los campos de la lista. No es necesario que se envien todas las columnas, solo las que se desean insertar.
+                También puede ser la ruta de un archivo .csv o .parquet o un iterador de DataFrames (ver `leer_por_bloques`): los datos se envían bloque a bloque y la memoria depende de chunksize y no del tamaño del archivo.
             collection_name (str): Nombre de la colección (lista) de SharePoint. Si no se proporciona, se buscará una colección con un nombre vacío.
             collection_id (str): ID de la colección (lista) de SharePoint. Si no se proporciona, se buscará una colección con un ID vacío.
+            chunksize (int, optional): Filas por bloque al leer un archivo. Por defecto 100000.
+            error_policy (ErrorPolicy, optional): Qué hacer cuando falla una inserción: levantar el error (por defecto) o seguir, reintentar las fallas transitorias y dejar las demás en un dead letter (ver `ErrorPolicy`).
 
         Returns:
-            pd.DataFrame: DataFrame que contiene los datos insertados en la lista de SharePoint, incluyendo el código de estado de la solicitud.
+            pd.DataFrame: DataFrame que contiene los datos insertados en la lista de SharePoint, incluyendo el código de estado de la solicitud. Es una copia: data no se modifica.
+                Si data es un archivo o un iterador solo se devuelve la columna status_code, una fila por registro en el orden en que se leyeron.
+                Los registros que fallaron del todo con mode "continue" quedan con el código de estado del error (0 si no hubo respuesta). En `attrs['write_summary']` quedan los conteos por acción, o solo el resumen si la política tiene summary_only (ver `ErrorPolicy.summary`).
 
         Raises:
             ValueError: Si no se encuentra una colección con el nombre o ID proporcionado, o si no se encuentran columnas en la lista. Tambien se lanza si no se proporciona ni el nombre ni el ID de la colección.
@@ -346,6 +658,9 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
             })
             result = list_sharepoint.create_item(data=data, collection_name="My Collection")
             print(result)
+
+            # Un archivo de varios GB se envía por bloques
+            result = list_sharepoint.create_item(data="/data/clientes.parquet", collection_name="My Collection", chunksize=50000)
         """
         
         if collection_id or collection_name:
@@ -357,56 +672,55 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
                 # If collection_id is not provided, get the collections to find the id
                 collection_id = self.get_collection_id(collection_name)
             
+            bloques = leer_por_bloques(data, chunksize)
             data_col_columns = self.get_fields(collection_id=collection_id)
-            print(f"Columns: \n{data_col_columns}")
+            logger.debug("Columnas de la lista: %s", DataFrameSummary(data_col_columns, rows=len(data_col_columns)))
             list_col_name = data_col_columns['name'].tolist()  # Name of the columns, like you see on Sharepoint (Documento, Telefono, etc.)
-            list_col_data = list(data.columns.values)  # Name of the columns in the DataFrame
-
-            columns_to_insert = compare_columns(list_col_data, list_col_name)  # Compare the columns of the DataFrame with the columns of the collection
-
-            data_col_columns = data_col_columns[data_col_columns['name'].isin(columns_to_insert)]  # Select the columns to insert from the DataFrame
-
-            print('''
-                ---------------------------------------------------------------------------------------------------
-                                    Arreglando Formato de DataFrame
-                ---------------------------------------------------------------------------------------------------''')
 
-            data['json_post'] = data.apply(lambda x: construir_json(x, data_col_columns), axis=1)
-
-            print('''
-                ---------------------------------------------------------------------------------------------------
-                                    Finalizo Arreglar Formato de DataFrame
-                ---------------------------------------------------------------------------------------------------''')
-            
             url_new_item = f"{self._auth.get_url()}/lists/{collection_id}/items"
             list_status_code = []
-            num_rows = data.shape[0]
-
-            for num_act_row, row_tuple in enumerate(data.itertuples(), start=1):
-                # Refresh the token every 2000 rows to avoid expiration                                
-                if num_act_row % 2000 == 0:
-                    print("--------------------- Refrescando conexión--------------------", end='\r')
-                    token = self._auth.get_token()
-                    self._crud.set_token(token)
-                                
-                # Create the JSON to post
-                value_row_json = row_tuple.json_post
-                dato_json = json.dumps({"fields": json.loads(value_row_json)})
-                #print(dato_json)
-                # os.system('cls')
-                
-                status_posts = self._crud.url_posts(url_new_item, dato_json)
-                list_status_code.append(status_posts)
-                os.system('cls')
-                print(f"------------Cargando: {round((num_act_row/(num_rows))*100,2)}% ------------")
-
-            data['status_code'] = list_status_code
+            policy = self._politica_errores(error_policy, collection_id)
+            # The total of a file or an iterator is not known until the end
+            num_rows = data.shape[0] if isinstance(data, pd.DataFrame) else 0
+            self._progress.start("Cargando", num_rows)
+            payload_columns = None
+
+            for bloque in bloques:
+                if payload_columns is None:
+                    list_col_data = list(bloque.columns.values)  # Name of the columns in the DataFrame
+                    columns_to_insert = compare_columns(list_col_data, list_col_name)  # Compare the columns of the DataFrame with the columns of the collection
+                    payload_columns = data_col_columns[data_col_columns['name'].isin(columns_to_insert)].to_dict("records")  # Select the columns to insert from the DataFrame
+
+                logger.info("Cargando %s items en la lista %s", bloque.shape[0], collection_id)
+
+                # The payloads are built block by block while posting, without adding columns to data
+                for row_tuple in self._filas_con_payload(bloque, payload_columns):
+                    # Refresh the token every 2000 rows to avoid expiration                                
+                    if (len(list_status_code) + 1) % 2000 == 0:
+                        logger.debug("Refrescando conexión")
+                        token = self._auth.get_token()
+                        self._crud.set_token(token)
+                                    
+                    # The JSON is parsed inside the request, so a bad payload goes through the error policy
+                    dato_json = str(row_tuple.json_post)
+                    
+                    list_status_code.append(0)
+                    policy.submit(partial(self._enviar_json, self._crud.url_posts, url_new_item, dato_json, fields=True), partial(self._confirmar, list_status_code, len(list_status_code) - 1),
+                                  "I", pk=str(row_tuple.Index), payload=dato_json, operation="post")
+
+            self._reintentar_pendientes(policy)
+            self._progress.finish()
+            if isinstance(data, pd.DataFrame):
+                result = data.assign(status_code=list_status_code)
+            else:
+                result = pd.DataFrame({"status_code": list_status_code})
+            result = self._resumen_escritura(result, policy)
             
         else:
             raise ValueError("Collection name or ID must be provided.")
         
 
-        return data
+        return result
 
 
 
@@ -414,7 +728,9 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
 
 
     @check_type_args
-    def delete_items (self, collection_name: str = "", collection_id: str = "", id_items: List[str] = [], delete_all: bool = False) -> pd.DataFrame:
+    @traced("delete_items")
+    @profiled
+    def delete_items (self, collection_name: str = "", collection_id: str = "", id_items: List[str] = [], delete_all: bool = False, error_policy: ErrorPolicy | None = None) -> pd.DataFrame:
         """
         Método para eliminar elementos de una lista específica de SharePoint.
         Este método permite eliminar elementos de una lista de SharePoint ya sea por ID específico o eliminando todos los elementos de la lista.
@@ -424,9 +740,11 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
             collection_id (str): ID de la colección (lista) de SharePoint. Si no se proporciona, se buscará una colección con un ID vacío.
             id_items (List[str], optional): Lista de IDs de los elementos a eliminar. Si `delete_all` es True, esta lista no es necesaria. Por defecto es una lista vacía.
             delete_all (bool, optional): Si es True, elimina todos los elementos de la lista. Si es False, elimina solo los elementos especificados en `id_items`. Por defecto es False.
+            error_policy (ErrorPolicy, optional): Qué hacer cuando falla una eliminación. Ver `create_item` y `ErrorPolicy`.
 
         Returns:
             pd.DataFrame: DataFrame que contiene los IDs de los elementos eliminados y sus respectivos códigos de estado de la solicitud.
+                En `attrs['write_summary']` quedan los conteos por acción, o solo el resumen si la política tiene summary_only.
 
         Raises:
             ValueError: Si no se proporciona ni el nombre ni el ID de la colección, o si `id_items` está vacío cuando `delete_all` es False.
@@ -446,8 +764,8 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
             
             if delete_all:
                 start_time = time()
-                # If delete_all is True, get all items from the collection
-                df_items = self.get_items(collection_id=collection_id)
+                # If delete_all is True, get the id of all items from the collection
+                df_items = self.get_items(collection_id=collection_id, query=ItemQuery().select([]))
                 id_items = df_items['index_sharepoint'].tolist()
                 tiempo_obtencion_datos = (time() - start_time)
                 tiempo_obtencion_datos = segundos_a_horas_minutos_segundos(tiempo_obtencion_datos)
@@ -459,59 +777,269 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
                     tiempo_obtencion_datos = "00:00:00"
             
             num_items = len(id_items)
-            print(f"Cantidad de Elementos a eleiminar : {num_items}")
+            logger.info("Cantidad de elementos a eliminar de la lista %s: %s", collection_id, num_items)
             df_items = pd.DataFrame(id_items, columns=['index_sharepoint'])
             num_rows = df_items.shape[0]
-            list_status_code = []
-            start_time = time()
+            list_status_code = [0] * num_rows
+            policy = self._politica_errores(error_policy, collection_id)
+            key_index = self._indice_llaves(collection_id)
+            self._progress.start("Eliminando", num_rows, tiempo_obtencion_datos=tiempo_obtencion_datos)
 
             for num_row_act, row_tuple in enumerate(df_items.itertuples(), start=1):
                 if num_row_act % 2000 == 0:
-                    print("--------------------- Refrescando conexión--------------------", end='\r')
+                    logger.debug("Refrescando conexión")
                     token = self._auth.get_token()
                     self._crud.set_token(token)
                 url_delete_item = f"{self._auth.get_url()}/lists/{collection_id}/items/{row_tuple.index_sharepoint}"
-                status_request = self._crud.url_delete(url_delete_item)
-                tiempo_eliminar_datos = (time() - start_time)
-                tiempo_eliminar_datos = segundos_a_horas_minutos_segundos(tiempo_eliminar_datos)
-                os.system('cls')
-                print(f'''-------------------------------------------------------------------------------------------------
-                        To Delete --> {num_rows}              Deleted --> {num_row_act}
-                        Tiempo de obtención de datos: {tiempo_obtencion_datos}
-                        Tiempo transcurrido en eliminar datos: {tiempo_eliminar_datos}
-                        ------------Eliminando: {round((num_row_act/num_rows)*100,2)}% ------------''')
-                list_status_code.append(status_request)
-                
+                policy.submit(partial(self._crud.url_delete, url_delete_item),
+                              partial(self._confirmar, list_status_code, num_row_act - 1, key_index=key_index, action="D", item_id=str(row_tuple.index_sharepoint)),
+                              "D", item_id=str(row_tuple.index_sharepoint), operation="delete")
 
+            self._reintentar_pendientes(policy)
+            self._progress.finish()
             df_items['status_code'] = list_status_code
+            df_items = self._resumen_escritura(df_items, policy)
         else:
             raise ValueError("Collection name or ID must be provided.")
         
         return df_items
 
-            
+    ##############################################################################
+    ### Obtener la definición (esquema) de una lista
+    ##############################################################################
+    @check_type_args
+    @traced("get_collection_definition")
+    @profiled
+    def get_collection_definition(self, collection_name: str = "", collection_id: str = "") -> Dict[str, Any]:
+        """
+        Método para obtener la definición de una lista de SharePoint: nombre, descripción, configuración (plantilla, tipos de contenido, visibilidad) y las columnas que la componen.
+        Las columnas son las mismas que lee `get_fields`, pero con su definición completa para poder crear otra lista con el mismo esquema.
+        OJO -> La definición no incluye lo que Graph no expone en el recurso de la lista: vistas, permisos, versionado, aprobación de contenido, alertas y suscripciones (webhooks), ni los tipos de contenido
+        y columnas de solo lectura o del sistema. Una lista creada con esta definición (ver `create_collection` y `truncate_collection`) queda con esas opciones por defecto.
+
+        Args:
+            collection_name (str): Nombre de la colección (lista) de SharePoint.
+            collection_id (str): ID de la colección (lista) de SharePoint.
+
+        Returns:
+            Dict[str, Any]: Diccionario con las llaves displayName, description, list y columns, listo para enviarse en la creación de una lista.
+
+        Raises:
+            ValueError: Si no se proporciona ni el nombre ni el ID de la colección, o si no se encuentran datos en la respuesta de la API.
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            definicion = list_sharepoint.get_collection_definition(collection_name="My Collection")
+            print(definicion["columns"])
+        """
+
+        if collection_id or collection_name:
+            # Get token from the authentication context
+            token = self._auth.get_token()
+            self._crud.set_token(token)
+            if not collection_id:
+                # If collection_id is not provided, get the collections to find the id
+                collection_id = self.get_collection_id(collection_name)
 
+            # Get the list settings and the full definition of the columns
+            data_list = self._crud.url_request(f"{self._auth.get_url()}/lists/{collection_id}?$select=displayName,description,list")
+            data_columns = self._crud.url_request(f"{self._auth.get_url()}/lists/{collection_id}/columns")
+
+            if "value" not in data_columns:
+                raise ValueError("Data not found in the response.")
+
+            list_settings = data_list.get("list", {})
+            definition = {
+                "displayName": data_list["displayName"],
+                "description": data_list.get("description", ""),
+                "list": {setting: list_settings[setting] for setting in ("template", "contentTypesEnabled", "hidden") if setting in list_settings},
+                "columns": limpiar_definicion_columnas(data_columns["value"])
+            }
+
+        else:
+            raise ValueError("Collection name or ID must be provided.")
+
+        return definition
+
+    ##############################################################################
+    ### Crear una lista a partir de su definición
+    ##############################################################################
+    @check_type_args
+    @traced("create_collection")
+    @profiled
+    def create_collection(self, definition: Dict[str, Any]) -> str:
+        """
+        Método para crear una lista de SharePoint a partir de su definición (ver `get_collection_definition`). La url de la lista se toma del displayName de la definición.
+        Las fallas transitorias (throttling, errores del servidor o sin respuesta, ver `ErrorPolicy.RETRYABLE_STATUS`) y el conflicto de nombre mientras SharePoint termina de eliminar una lista con el mismo nombre
+        se reintentan hasta `CREATE_COLLECTION_ATTEMPTS` veces, esperando lo que indique el encabezado Retry-After o el doble del intento anterior.
+
+        Args:
+            definition (Dict[str, Any]): Definición de la lista con las llaves displayName, description, list y columns.
+
+        Returns:
+            str: ID de la colección (lista) creada.
+
+        Raises:
+            ValueError: Si la definición no trae displayName.
+            requests.HTTPError: Si la lista no se pudo crear después de los reintentos.
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            definicion = list_sharepoint.get_collection_definition(collection_name="My Collection")
+            new_collection_id = list_sharepoint.create_collection({**definicion, "displayName": "My Collection 2"})
+            print(new_collection_id)
+        """
+
+        if not definition.get("displayName"):
+            raise ValueError("The definition of the collection must have a displayName.")
+
+        # Get token from the authentication context
+        token = self._auth.get_token()
+        self._crud.set_token(token)
+
+        for intento in range(1, self.CREATE_COLLECTION_ATTEMPTS + 1):
+            try:
+                self._crud.url_posts(f"{self._auth.get_url()}/lists", json.dumps(definition))
+                break
+            except Exception as e:
+                status = ErrorPolicy.status_of(e)
+                if intento == self.CREATE_COLLECTION_ATTEMPTS or not (status == 409 or ErrorPolicy().retryable(e)):
+                    raise
+                espera = segundos_reintento(getattr(getattr(e, "response", None), "headers", None), intento)
+                logger.warning("The collection '%s' could not be created (status %s), retrying in %ss", definition["displayName"], status, espera)
+                sleep(espera)
+
+        collection_id = self._crud.get_last_response()["id"]
+        self._collection_ids[definition["displayName"].upper().strip()] = collection_id
+
+        return collection_id
+
+    ##############################################################################
+    ### Vaciar una lista recreándola con el mismo esquema
+    ##############################################################################
     @check_type_args
-    def update_collection(self, data: pd.DataFrame, pk: List[str], collection_name: str = "", collection_id: str = "", delete: bool = True, insert: bool = True, delete_duplicates: bool = False) -> pd.DataFrame:
+    @traced("truncate_collection")
+    @profiled
+    def truncate_collection(self, collection_name: str = "", collection_id: str = "") -> str:
+        """
+        Método para vaciar una lista de SharePoint sin eliminar sus elementos uno a uno.
+        Se toma la definición de la lista (ver `get_collection_definition`), se elimina la lista y se vuelve a crear con la misma definición y el mismo nombre (ver `create_collection`),
+        por lo que el proceso cuesta unas pocas solicitudes sin importar la cantidad de elementos. Como la lista nueva se crea con el nombre original, su url es la misma y los enlaces a la lista siguen funcionando.
+        Si no se puede eliminar la lista se lanza el error y la lista queda intacta. Si la lista ya se eliminó y la creación falla después de los reintentos, se lanza el error con la definición en JSON
+        para volver a crearla con `create_collection`; la definición también queda en el log. La lista eliminada queda en la papelera de reciclaje del sitio.
+
+        OJO -> El id de la lista cambia, por lo que cualquier proceso que guarde el id de la lista debe usar el id que devuelve este método. El índice de llaves de la lista anterior (ver `set_key_index`) se elimina porque sus ids de elementos ya no existen.
+        Solo se copia lo que devuelve `get_collection_definition`; las vistas, los permisos, el versionado y la aprobación de contenido, las alertas y suscripciones (webhooks) de la lista anterior se pierden.
+
+        Args:
+            collection_name (str): Nombre de la colección (lista) de SharePoint.
+            collection_id (str): ID de la colección (lista) de SharePoint.
+
+        Returns:
+            str: ID de la nueva colección (lista) de SharePoint.
+
+        Raises:
+            ValueError: Si no se proporciona ni el nombre ni el ID de la colección, si la lista no se pudo eliminar (la lista queda intacta) o si se eliminó y no se pudo volver a crear (el mensaje trae la definición).
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            new_collection_id = list_sharepoint.truncate_collection(collection_name="My Collection")
+            print(new_collection_id)
+        """
+
+        if collection_id or collection_name:
+            # Get token from the authentication context
+            token = self._auth.get_token()
+            self._crud.set_token(token)
+            if not collection_id:
+                # If collection_id is not provided, get the collections to find the id
+                collection_id = self.get_collection_id(collection_name)
+
+            # Capture the schema of the list before deleting it
+            definition = self.get_collection_definition(collection_id=collection_id)
+            display_name = definition["displayName"]
+
+            try:
+                self._crud.url_delete(f"{self._auth.get_url()}/lists/{collection_id}")
+            except Exception as e:
+                raise ValueError(f"The collection '{display_name}' could not be deleted, the original collection was kept: {e}")
+
+            self.clear_collection_cache(collection_id)
+            self._borrar_indice_llaves(collection_id)
+
+            # Create the list again with its original name, so it keeps its url
+            try:
+                new_collection_id = self.create_collection(definition)
+            except Exception as e:
+                logger.error("The collection '%s' was deleted and could not be created again, its definition is: %s", display_name, json.dumps(definition))
+                raise ValueError(f"The collection '{display_name}' was deleted and could not be created again: {e}. "
+                                 f"Create it with create_collection and this definition: {json.dumps(definition)}")
+
+        else:
+            raise ValueError("Collection name or ID must be provided.")
+
+        return new_collection_id
+
+    @check_type_args
+    @traced("update_collection")
+    @profiled
+    def update_collection(self, data: pd.DataFrame | str | Iterator[pd.DataFrame], pk: List[str], collection_name: str = "", collection_id: str = "", delete: bool = True, insert: bool = True, delete_duplicates: bool = False, strategy: str = "auto", dry_run: bool = False, journal_dir: str = "", resume: str = "", force: bool = False, memory_budget: int = 0, diff_workers: int = 1, diff_backend: str = "auto", pk_encoding: str = "text", chunksize: int = 100000, error_policy: ErrorPolicy | None = None, lookup: str = "auto", row_hash: str = "", allow_full_replace: bool = False) -> pd.DataFrame:
         """
         Método para actualizar una colección (lista) específica de SharePoint.
         Este método compara los datos proporcionados en un DataFrame con los datos existentes en la colección de SharePoint y realiza las actualizaciones necesarias.
         Permite insertar nuevos elementos, actualizar elementos existentes y eliminar elementos según sea necesario.
 
         Args:
-            data (pd.DataFrame): DataFrame que contiene los datos a actualizar en la colección de SharePoint. Debe contener las columnas correspondientes a los campos de la lista. Solo las columnas que se desean actualizar deben estar presentes en el DataFrame.
+            data (pd.DataFrame | str | Iterator[pd.DataFrame]): DataFrame que contiene los datos a actualizar en la colección de SharePoint. Debe contener las columnas correspondientes a los campos de la lista. Solo las columnas que se desean actualizar deben estar presentes en el DataFrame.
+                También puede ser la ruta de un archivo .csv o .parquet o un iterador de DataFrames (ver `leer_por_bloques`): las páginas de la lista y los bloques se vuelcan en disco a medida que llegan y se comparan con `SortedMergeDiff`,
+                y el plan se aplica por bloques a medida que sale de la comparación, así la memoria depende de chunksize y no del tamaño de la lista ni del archivo. Con journal o dry_run el plan sí se junta en memoria porque se guarda o se devuelve completo.
+                Con estos datos no se puede usar la estrategia full_replace ni escoger el motor de la comparación, y la PK siempre es "text".
             pk (List[str]): Lista de nombres de las columnas que se utilizarán como clave primaria para identificar los elementos en la colección de SharePoint. Estas columnas deben estar presentes en el DataFrame.
             collection_name (str, optional): Nombre de la colección (lista) de SharePoint. Si no se proporciona, se buscará una colección con un nombre vacío.
             collection_id (str, optional): ID de la colección (lista) de SharePoint. Si no se proporciona, se buscará una colección con un ID vacío.
             delete (bool, optional): Si es True, elimina los elementos que están en SharePoint pero no en el DataFrame. Por defecto es True.
             insert (bool, optional): Si es True, inserta los elementos que están en el DataFrame pero no en SharePoint. Por defecto es True.
-            delete_duplicates (bool, optional): Si es True, elimina los duplicados en las colecciones de SharePoint y en el DataFrame. Por defecto es False.
+            delete_duplicates (bool, optional): Si es True, elimina los duplicados en las colecciones de SharePoint y en el DataFrame. Si data se lee por bloques se deja el primer item de cada PK repetida en la lista y se eliminan los demás. Por defecto es False.
+            strategy (str, optional): Estrategia de sincronización. Con "auto" se escoge la más barata según los conteos del diff y la latencia medida de las solicitudes (ver `SyncPlanner`). También se puede forzar "incremental", "full_replace" o "targeted_upsert". Por defecto es "auto".
+                "targeted_upsert" es la lectura con lookup "filter": se decide antes de leer la lista, con una muestra (ver lookup). full_replace cambia el id de la lista y de sus elementos, por eso "auto" solo la escoge con allow_full_replace.
+            dry_run (bool, optional): Si es True, se calcula todo el plan (insertar, actualizar, eliminar) sin hacer ninguna escritura en la lista, ni siquiera la eliminación de duplicados. Por defecto es False.
+            journal_dir (str, optional): Carpeta donde se guarda el journal de la ejecución (ver `SyncJournal`). Si se pasa, el plan se guarda antes de la primera escritura y cada escritura confirmada queda registrada. Por defecto no se lleva journal.
+            resume (str, optional): Id de una ejecución anterior (attrs['run_id'] del resultado) para retomarla. Se usa el plan guardado en el journal, sin descargar ni comparar de nuevo, y se saltan las operaciones ya confirmadas. Requiere journal_dir y no se puede usar con dry_run.
+            force (bool, optional): Si es True, se descarta el journal de la ejecución indicada en resume y se empieza de cero con el mismo id. Por defecto es False.
+            memory_budget (int, optional): Memoria máxima del proceso en MB. Si la comparación no cabe en lo que queda del presupuesto se hace por particiones de la PK, o en disco con corridas ordenadas si ni las particiones caben (ver `SortedMergeDiff`). La decisión queda en `attrs['sync_plan']['memory']` y el pico de cada fase en `get_memory_report`. Si es 0 no hay presupuesto. Por defecto 0.
+            diff_workers (int, optional): Procesos que hacen la comparación en paralelo, por particiones de la PK (ver `compare_dataframe_por_particiones`). Solo se usan si hay al menos PARALLEL_DIFF_MIN_ROWS filas entre ambos lados. Con 0 se usa un proceso por núcleo. Por defecto 1, sin procesos.
+            diff_backend (str, optional): Motor de la comparación: "auto", "pandas", "sorted_merge", "sqlite" o el nombre de un motor registrado con `set_diff_backend`. Con "auto" se escoge entre pandas (por particiones y procesos) y sorted_merge según memory_budget y diff_workers. Por defecto "auto".
+            pk_encoding (str, optional): Formato de la PK con la que se cruzan la lista y el DataFrame (ver `crear_pk`): "text" (las columnas unidas con "-") o "hash" (un entero de 64 bits, menos memoria y cruces más rápidos, pero el índice del resultado ya no se puede leer). Si el hash tiene colisiones se usa "text". Por defecto "text".
+            chunksize (int, optional): Filas por bloque al leer un archivo y por corrida de la comparación en disco cuando data no es un DataFrame. Por defecto 100000.
+            error_policy (ErrorPolicy, optional): Qué hacer cuando falla una escritura: levantar el error (por defecto) o seguir, reintentar las fallas transitorias y dejar las demás en un dead letter (ver `ErrorPolicy`). Con journal, las operaciones que fallaron no quedan confirmadas y se vuelven a intentar al retomar la ejecución.
+                Si el índice de llaves está activo (ver `set_key_index`), la descarga de la lista lo reconstruye y las inserciones y eliminaciones lo mantienen al día.
+            lookup (str, optional): Cómo se leen los elementos de la lista para la comparación:
+                - "download": Se descargan todos los elementos de la lista con `get_items`, solo con las columnas que están en data.
+                - "filter": Solo se buscan las llaves del DataFrame, con $filter por las columnas de la PK (LOOKUP_KEYS_PER_FILTER llaves por solicitud) en lotes $batch, y la comparación y las escrituras se hacen solo sobre esos registros. Es la estrategia targeted_upsert.
+                  No sirve para eliminar (delete debe ser False), data debe ser un DataFrame y la PK no puede tener columnas de fecha. Las búsquedas con throttling se reintentan según su Retry-After.
+                - "auto": Si delete es False, no se eliminan duplicados, data es un DataFrame, la PK no tiene columnas de fecha y la estrategia es "auto", el planificador escoge entre "filter" (targeted_upsert) y "download" (incremental) antes de leer:
+                  el tamaño de la lista sale del índice de llaves o del id más alto de sus elementos, y los conteos del diff de una muestra de hasta LOOKUP_KEYS_PER_FILTER * BATCH_MAX_REQUESTS registros buscada en un solo $batch (ver `_planear_lectura`).
+                  Si la muestra es todo data sus elementos se reutilizan. En los demás casos, "download".
+                La lectura usada queda en `attrs['sync_plan']['lookup']` y la estimación previa en `attrs['sync_plan']['estimate']`. Por defecto "auto".
+            row_hash (str, optional): Nombre de una columna oculta de la lista donde se guarda la huella del contenido de cada registro (ver `huella_registros`). Si no existe se crea.
+                La huella se escribe en cada inserción y actualización, y la comparación solo descarga la PK y la huella de cada elemento: se actualizan los registros cuya huella guardada no es la calculada con data.
+                En una lista ancha la descarga baja en proporción a las columnas que ya no viajan. La primera ejecución actualiza una vez todos los registros que todavía no tienen huella, y los cambios
+                hechos en la lista por fuera de update_collection con row_hash no se detectan porque no cambian la huella. data debe ser un DataFrame. Por defecto vacío, sin huella.
+            allow_full_replace (bool, optional): Si es True, la estrategia "auto" puede escoger full_replace cuando es la más barata. Si es False (por defecto) full_replace solo se usa si se fuerza con strategy,
+                y si era la más barata queda como recomendación en `attrs['sync_plan']['explanation']`. Solo debe permitirse si los procesos que usan la lista toleran el cambio de id.
         
         Returns:
             pd.DataFrame: DataFrame que contiene los datos actualizados en la colección de SharePoint, incluyendo el código de estado de la solicitud y el tipo de acción realizada (insertar, actualizar o eliminar).
+                En `attrs['sync_plan']` queda la estrategia escogida, el costo estimado de cada estrategia, la explicación de la decisión y el id de la colección (cambia si se usó full_replace).
+                Si se lleva journal, en `attrs['run_id']` queda el id de la ejecución para poder retomarla con resume.
+                Sin journal ni dry_run el resultado no trae json_post: los JSON se construyen por bloques mientras se envían las solicitudes. El DataFrame data no se modifica.
+                Si data se lee por bloques (archivo o iterador), sin journal ni dry_run, el resultado solo trae index_sharepoint, action_type y status_code de cada operación.
+                En `attrs['write_summary']` quedan las operaciones, éxitos, fallas y reintentos por acción. Si la política de errores tiene summary_only se devuelve solo ese resumen, con los mismos attrs.
+                Si dry_run es True se devuelve el plan sin status_code y en `attrs['dry_run']` quedan los conteos por acción, algunos payloads de ejemplo y la estimación de solicitudes, lotes y tiempo (promedio y p95) según la latencia de las últimas solicitudes.
 
         Raises:
-            ValueError: Si no se encuentra una colección con el nombre o ID proporcionado, si no se encuentran columnas en la lista, si las columnas clave primaria no están presentes en el DataFrame, o si no se proporciona ni el nombre ni el ID de la colección.
+            ValueError: Si no se encuentra una colección con el nombre o ID proporcionado, si no se encuentran columnas en la lista, si las columnas clave primaria no están presentes en el DataFrame, o si no se proporciona ni el nombre ni el ID de la colección. También se lanza si se pide resume sin journal_dir o con dry_run, si la ejecución no está en el journal o si el motor de comparación no está registrado o si el formato de la PK no es "text" ni "hash".
+                Y si lookup no es "auto", "download" ni "filter", o si se pide "filter" (o targeted_upsert) con delete, con data que no es un DataFrame o con columnas de fecha en la PK, si lookup y strategy no concuerdan, o si se pide row_hash con data que no es un DataFrame o que ya trae esa columna.
 
         Ejemplo:
             list_sharepoint = ListSharepoint(crud=crud, auth=auth)
@@ -520,10 +1048,25 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
                 "Telefono": ["123456789", "987654321"]
             })
             pk = ["Documento"]  # Clave primaria para identificar los elementos
-            result = list_sharepoint.update_collection(data=data, pk=pk, collection_name="My Collection")
+            result = list_sharepoint.update_collection(data=data, pk=pk, collection_name="My Collection", journal_dir="/data/journal")
             print(result)
+
+            # Si la ejecución se cae, se retoma donde quedó
+            result = list_sharepoint.update_collection(data=data, pk=pk, collection_name="My Collection", journal_dir="/data/journal", resume=result.attrs['run_id'])
+
+            # Un extracto de varios GB se compara por bloques
+            result = list_sharepoint.update_collection(data="/data/clientes.csv", pk=pk, collection_name="My Collection", chunksize=50000)
+
+            # Los cambios del día se buscan por sus llaves, sin descargar la lista
+            result = list_sharepoint.update_collection(data=cambios_del_dia, pk=pk, collection_name="My Collection", delete=False, lookup="filter")
+
+            # En una lista ancha solo se descargan la PK y la huella de cada registro
+            result = list_sharepoint.update_collection(data=data, pk=pk, collection_name="My Collection", row_hash="SyncHash")
         """
         if collection_id or collection_name:
+            if resume and dry_run:
+                # A dry run would download and compare again, and its plan would pass for the one of the resumed run
+                raise ValueError("resume can not be used with dry_run: a resumed run applies the plan saved in the journal, and a dry run would compute a new one.")
             # Get token from the authentication context
             token = self._auth.get_token()
             self._crud.set_token(token)
@@ -531,37 +1074,441 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
             if not collection_id:
                 # If collection_id is not provided, get the collections to find the id
                 collection_id = self.get_collection_id(collection_name)
-            
+
+            journal = None
+            if (journal_dir or resume) and not dry_run:
+                if not journal_dir:
+                    raise ValueError("journal_dir must be provided to resume a run.")
+                journal = SyncJournal(journal_dir, resume)
+                if force:
+                    journal.discard()
+                elif resume and not journal.exists():
+                    raise ValueError(f"The run '{resume}' was not found in the journal '{journal_dir}'.")
+
+            if journal is not None and journal.exists():
+                # Resume from the plan saved in the journal, without downloading and comparing again
+                with self._tracer.span("journal", action="load"):
+                    plan = journal.load_plan()
+                df_to_update = plan.shard()
+                sync_plan = plan.manifest["sync_plan"]
+                collection_id = plan.manifest["collection_id"]
+                logger.info("Retomando la ejecución %s", journal.run_id)
+            else:
+                if row_hash and not dry_run:
+                    self._crear_columna_huella(collection_id, row_hash)
+                # Download the collection, compare it with the DataFrame and build the payloads
+                df_to_update, sync_plan = self._calcular_plan(data, pk, collection_id, delete, insert, delete_duplicates and not dry_run, strategy,
+                                                              memory_budget=memory_budget, lazy_payloads=journal is None and not dry_run, diff_workers=diff_workers,
+                                                              diff_backend=diff_backend, pk_encoding=pk_encoding, chunksize=chunksize, lookup=lookup, row_hash=row_hash,
+                                                              allow_full_replace=allow_full_replace)
+                if journal is not None:
+                    # Write-ahead: the plan is saved before the first write
+                    with self._tracer.span("journal", action="save"):
+                        journal.save_plan(df_to_update, {"collection_id": collection_id, "pk": pk, "sync_plan": sync_plan, "truncated": False})
+
+            span = self._tracer.current()
+            if span is not None:
+                span.set_attribute("collection_id", collection_id)
+                span.set_attribute("strategy", sync_plan["strategy"])
+                span.set_attribute("dry_run", dry_run)
+
+            if sync_plan["strategy"] == "full_replace" and not dry_run and not (journal is not None and journal.manifest.get("truncated")):
+                # Empty the collection before inserting every row of the DataFrame
+                collection_id = self.truncate_collection(collection_id=collection_id)
+                sync_plan["collection_id"] = collection_id
+                if journal is not None:
+                    journal.update_manifest(collection_id=collection_id, sync_plan=sync_plan, truncated=True)
+
+            # Get the time elapsed for transforming the data
+            tiempo_transformacion_datos = (time() - start_time)
+            tiempo_transformacion_datos = segundos_a_horas_minutos_segundos(tiempo_transformacion_datos)
+
+            if dry_run:
+                # Return the plan and the estimates without writing anything
+                df_to_update.attrs['sync_plan'] = sync_plan
+                df_to_update.attrs['dry_run'] = self._estimar_dry_run(df_to_update, sync_plan, delete, insert)
+                logger.info("Dry run --> %s requests, tiempo estimado %s (p95 %s)", df_to_update.attrs['dry_run']['requests'],
+                            df_to_update.attrs['dry_run']['duration'], df_to_update.attrs['dry_run']['duration_p95'])
+                return df_to_update
+
+            policy = self._politica_errores(error_policy, collection_id)
+            # The hashed PK can not be looked up later, so only the text PK keeps the index current
+            key_index = self._indice_llaves(collection_id) if sync_plan.get("pk_encoding", "text") == "text" else None
+            if key_index is not None and key_index.pk not in ([], pk) and sync_plan["strategy"] != "full_replace":
+                # An index built with another key is left as it is
+                key_index = None
+            if key_index is not None and sync_plan["strategy"] == "full_replace":
+                key_index.rebuild(pd.Series(dtype=str), pd.Series(dtype=str), pk)
+            if journal is None and not isinstance(df_to_update, pd.DataFrame):
+                # Plan of data read by blocks: each block is applied as it comes out of the merge
+                df_to_update = self._aplicar_bloques(df_to_update, collection_id, tiempo_transformacion_datos, policy, key_index, sync_plan)
+            elif journal is None:
+                df_to_update['status_code'] = self._aplicar_cambios(df_to_update, collection_id, tiempo_transformacion_datos, policy=policy, key_index=key_index,
+                                                                    payload_columns=sync_plan.get("payload_columns"))
+            else:
+                # Skip the operations already confirmed in the journal
+                completed = journal.completed()
+                pending = ~df_to_update.index.isin(list(completed))
+                df_to_update['status_code'] = df_to_update.index.map(completed)
+                try:
+                    df_to_update.loc[pending, 'status_code'] = self._aplicar_cambios(df_to_update[pending], collection_id, tiempo_transformacion_datos, journal=journal, policy=policy, key_index=key_index)
+                finally:
+                    journal.close()
+                df_to_update['status_code'] = df_to_update['status_code'].astype(int)
+                df_to_update.attrs['run_id'] = journal.run_id
+
+            df_to_update.attrs['sync_plan'] = sync_plan
+            df_to_update = self._resumen_escritura(df_to_update, policy)
+                          
+        else:
+            raise ValueError("Collection name or ID must be provided.")
+        
+        return df_to_update
+
+    ##############################################################################
+    ### Insertar o actualizar pocos registros con el índice de llaves
+    ##############################################################################
+    @check_type_args
+    @traced("upsert_items")
+    @profiled
+    def upsert_items(self, data: pd.DataFrame, pk: List[str], collection_name: str = "", collection_id: str = "", error_policy: ErrorPolicy | None = None) -> pd.DataFrame:
+        """
+        Método para insertar o actualizar unos pocos registros de una lista sin descargarla: el id de cada registro se busca por su PK en el índice de llaves (ver `set_key_index` y `KeyIndex`)
+        y solo se envían las solicitudes necesarias, un PATCH por cada registro que ya existe y un POST por cada uno nuevo. Sirve para cambios puntuales sobre listas grandes, donde `update_collection` tardaría minutos descargando la lista.
+        Los registros que no están en el índice se buscan en la lista con $filter por las columnas de la PK, varias llaves por solicitud en lotes $batch, antes de insertarlos, así un elemento creado por fuera no se duplica; lo que se encuentra queda en el índice.
+        No se eliminan elementos ni se compara con los valores actuales: cada PATCH lleva todos los campos del registro.
+
+        Args:
+            data (pd.DataFrame): Registros a insertar o actualizar, con las columnas de la PK y las columnas a enviar. Si una PK está repetida se usa el último registro.
+            pk (List[str]): Columnas de la clave primaria. Deben ser columnas de la lista y las mismas con las que se construyó el índice.
+            collection_name (str, optional): Nombre de la colección (lista) de SharePoint.
+            collection_id (str, optional): ID de la colección (lista) de SharePoint.
+            error_policy (ErrorPolicy, optional): Qué hacer cuando falla una escritura. Ver `update_collection` y `ErrorPolicy`.
+
+        Returns:
+            pd.DataFrame: Los registros con la PK como índice, index_sharepoint, action_type ('I' o 'U') y status_code. En `attrs['key_index']` queda cuántos se encontraron en el índice y cuántos en la lista.
+                En `attrs['write_summary']` quedan los conteos por acción, o solo el resumen si la política tiene summary_only.
+
+        Raises:
+            ValueError: Si no se proporciona ni el nombre ni el ID de la colección, si el índice de llaves no está activo, si las columnas de la PK no están en data o en la lista, si el índice se construyó con otra PK, o si hay llaves que no están en el índice y la PK tiene columnas de fecha (no se pueden buscar en la lista, ver `_buscar_por_llaves`).
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            list_sharepoint.set_key_index("/data/key_index")
+            cambios = pd.DataFrame({"Documento": ["doc1", "doc9"], "Telefono": ["555", "777"]})
+            result = list_sharepoint.upsert_items(data=cambios, pk=["Documento"], collection_name="My Collection")
+            print(result[["action_type", "status_code"]])
+        """
+
+        if not (collection_id or collection_name):
+            raise ValueError("Collection name or ID must be provided.")
+        if not self._key_index_dir:
+            raise ValueError("The key index is not enabled. Call set_key_index before upsert_items.")
+        if not set(pk).issubset(data.columns):
+            raise ValueError(f"The following key columns were not found in the DataFrame: {list(set(pk) - set(data.columns))}")
+
+        # Get token from the authentication context
+        token = self._auth.get_token()
+        self._crud.set_token(token)
+        if not collection_id:
+            # If collection_id is not provided, get the collections to find the id
+            collection_id = self.get_collection_id(collection_name)
+
+        key_index = self._indice_llaves(collection_id)
+        key_index.check_pk(pk)
+
+        with self._tracer.span("metadata"):
+            data_col_columns = self.get_fields(collection_id=collection_id)
+            if not set(pk).issubset(data_col_columns['name']):
+                raise ValueError(f"The following key columns were not found in the collection: {list(set(pk) - set(data_col_columns['name']))}")
+            columns_to_insert = compare_columns(list(data.columns.values), data_col_columns['name'].tolist())
+            data_col_columns = data_col_columns[data_col_columns['name'].isin(columns_to_insert)]
+
+        with self._tracer.span("lookup") as span:
+            # Same key as update_collection, so the index built by a full download is found here
+            column_types = dict(zip(data_col_columns['name'], data_col_columns['dataType']))
+            data = normalizar_valores(quitar_decimales_pk(data.copy(deep=False), pk), {col: column_types[col] for col in pk})
+            data = crear_pk(data, pk)
+            data = data[~data.index.duplicated(keep="last")]
+
+            item_ids = key_index.lookup(data.index.tolist())
+            faltantes = data[~data.index.isin(list(item_ids))]
+            encontrados = {}
+            if not faltantes.empty:
+                df_items = normalizar_valores(quitar_decimales_pk(self._buscar_por_llaves(collection_id, faltantes, pk, data_col_columns), pk), {col: column_types[col] for col in pk})
+                df_items = df_items[df_items['index_sharepoint'] != ""]
+                encontrados = dict(zip(codificar_pk(df_items, pk), df_items['index_sharepoint']))
+            key_index.update(encontrados)
+            item_ids.update(encontrados)
+            span.set_attribute("index_hits", len(item_ids) - len(encontrados))
+            span.set_attribute("list_lookups", faltantes.shape[0])
+
+        data['index_sharepoint'] = data.index.map(item_ids).fillna("")
+        data['action_type'] = np.where(data['index_sharepoint'] != "", "U", "I")
+        logger.info("Upsert en la lista %s: %s en el índice, %s encontrados en la lista, %s nuevos", collection_id,
+                    len(item_ids) - len(encontrados), len(encontrados), faltantes.shape[0] - len(encontrados))
+
+        policy = self._politica_errores(error_policy, collection_id)
+        data['status_code'] = self._aplicar_cambios(data, collection_id, "00:00:00", policy=policy, key_index=key_index,
+                                                    payload_columns=data_col_columns.to_dict("records"))
+        data.attrs['key_index'] = {"index_hits": len(item_ids) - len(encontrados), "found_in_list": len(encontrados), "path": key_index.path}
+
+        return self._resumen_escritura(data, policy)
+
+    ##############################################################################
+    ### Calcular el plan de actualización de una colección y guardarlo en disco
+    ##############################################################################
+    @check_type_args
+    @traced("plan_update")
+    @profiled
+    def plan_update(self, data: pd.DataFrame, pk: List[str], path: str, collection_name: str = "", collection_id: str = "", delete: bool = True, insert: bool = True, delete_duplicates: bool = False, strategy: str = "auto", diff_workers: int = 1, diff_backend: str = "auto", pk_encoding: str = "text") -> Dict[str, Any]:
+        """
+        Método para calcular el plan de actualización de una colección (lo mismo que hace `update_collection` antes de escribir) y guardarlo en disco, sin hacer ninguna escritura en la lista.
+        El plan se puede aplicar después con `apply_plan`, repartido en varias porciones (shards) entre procesos o máquinas.
+        Como el plan se reparte, la estrategia full_replace no está disponible: vaciar la lista tiene que pasar una sola vez antes de las inserciones.
+
+        Args:
+            data (pd.DataFrame): DataFrame con los datos que se quieren llevar a la colección. Ver `update_collection`.
+            pk (List[str]): Lista de nombres de las columnas que se utilizarán como clave primaria.
+            path (str): Carpeta donde se guarda el plan (operations.parquet y manifest.json).
+            collection_name (str, optional): Nombre de la colección (lista) de SharePoint.
+            collection_id (str, optional): ID de la colección (lista) de SharePoint.
+            delete (bool, optional): Si es True, el plan elimina los elementos que están en SharePoint pero no en el DataFrame. Por defecto es True.
+            insert (bool, optional): Si es True, el plan inserta los elementos que están en el DataFrame pero no en SharePoint. Por defecto es True.
+            delete_duplicates (bool, optional): Si es True, elimina los duplicados de la colección antes de calcular el plan. Por defecto es False.
+            strategy (str, optional): "auto", "incremental" o "targeted_upsert". Por defecto es "auto".
+            diff_workers (int, optional): Procesos que hacen la comparación en paralelo. Ver `update_collection`. Por defecto 1.
+            diff_backend (str, optional): Motor de la comparación. Ver `update_collection`. Por defecto "auto".
+            pk_encoding (str, optional): "text" o "hash". Ver `update_collection`. Por defecto "text".
+
+        Returns:
+            Dict[str, Any]: Manifest del plan guardado, con el id de la colección, la estrategia, los conteos por acción y la ruta del plan.
+
+        Raises:
+            ValueError: Si no se proporciona ni el nombre ni el ID de la colección, o si la estrategia, el motor de comparación o el formato de la PK no están disponibles.
+
+        Ejemplo:
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            manifest = list_sharepoint.plan_update(data=data, pk=["Documento"], path="/shared/plan_clientes", collection_name="My Collection")
+            print(manifest["counts"])
+        """
+
+        if collection_id or collection_name:
+            # Get token from the authentication context
+            token = self._auth.get_token()
+            self._crud.set_token(token)
+            if not collection_id:
+                # If collection_id is not provided, get the collections to find the id
+                collection_id = self.get_collection_id(collection_name)
+
+            df_to_update, sync_plan = self._calcular_plan(data, pk, collection_id, delete, insert, delete_duplicates, strategy, ["incremental", "targeted_upsert"],
+                                                          diff_workers=diff_workers, diff_backend=diff_backend, pk_encoding=pk_encoding)
+
+            plan = SyncPlan(operations=df_to_update, manifest={"collection_id": collection_id, "pk": pk, "sync_plan": sync_plan})
+            plan.save(path)
+            manifest = {**plan.manifest, "path": path}
+
+        else:
+            raise ValueError("Collection name or ID must be provided.")
+
+        return manifest
+
+    ##############################################################################
+    ### Aplicar un plan (o una porción del plan) guardado en disco
+    ##############################################################################
+    @check_type_args
+    @traced("apply_plan")
+    @profiled
+    def apply_plan(self, path: str, shard: int = 0, of: int = 1, requests_per_second: float = 0.0, error_policy: ErrorPolicy | None = None) -> pd.DataFrame:
+        """
+        Método para aplicar en la colección un plan guardado con `plan_update`, o solo una porción del plan.
+        Cada proceso toma una porción disjunta (shard de of) y todos comparten el presupuesto de solicitudes por segundo, que se guarda en la carpeta del plan.
+
+        Args:
+            path (str): Carpeta donde está guardado el plan.
+            shard (int, optional): Número de la porción que aplica este proceso, empieza en 0. Por defecto 0.
+            of (int, optional): Cantidad total de porciones. Por defecto 1, es decir todo el plan.
+            requests_per_second (float, optional): Presupuesto de solicitudes por segundo para todos los procesos que aplican el plan. Debe ser float (por ejemplo 20.0). Si es 0 no se limita. Por defecto 0.
+            error_policy (ErrorPolicy, optional): Qué hacer cuando falla una escritura. Ver `update_collection` y `ErrorPolicy`. Cada proceso debe usar su propio archivo de dead letter.
+
+        Returns:
+            pd.DataFrame: DataFrame con las operaciones aplicadas (action_type, index_sharepoint, json_post) y el código de estado de cada solicitud.
+
+        Raises:
+            ValueError: Si no se encuentra el plan o si la porción no es válida.
+
+        Ejemplo:
+            # En cada uno de los 4 procesos
+            list_sharepoint = ListSharepoint(crud=crud, auth=auth)
+            result = list_sharepoint.apply_plan(path="/shared/plan_clientes", shard=worker_id, of=4, requests_per_second=20.0)
+            print(result)
+        """
+
+        plan = SyncPlan.load(path)
+        df_to_update = plan.shard(shard, of)
+
+        # Get token from the authentication context
+        token = self._auth.get_token()
+        self._crud.set_token(token)
+
+        limiter = SharedRateLimiter(path=os.path.join(path, "rate_limit.budget"), requests_per_second=requests_per_second)
+        policy = self._politica_errores(error_policy, plan.manifest["collection_id"])
+        df_to_update['status_code'] = self._aplicar_cambios(df_to_update, plan.manifest["collection_id"], "00:00:00", limiter, policy=policy)
+        df_to_update.attrs['sync_plan'] = plan.manifest.get("sync_plan", {})
+
+        return self._resumen_escritura(df_to_update, policy)
+
+    def _calcular_plan(self, data: pd.DataFrame | str | Iterator[pd.DataFrame], pk: List[str], collection_id: str, delete: bool, insert: bool, delete_duplicates: bool, strategy: str, strategies: List[str] = [], memory_budget: int = 0, lazy_payloads: bool = False, diff_workers: int = 1, diff_backend: str = "auto", pk_encoding: str = "text", chunksize: int = 100000, lookup: str = "download", row_hash: str = "", allow_full_replace: bool = False) -> tuple[pd.DataFrame | Iterator[pd.DataFrame], Dict[str, Any]]:
+        """
+        Descarga la colección, la compara con el DataFrame y construye el plan: un DataFrame con action_type, index_sharepoint y json_post por registro, y el diccionario con la estrategia escogida.
+        Si la estrategia escogida es full_replace el plan son todos los registros del DataFrame marcados con 'I', pero la colección no se vacía aquí.
+        Cada fase (metadata, download, dedupe, pk_normalization, diff, planning, payload) queda medida en un tramo del tracer.
+        Con memory_budget la comparación se hace por particiones si no cabe en el presupuesto. Si lazy_payloads es True no se crea la columna json_post: `_aplicar_cambios` construye los JSON por bloques con las columnas guardadas en sync_plan['payload_columns'].
+        El DataFrame data no se modifica, los pasos trabajan sobre una copia superficial.
+        Con diff_workers distinto de 1 la comparación de las particiones se reparte en un pool de procesos. El motor de la comparación se escoge con `_motor_diff`.
+        Los valores se comparan según el tipo de dato de cada columna en la lista (ver `normalizar_valores`), así 30 y 30.0, " Juan" y "Juan" o la misma hora en otra zona horaria no generan actualizaciones.
+        Si data es un archivo o un iterador el plan se calcula con `_calcular_plan_por_bloques`, sin juntar la lista ni data en memoria: solo el primer bloque se usa para las columnas y full_replace queda descartada.
+        En ese caso, con lazy_payloads, el plan que se devuelve es un iterador de bloques y no un DataFrame.
+        Con lookup "filter" no se descarga la lista: solo se buscan las llaves de data con `_buscar_por_llaves` y el plan no tiene eliminaciones; es la única lectura de la estrategia targeted_upsert.
+        Con lookup "auto" la lectura se decide antes de leer con `_planear_lectura` cuando targeted_upsert puede aplicar; después de una descarga completa targeted_upsert ya no se ofrece.
+        La descarga (o la búsqueda por llaves) solo trae las columnas de la lista que están en data, como las calcula `compare_columns`: en una lista ancha no viajan ni se comparan las columnas que el DataFrame no toca.
+        Con row_hash solo se traen la PK y la huella guardada; la comparación es de la PK y la huella, y a los registros que cambiaron se les vuelven a poner las columnas de data con `_completar_con_datos`.
+        """
+
+        if diff_backend != "auto" and diff_backend not in self._diff_backends:
+            raise ValueError(f"The diff backend '{diff_backend}' is not available. Use 'auto' or one of {list(self._diff_backends)}.")
+        if pk_encoding not in ("text", "hash"):
+            raise ValueError(f"The PK encoding '{pk_encoding}' is not available. Use 'text' or 'hash'.")
+        if lookup not in ("auto", "download", "filter"):
+            raise ValueError(f"The lookup '{lookup}' is not available. Use 'auto', 'download' or 'filter'.")
+        if row_hash and not isinstance(data, pd.DataFrame):
+            raise ValueError("The row hash needs data as a DataFrame: the rows whose hash changed are taken back from it to build the payloads.")
+        if row_hash and row_hash in data.columns:
+            raise ValueError(f"The column '{row_hash}' holds the row hash written by update_collection, it can not come in data.")
+        filtrable = isinstance(data, pd.DataFrame) and not delete
+        if lookup == "filter" or strategy == "targeted_upsert":
+            # targeted_upsert is the sync that reads the list by keys
+            if not filtrable:
+                raise ValueError("The lookup 'filter' only reads the keys of a DataFrame, so it can not find the items to delete. Use delete=False or lookup='download'.")
+            if lookup == "download" or strategy not in ("auto", "targeted_upsert"):
+                raise ValueError(f"The lookup '{lookup}' does not go with the strategy '{strategy}': 'targeted_upsert' reads the list with lookup 'filter' and the other strategies download it.")
+            lookup = "filter"
+        # The planner decides the read before reading when targeted_upsert can apply
+        planear_lectura = lookup == "auto" and filtrable and not delete_duplicates and strategy == "auto" and (not strategies or "targeted_upsert" in strategies)
+        if lookup == "auto":
+            lookup = "download"
+
+        bloques = None
+        if isinstance(data, pd.DataFrame):
+            # crear_pk and the diff add columns to data; a shallow copy keeps the caller's DataFrame untouched
+            data = data.copy(deep=False)
+        else:
+            # A file or an iterator: the first block gives the columns and the blocks are compared on disk
+            bloques = leer_por_bloques(data, chunksize)
+            data = next(bloques, pd.DataFrame())
+            strategies = [name for name in (strategies or SyncPlanner.STRATEGIES) if name != "full_replace"]
+            if diff_backend not in ("auto", "sorted_merge"):
+                logger.warning("Input read by blocks is always compared with the 'sorted_merge' backend, not '%s'.", diff_backend)
+            if pk_encoding == "hash":
+                logger.warning("The hashed PK can not be checked for collisions on input read by blocks; using the text PK.")
+                pk_encoding = "text"
+
+        with self._tracer.span("metadata"):
             data_col_columns = self.get_fields(collection_id=collection_id)
-            print(f"Columns: \n{data_col_columns}")
+            logger.debug("Columnas de la lista: %s", DataFrameSummary(data_col_columns, rows=len(data_col_columns)))
             list_col_name = data_col_columns['name'].tolist()  # Name of the columns, like you see on Sharepoint (Documento, Telefono, etc.)
             list_col_data = list(data.columns.values)  # Name of the columns in the DataFrame
 
             columns_to_insert = compare_columns(list_col_data, list_col_name)  # Compare the columns of the DataFrame with the columns of the collection
 
+            columna_huella = data_col_columns[data_col_columns['name'] == row_hash]
             data_col_columns = data_col_columns[data_col_columns['name'].isin(columns_to_insert)]  # Select the columns to insert from the DataFrame
-
-            # Get de items from the collection
-            df_col_items = self.get_items(collection_id=collection_id)
-
-
+            # Columns read from the list: with the row hash only the key and the stored hash
+            columnas_lectura = pd.concat([data_col_columns[data_col_columns['name'].isin(pk)], columna_huella]) if row_hash else data_col_columns
+
+        if bloques is not None:
+            # Both sides are spilled to disk as they arrive and the plan comes out by blocks
+            return self._calcular_plan_por_bloques(data, bloques, pk, collection_id, data_col_columns, delete, insert, delete_duplicates, strategy, strategies,
+                                                   memory_budget, lazy_payloads, chunksize, allow_full_replace)
+
+        pre_plan, items_muestra = None, None
+        # Keys with date columns can not be searched with $filter (see _buscar_por_llaves), so the list is downloaded
+        pk_con_fechas = data_col_columns.loc[data_col_columns['name'].isin(pk), 'dataType'].isin(["date", "datetime"]).any()
+        if planear_lectura and set(pk).issubset(data_col_columns['name']) and not pk_con_fechas:
+            with self._tracer.span("sampling") as span:
+                pre_plan, items_muestra = self._planear_lectura(collection_id, data, pk, data_col_columns, columnas_lectura, insert, row_hash)
+                if pre_plan is not None:
+                    lookup = "filter" if pre_plan["strategy"] == "targeted_upsert" else "download"
+                    span.set_attribute("sample_size", pre_plan["sample_size"])
+                    logger.info("%s", pre_plan["explanation"])
+                span.set_attribute("lookup", lookup)
+        # After a full download targeted_upsert would only be a label for incremental
+        strategies = ["targeted_upsert"] if lookup == "filter" else [name for name in (strategies or SyncPlanner.STRATEGIES) if name != "targeted_upsert"]
+
+        with self._tracer.span("download") as span:
+            span.set_attribute("lookup", lookup)
+            if lookup == "filter":
+                # Only the items of the keys in data
+                if not set(pk).issubset(data_col_columns['name']):
+                    raise ValueError(f"The following key columns were not found in the collection: {list(set(pk) - set(data_col_columns['name']))}")
+                # The sample of the planner is reused when it was all of data
+                df_col_items = items_muestra if items_muestra is not None else self._buscar_por_llaves(collection_id, data, pk, columnas_lectura)
+            else:
+                # Get de items from the collection, only with the columns of data (the PK is one of them)
+                df_col_items = self.get_items(collection_id=collection_id, query=ItemQuery().select(columnas_lectura['name'].tolist()))
+            span.set_attribute("rows", len(df_col_items))
+            span.set_attribute("columns", columnas_lectura.shape[0])
+
+        if row_hash:
+            if columna_huella.empty:
+                # Dry run before the column is created: no item has a hash yet
+                columna_huella = pd.DataFrame([{"name_id": row_hash, "name": row_hash, "column_id": "", "dataType": "str", "indexed": False}])
+                df_col_items[row_hash] = ""
+            # The hash is written with every insert and update
+            data_col_columns = pd.concat([data_col_columns, columna_huella], ignore_index=True)
+
+        with self._tracer.span("dedupe"):
             # delete duplicates in the collection items and df items
             df_col_items = self.quitar_duplicados_en_collections(df_col_items, pk, collection_id, delete_duplicates)
             data = quitar_duplicados_df(data, pk= pk)
 
-            print('''
-                ---------------------------------------------------------------------------------------------------
-                                    Cambiando tipo_dato de la lista para comparar y hacer merge
-                ---------------------------------------------------------------------------------------------------''')
-            
+        with self._tracer.span("pk_normalization") as span:
             # Convert the columns to string to avoid type errors when merging
             df_col_items = quitar_decimales_pk(df_col_items, pk)
             data = quitar_decimales_pk(data, pk)
+
+            # The key columns are compared by their type too, so 7 and 7.0 are the same item
+            column_types = dict(zip(data_col_columns['name'], data_col_columns['dataType']))
+            pk_types = {col: column_types[col] for col in pk if col in column_types}
+            df_col_items = normalizar_valores(df_col_items, pk_types)
+            data = normalizar_valores(data, pk_types)
+            if row_hash:
+                # Fingerprint of the synced columns, compared with the one stored in the list
+                data[row_hash] = huella_registros(data, {col: data_type for col, data_type in column_types.items() if col != row_hash})
+
+            key_index = self._indice_llaves(collection_id)
+            if key_index is not None and set(pk).issubset(df_col_items.columns):
+                if lookup == "filter":
+                    # The items found by key are fresh entries of the index, if it was built with the same key
+                    if key_index.pk in ([], pk):
+                        key_index.check_pk(pk)
+                        key_index.update(dict(zip(codificar_pk(df_col_items, pk), df_col_items['index_sharepoint'])))
+                else:
+                    # The full download is the cheapest moment to refresh the key index
+                    key_index.rebuild(codificar_pk(df_col_items, pk), df_col_items['index_sharepoint'], pk)
             
+            if pk_encoding == "hash" and set(pk).issubset(df_col_items.columns) and not pk_hash_sin_colisiones([df_col_items, data], pk):
+                logger.warning("The hashed PK has collisions between the collection and the DataFrame; using the text PK.")
+                pk_encoding = "text"
+            span.set_attribute("pk_encoding", pk_encoding)
+
             # Create a new column 'PK' in both dataframes to merge them
-            df_col_items = crear_pk(df_col_items, pk)
-            data = crear_pk(data, pk)
+            df_col_items = crear_pk(df_col_items, pk, pk_encoding)
+            data = crear_pk(data, pk, pk_encoding)
 
+        backend = None
+        rows_source = data.shape[0]
+        with self._tracer.span("diff") as span:
             if df_col_items.empty:
                 data['index_sharepoint'] = ""
                 data['action_type']= 'I'
@@ -576,98 +1523,655 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
                             left_index=True,
                             right_index=True
                         )
-                        df_to_update = compare_dataframe(df_col_items, data, delete, insert)
+                        # With the row hash only the key and the hash are compared
+                        comparados = data[pk + [row_hash, 'index_sharepoint']] if row_hash else data
+                        backend = self._motor_diff(df_col_items, comparados, diff_backend, memory_budget, diff_workers)
+                        span.set_attribute("backend", backend.name)
+                        df_to_update = backend.compare(df_col_items, comparados, delete, insert, column_types)
+                        if row_hash:
+                            df_to_update = self._completar_con_datos(df_to_update, data)
+                        if isinstance(backend, PandasDiffBackend):
+                            span.set_attribute("partitions", backend.partitions)
+                            span.set_attribute("workers", backend.workers)
+                        elif isinstance(backend, SortedMergeDiffBackend):
+                            span.set_attribute("runs", backend.stats.get("runs", 0))
 
-                            
                     except Exception as e:
                         raise ValueError(f"Error while merging data frames: {e}")
                     
                 else:
                     missing = set(pk) - set(df_col_items.columns)
                     raise ValueError(f"The following key columns were not found in the SharePoint Dataframe: {list(missing)}")  
-                    
-            print(data)
-            print(df_col_items)
 
-            df_to_update['json_post'] = df_to_update.apply(lambda x: construir_json(x, data_col_columns), axis=1)
+            span.set_attribute("rows", len(df_to_update))
+                
+        logger.debug("DataFrame de origen: %s", DataFrameSummary(data))
+        logger.debug("Items de la lista: %s", DataFrameSummary(df_col_items))
+
+        with self._tracer.span("planning") as span:
+            # Choose the cheapest strategy to apply the diff
+            sync_plan = self._planear_sincronizacion(rows_source, df_col_items.shape[0], df_to_update["action_type"].value_counts().to_dict(), delete, insert,
+                                                     pre_plan["strategy"] if pre_plan else strategy, strategies, allow_full_replace)
+            if pre_plan is not None:
+                # The choice was made before reading, with the counts estimated from the sample
+                sync_plan.update(requested=strategy, explanation=pre_plan["explanation"], estimate={key: pre_plan[key] for key in ("counts", "costs", "sample_size")})
+            logger.info("%s", sync_plan["explanation"])
+
+            if sync_plan["strategy"] == "full_replace":
+                # Every row of the DataFrame is inserted in the emptied collection
+                df_to_update = data.drop(columns=['index_sharepoint'], errors='ignore').assign(index_sharepoint="", action_type="I")
+
+            sync_plan["collection_id"] = collection_id
+            sync_plan["diff_backend"] = backend.name if backend is not None else ""
+            sync_plan["pk_encoding"] = pk_encoding
+            sync_plan["lookup"] = lookup
+            sync_plan["row_hash"] = row_hash
+            span.set_attribute("strategy", sync_plan["strategy"])
+
+        with self._tracer.span("payload", rows=len(df_to_update)) as span:
+            lazy = lazy_payloads
+            if memory_budget:
+                sync_plan["memory"] = {"budget_mb": memory_budget, "diff_partitions": getattr(backend, "partitions", 0), "lazy_payloads": lazy}
+            if lazy:
+                # The payloads are built block by block while applying the plan
+                sync_plan["payload_columns"] = data_col_columns.to_dict("records")
+                span.set_attribute("lazy", True)
+            else:
+                df_to_update['json_post'] = self._construir_payloads(df_to_update, data_col_columns)
 
-            num_rows = df_to_update.shape[0] #Get the number of rows
+        return df_to_update, sync_plan
 
-            # get the number of rows to update
-            df_to_updt = df_to_update[df_to_update["action_type"] == "U"]
-            num_rows_to_update = df_to_updt.shape[0]
+    def _calcular_plan_por_bloques(self, data: pd.DataFrame, bloques: Iterator[pd.DataFrame], pk: List[str], collection_id: str, data_col_columns: pd.DataFrame, delete: bool, insert: bool, delete_duplicates: bool, strategy: str, strategies: List[str], memory_budget: int, lazy_payloads: bool, chunksize: int, allow_full_replace: bool) -> tuple[pd.DataFrame | Iterator[pd.DataFrame], Dict[str, Any]]:
+        """
+        Calcula el plan cuando data es un archivo o un iterador (data es su primer bloque), sin que la memoria dependa del tamaño de la lista ni de data:
+        las páginas de la lista (ver `_paginas_items`) y los bloques de data se vuelcan en corridas ordenadas de `SortedMergeDiff` a medida que llegan, con la PK ya normalizada,
+        y el índice de llaves se llena página a página. La comparación se recorre dos veces: `SortedMergeDiff.count` para escoger la estrategia y `SortedMergeDiff.diff` para entregar el plan.
+        Con lazy_payloads el plan es un iterador de bloques de hasta chunksize filas que `update_collection` aplica a medida que salen de la mezcla, y las corridas se borran al terminar de recorrerlo.
+        Sin lazy_payloads (journal o dry_run) los bloques se juntan en un DataFrame con json_post, porque el plan se guarda o se devuelve completo.
+        Los items con la PK repetida en la lista se comparan con el primero; con delete_duplicates los demás se eliminan antes de escribir.
+        """
 
-            # get the number of rows to insert
-            df_to_add = df_to_update[df_to_update["action_type"] == "I"]
-            num_rows_to_add = df_to_add.shape[0]
+        if not set(pk).issubset(data_col_columns['name']):
+            raise ValueError(f"The following key columns were not found in the SharePoint Dataframe: {list(set(pk) - set(data_col_columns['name']))}")
+
+        column_types = dict(zip(data_col_columns['name'], data_col_columns['dataType']))
+        pk_types = {col: column_types[col] for col in pk}
+        diff = SortedMergeDiff(run_rows=chunksize, delete=delete, insert=insert, column_types=column_types)
+        entregado = False
+
+        try:
+            with self._tracer.span("download") as span:
+                span.set_attribute("lookup", "download")
+                key_index = self._indice_llaves(collection_id)
+                if key_index is not None:
+                    # Emptied first and filled page by page, the full download refreshes it
+                    key_index.rebuild(pd.Series(dtype=str), pd.Series(dtype=str), pk)
+
+                def agregar_items(registros: List[Dict[str, Any]], ids: List[str]) -> None:
+                    items = normalizar_valores(quitar_decimales_pk(self._items_a_df(registros, ids, data_col_columns), pk), pk_types)
+                    if key_index is not None:
+                        key_index.update(dict(zip(codificar_pk(items, pk), items['index_sharepoint'])))
+                    diff.add_web(crear_pk(items, pk))
+
+                # The pages are grouped in blocks of chunksize items, only one block is in memory
+                registros, ids = [], []
+                for dict_items, ids_items in self._paginas_items(collection_id, data_col_columns):
+                    registros += dict_items
+                    ids += ids_items
+                    if len(registros) >= chunksize:
+                        agregar_items(registros, ids)
+                        registros, ids = [], []
+                if registros:
+                    agregar_items(registros, ids)
+                if not diff.stats["web_rows"]:
+                    # Without items the columns of the data are the ones compared, so every row is inserted with all of them
+                    diff.add_web(pd.DataFrame(columns=[col for col in data.columns if col != "index_sharepoint"] + ["index_sharepoint"]))
+                span.set_attribute("rows", diff.stats["web_rows"])
+                span.set_attribute("columns", data_col_columns.shape[0])
+
+            with self._tracer.span("diff") as span:
+                span.set_attribute("backend", "sorted_merge")
+                for num_bloque, bloque in enumerate(chain([data], bloques), start=1):
+                    bloque = normalizar_valores(quitar_decimales_pk(bloque.drop(columns=["index_sharepoint"], errors="ignore"), pk), pk_types)
+                    diff.add_source(crear_pk(bloque, pk))
+                    logger.debug("Bloque %s comparado: %s filas", num_bloque, bloque.shape[0])
+                # First pass only counts; the plan comes out of a second pass
+                action_counts = diff.count()
+                span.set_attribute("runs", diff.stats["runs"])
+                span.set_attribute("rows", sum(action_counts.values()))
+
+            with self._tracer.span("dedupe") as span:
+                span.set_attribute("duplicates", len(diff.web_duplicates))
+                if delete_duplicates and diff.web_duplicates:
+                    logger.info("Deleting %s duplicated items from the collection %s", len(diff.web_duplicates), collection_id)
+                    self.delete_items(collection_id=collection_id, id_items=diff.web_duplicates)
+                    if key_index is not None:
+                        key_index.remove(item_ids=diff.web_duplicates)
+
+            with self._tracer.span("planning") as span:
+                sync_plan = self._planear_sincronizacion(diff.stats["source_rows"], diff.stats["web_rows"], action_counts, delete, insert, strategy,
+                                                         [name for name in strategies if name != "targeted_upsert"], allow_full_replace)
+                logger.info("%s", sync_plan["explanation"])
+                sync_plan.update(collection_id=collection_id, diff_backend="sorted_merge", pk_encoding="text", lookup="download", row_hash="")
+                span.set_attribute("strategy", sync_plan["strategy"])
+
+            with self._tracer.span("payload", rows=sum(action_counts.values())) as span:
+                if memory_budget:
+                    sync_plan["memory"] = {"budget_mb": memory_budget, "diff_partitions": 0, "lazy_payloads": lazy_payloads}
+                if lazy_payloads:
+                    # The payloads are built block by block while applying the plan
+                    sync_plan["payload_columns"] = data_col_columns.to_dict("records")
+                    span.set_attribute("lazy", True)
+                    entregado = True
+                    return self._bloques_plan(diff), sync_plan
+
+                df_to_update = diff.compare()
+                df_to_update['json_post'] = self._construir_payloads(df_to_update, data_col_columns)
+        finally:
+            if not entregado:
+                diff.close()
+
+        return df_to_update, sync_plan
+
+    @staticmethod
+    def _bloques_plan(diff: SortedMergeDiff) -> Iterator[pd.DataFrame]:
+        """Entrega los bloques del plan de `SortedMergeDiff.diff` y borra las corridas cuando se termina (o se abandona) el recorrido."""
+
+        try:
+            yield from diff.diff()
+        finally:
+            diff.close()
+
+    def _motor_diff(self, df_col_items: pd.DataFrame, data: pd.DataFrame, diff_backend: str, memory_budget: int, diff_workers: int) -> DiffBackendInterface:
+        """
+        Escoge el motor de la comparación. Con "auto" se compara en pandas, por particiones si no cabe en el presupuesto de memoria y en procesos si se pidieron diff_workers,
+        y si ni las particiones caben se compara en disco con el motor "sorted_merge". Con otro nombre se usa el motor registrado con ese nombre (ver `set_diff_backend`).
+        """
 
-            # get the number of rows to delete
-            df_to_delete = df_to_update[df_to_update["action_type"] == "D"]                    
-            num_rows_to_delete = df_to_delete.shape[0]
+        if diff_backend != "auto":
+            return self._diff_backends[diff_backend]
 
-            # Initialize counters
-            num_rows_updated = 0
-            num_rows_added = 0
-            num_rows_deleted = 0
+        partitions = self._particiones_diff(df_col_items, data, memory_budget)
+        if not partitions:
+            # Not even the partitions fit in the budget: compare sorted runs spilled to disk
+            return self._diff_backends["sorted_merge"]
 
-            # Get the time elapsed for transforming the data
-            tiempo_transformacion_datos = (time() - start_time)
-            tiempo_transformacion_datos = segundos_a_horas_minutos_segundos(tiempo_transformacion_datos)
-            start_time = time()
-            list_status_code = []
+        workers = self._procesos_diff(df_col_items, data, diff_workers)
+
+        # At least one partition per process
+        return PandasDiffBackend(partitions=max(partitions, workers), workers=workers)
+
+    def _particiones_diff(self, df_col_items: pd.DataFrame, data: pd.DataFrame, memory_budget: int) -> int:
+        """
+        Cantidad de particiones para que la comparación quepa en lo que queda del presupuesto de memoria. La comparación hace varias copias de ambos DataFrames (texto y merges), así que se estima en 4 veces su tamaño.
+        Sin presupuesto o si la comparación cabe devuelve 1. Si harían falta más de MAX_DIFF_PARTITIONS particiones devuelve 0: la comparación se hace en disco (ver `SortedMergeDiff`).
+        """
+
+        if not memory_budget:
+            return 1
+
+        estimado = 4 * int(df_col_items.memory_usage(deep=True).sum() + data.memory_usage(deep=True).sum())
+        disponible = MemoryTracker.available(memory_budget)
+
+        if estimado <= disponible:
+            return 1
+
+        if disponible <= 0:
+            logger.warning("The process already uses more than the memory budget (%s MB); comparing on disk.", memory_budget)
+            return 0
+
+        partitions = ceil(estimado / disponible)
+        if partitions > self.MAX_DIFF_PARTITIONS:
+            logger.info("The comparison needs about %s MB and only %s MB are left in the budget; comparing on disk.", estimado // MB, disponible // MB)
+            return 0
+
+        logger.info("The comparison needs about %s MB and %s MB are left in the budget; comparing in %s partitions.", estimado // MB, disponible // MB, partitions)
+
+        return partitions
+
+    def _procesos_diff(self, df_col_items: pd.DataFrame, data: pd.DataFrame, diff_workers: int) -> int:
+        """Cantidad de procesos para comparar en paralelo. Con pocas filas arrancar los procesos cuesta más de lo que se gana, así que se usa 1."""
+
+        workers = diff_workers or os.cpu_count() or 1
+        if workers > 1 and df_col_items.shape[0] + data.shape[0] < self.PARALLEL_DIFF_MIN_ROWS:
+            logger.debug("Only %s rows to compare; comparing without processes.", df_col_items.shape[0] + data.shape[0])
+            return 1
 
-            for num_row_act, row_tuple in enumerate(df_to_update.itertuples(), start=1):
+        return workers
+
+    @traced("apply")
+    def _aplicar_cambios(self, df_to_update: pd.DataFrame | Iterator[pd.DataFrame], collection_id: str, tiempo_transformacion_datos: str, limiter: Any = None, journal: Any = None, payload_columns: List[Dict[str, Any]] | None = None, policy: ErrorPolicy | None = None, key_index: KeyIndex | None = None, action_counts: Dict[str, int] | None = None) -> List[int]:
+        """
+        Aplica en la colección las acciones del plan (I, U, D) registro a registro y devuelve el código de estado de cada solicitud.
+        Si se pasa un limiter (ver `SharedRateLimiter`) se espera el turno antes de cada solicitud, y si se pasa un journal (ver `SyncJournal`) se registra cada escritura confirmada.
+        Cada solicitud pasa por la política de errores (ver `ErrorPolicy`); las que quedan en la cola de reintentos se reintentan al final, antes de devolver los códigos de estado.
+        Si se pasa un key_index (ver `KeyIndex`) las inserciones y eliminaciones confirmadas lo actualizan; el índice del plan debe ser la PK con encoding "text".
+        Si se pasan las columnas de los payloads (plan sin json_post, ver `_calcular_plan`) los JSON se construyen por bloques de `PAYLOAD_CHUNK_SIZE` registros mientras se aplican.
+        El plan también puede ser un iterador de bloques (ver `_calcular_plan_por_bloques`), que se aplican a medida que llegan; en ese caso se pasan los conteos por acción en action_counts
+        y los códigos de estado quedan en el orden de los bloques.
+        """
+
+        if isinstance(df_to_update, pd.DataFrame):
+            # get the number of rows to update, insert and delete
+            action_counts = df_to_update["action_type"].value_counts().to_dict()
+            bloques = [df_to_update]
+        else:
+            bloques = df_to_update
+        num_rows = sum(action_counts.values()) #Get the number of rows
+
+        span = self._tracer.current()
+        if span is not None:
+            span.set_attribute("rows", num_rows)
+            for action, count in action_counts.items():
+                span.set_attribute(action, int(count))
+
+        list_status_code = []
+        policy = policy or self._politica_errores(None, collection_id)
+        self._progress.start("Actualizando", num_rows, to_update=int(action_counts.get("U", 0)), to_add=int(action_counts.get("I", 0)),
+                             to_delete=int(action_counts.get("D", 0)), tiempo_transformacion_datos=tiempo_transformacion_datos)
+
+        num_row_act = 0
+        for bloque in bloques:
+            list_status_code += [0] * bloque.shape[0]
+            for row_tuple in self._filas_con_payload(bloque, payload_columns):
+                num_row_act += 1
                 # Refresh the token every 2000 rows to avoid expiration
                 if num_row_act % 2000 == 0:
-                    print("--------------------- Refrescando conexión--------------------", end='\r')
+                    logger.debug("Refrescando conexión")
                     token = self._auth.get_token()
                     self._crud.set_token(token)
 
+                # Wait for the turn in the shared request budget
+                if limiter is not None:
+                    espera = limiter.acquire()
+                    self._crud.get_metrics().record_throttle_wait({"U": "patch", "I": "post", "D": "delete"}[row_tuple.action_type], collection_id, espera)
+
                 # Get the json to post and the item id
-                value_row_json = str(row_tuple.json_post).replace('/','')
+                value_row_json = str(row_tuple.json_post)
                 item_id = row_tuple.index_sharepoint
 
+                dato_json = ""
                 if row_tuple.action_type == 'U':
                     #Create the URL to update the item
                     url = f"{self._auth.get_url()}/lists/{collection_id}/items/{item_id}/fields"
-                    # Convert the value_row_json to a json format
-                    dato_json = value_row_json.replace('/','')
-                    #json.dumps({"fields": json.loads(value_row_json)})
-                    dato_json = json.dumps(json.loads(dato_json))
-                    # Make the request to update the item
-                    status_code = self._crud.url_patch(url, dato_json)
-                    num_rows_updated += 1
+                    # The payload is parsed inside the request, so a bad one goes through the error policy
+                    dato_json = value_row_json
+                    send = partial(self._enviar_json, self._crud.url_patch, url, dato_json)
                 elif row_tuple.action_type == "I":
                     # Create the URL to insert the item
                     url = f"{self._auth.get_url()}/lists/{collection_id}/items"
-                    # Conver the value_row_json to a json format
-                    dato_json = json.dumps({"fields": json.loads(value_row_json.replace('/',''))})
-                    # Make the request to insert the item
-                    status_code = self._crud.url_posts(url, dato_json)
-                    num_rows_added += 1
+                    dato_json = value_row_json
+                    send = partial(self._enviar_json, self._crud.url_posts, url, dato_json, fields=True)
                 elif row_tuple.action_type == "D":
                     url = f"{self._auth.get_url()}/lists/{collection_id}/items/{item_id}"
-                    status_code = self._crud.url_delete(url)
-                    num_rows_deleted +=1
-
-                tiempo_en_actualizacion = (time() - start_time)
-                tiempo_en_actualizacion = segundos_a_horas_minutos_segundos(tiempo_en_actualizacion)
-                os.system('cls')
-                print(f'''-------------------------------------------------------------------------------------------------
-                        To Update --> {num_rows_to_update}, To Add --> {num_rows_to_add}, To Delete --> {num_rows_to_delete}
-                        Updated --> {num_rows_updated}, Added --> {num_rows_added}, Deleted --> {num_rows_deleted}
-                        Tiempo en tratamiento de datos --> {tiempo_transformacion_datos}
-                        Tiempo transcurrido en actualización --> {tiempo_en_actualizacion}
-                        ------------Actualizando: {round((num_row_act/(num_rows))*100,2)}% ------------''')
-                
-                list_status_code.append(status_code)
+                    send = partial(self._crud.url_delete, url)
 
-            df_to_update['status_code'] = list_status_code
-                          
+                policy.submit(send, partial(self._confirmar, list_status_code, num_row_act - 1, journal=journal, key_index=key_index, pk=str(row_tuple.Index), action=row_tuple.action_type, item_id=str(item_id), counter=row_tuple.action_type),
+                              row_tuple.action_type, pk=str(row_tuple.Index), item_id=str(item_id), payload=dato_json, operation={"U": "patch", "I": "post", "D": "delete"}[row_tuple.action_type])
+
+        self._reintentar_pendientes(policy)
+        self._progress.finish()
+
+        return list_status_code
+
+    def _aplicar_bloques(self, bloques: Iterator[pd.DataFrame], collection_id: str, tiempo_transformacion_datos: str, policy: ErrorPolicy, key_index: KeyIndex | None, sync_plan: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Aplica un plan por bloques (ver `_calcular_plan_por_bloques`) con `_aplicar_cambios`, sin juntar los bloques en memoria.
+        Devuelve un resultado liviano, con la PK como índice y solo index_sharepoint, action_type y status_code de cada operación: las columnas de data y los JSON no se guardan.
+        """
+
+        aplicados = []
+
+        def registrar(bloques: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+            for bloque in bloques:
+                aplicados.append(bloque[['index_sharepoint', 'action_type']])
+                yield bloque
+
+        counts = sync_plan["counts"]
+        action_counts = {action: counts[f"rows_{name}"] for action, name in (("I", "insert"), ("U", "update"), ("D", "delete")) if counts[f"rows_{name}"]}
+        try:
+            status = self._aplicar_cambios(registrar(bloques), collection_id, tiempo_transformacion_datos, policy=policy, key_index=key_index,
+                                           payload_columns=sync_plan.get("payload_columns"), action_counts=action_counts)
+        finally:
+            # Removes the runs on disk even if a write stops the sync
+            bloques.close()
+
+        result = pd.concat(aplicados) if aplicados else pd.DataFrame(columns=['index_sharepoint', 'action_type'], index=pd.Index([], name="PK"))
+        result['status_code'] = status
+
+        return result
+
+    def _politica_errores(self, error_policy: ErrorPolicy | None, collection_id: str) -> ErrorPolicy:
+        """Devuelve la política de errores de una operación lista para empezar, con los reintentos contados en las métricas del CRUD. Sin política se levanta el primer error, sin reintentos."""
+
+        policy = error_policy or ErrorPolicy(max_attempts=1)
+        policy.start(on_retry=lambda operation: self._crud.get_metrics().record_retry(operation, collection_id))
+
+        return policy
+
+    @staticmethod
+    def _enviar_json(send: Callable[[str, str], int], url: str, payload: str, fields: bool = False) -> int:
+        """
+        Valida el JSON del registro y hace la solicitud. Se llama dentro de `ErrorPolicy.submit`, así un payload que no es un JSON válido
+        queda como falla de esa operación (dead letter con mode "continue") en lugar de detener la ejecución. Con fields=True el JSON va dentro de {"fields": ...}, como lo pide la creación de items.
+        """
+
+        dato = json.loads(payload)
+
+        return send(url, json.dumps({"fields": dato} if fields else dato))
+
+    def _confirmar(self, list_status_code: List[int], posicion: int, status: int, journal: Any = None, key_index: KeyIndex | None = None, pk: str = "", action: str = "", item_id: str = "", counter: str = "processed") -> None:
+        """
+        Guarda el código de estado final de una operación, avanza el reporte y, si hay journal, registra la escritura. El id de una inserción se toma de la respuesta del CRUD.
+        Si hay key_index, guarda el id de las inserciones y quita los elementos eliminados, y los que ya no existen (PATCH con 404) para que la próxima vez se inserten.
+        """
+
+        list_status_code[posicion] = status
+        self._progress.advance(counter)
+
+        if action == "I":
+            item_id = str(self._crud.get_last_response().get("id", "")) if status == 200 else ""
+
+        if journal is not None:
+            journal.record(pk=pk, action=action, item_id=item_id, status=status)
+
+        if key_index is not None:
+            if action == "I" and status == 200 and pk:
+                key_index.update({pk: item_id})
+            elif action == "D" and status == 200:
+                key_index.remove(item_ids=[item_id])
+            elif action == "U" and status == 404:
+                key_index.remove(keys=[pk])
+
+    def _indice_llaves(self, collection_id: str) -> KeyIndex | None:
+        """Devuelve el índice de llaves de la colección (ver `set_key_index`), abierto una sola vez por colección, o None si el índice no está activo."""
+
+        if not self._key_index_dir:
+            return None
+        if collection_id not in self._key_indexes:
+            self._key_indexes[collection_id] = KeyIndex(self._key_index_dir, collection_id)
+
+        return self._key_indexes[collection_id]
+
+    def _borrar_indice_llaves(self, collection_id: str) -> None:
+        """Elimina del disco el índice de llaves de una colección que ya no existe, por ejemplo la lista anterior de `truncate_collection`."""
+
+        if not self._key_index_dir:
+            return
+        key_index = self._key_indexes.pop(collection_id, None) or KeyIndex(self._key_index_dir, collection_id)
+        key_index.delete()
+
+    def _buscar_por_llaves(self, collection_id: str, data: pd.DataFrame, pk: List[str], data_col_columns: pd.DataFrame) -> pd.DataFrame:
+        """
+        Busca en la lista solo los elementos de las llaves de data, sin descargarla: cada $filter une con OR las condiciones de LOOKUP_KEYS_PER_FILTER llaves (las columnas de la PK unidas con AND)
+        y los filtros se envían de a BATCH_MAX_REQUESTS en un $batch. Las solicitudes llevan el encabezado Prefer de SharePoint para poder filtrar por columnas sin índice.
+        Las búsquedas del lote que fallan por throttling o errores del servidor se reintentan hasta LOOKUP_BATCH_ATTEMPTS veces (ver `CRUDSharepointGraphAPI.url_batch`). Las PK con columnas de fecha no se pueden buscar y levantan ValueError.
+        Devuelve los elementos encontrados como `get_items`: las columnas de data_col_columns con su nombre (name) e index_sharepoint, sin normalizar.
+        """
+
+        columnas_pk = data_col_columns.set_index('name').loc[pk]
+        fechas = columnas_pk.index[columnas_pk['dataType'].isin(["date", "datetime"])].tolist()
+        if fechas:
+            # SharePoint compares date columns as dates in the site time zone, not as the text of the keys, so an eq on them does not find the items
+            raise ValueError(f"The lookup 'filter' can not search the key columns {fechas} because they are dates. Use lookup='download'.")
+        name_ids = data_col_columns['name_id'].tolist()
+        select = ",".join(name_ids)
+
+        llaves = normalizar_valores(quitar_decimales_pk(data[pk], pk), dict(zip(pk, columnas_pk['dataType']))).drop_duplicates()
+        filtros = []
+        for fila in llaves.itertuples(index=False):
+            condiciones = []
+            for value, name_id, data_type in zip(fila, columnas_pk['name_id'], columnas_pk['dataType']):
+                literal = value if data_type.startswith("num") and value else "'" + value.replace("'", "''") + "'"
+                condiciones.append(f"fields/{name_id} eq {literal}")
+            filtros.append("(" + " and ".join(condiciones) + ")")
+
+        # The requests of a $batch are relative to the version of the API
+        base_url = self._auth.get_url()
+        version_url = base_url[:base_url.index("/sites/")]
+        solicitudes = [{"id": str(num), "method": "GET", "headers": self.PREFER_NON_INDEXED,
+                        "url": f"{base_url[len(version_url):]}/lists/{collection_id}/items?expand=fields(select={select})&$filter={quote(' or '.join(filtros[inicio:inicio + self.LOOKUP_KEYS_PER_FILTER]))}"}
+                       for num, inicio in enumerate(range(0, len(filtros), self.LOOKUP_KEYS_PER_FILTER))]
+
+        items = []
+        for inicio in range(0, len(solicitudes), self.BATCH_MAX_REQUESTS):
+            # A throttled lookup is sent again after its Retry-After instead of stopping the sync
+            for respuesta in self._crud.url_batch(f"{version_url}/$batch", solicitudes[inicio:inicio + self.BATCH_MAX_REQUESTS], max_attempts=self.LOOKUP_BATCH_ATTEMPTS):
+                body = respuesta.get("body") or {}
+                items += body.get("value", [])
+                next_link = body.get("@odata.nextLink")
+                while next_link:
+                    page = self._crud.url_request(next_link, headers=self.PREFER_NON_INDEXED)
+                    items += page.get("value", [])
+                    next_link = page.get("@odata.nextLink")
+
+        logger.info("Búsqueda por llaves en la lista %s: %s llaves, %s solicitudes en %s lotes, %s elementos encontrados", collection_id, len(filtros),
+                    len(solicitudes), ceil(len(solicitudes) / self.BATCH_MAX_REQUESTS), len(items))
+
+        df_items = pd.DataFrame([{name_id: item["fields"].get(name_id, "") for name_id in name_ids} for item in items], columns=name_ids)
+        df_items = cambiar_col_df(data=df_items, df_columns=data_col_columns, col_name_id="name_id", col_name="name")
+        df_items['index_sharepoint'] = [str(item["id"]) for item in items]
+
+        return df_items
+
+    def _planear_lectura(self, collection_id: str, data: pd.DataFrame, pk: List[str], data_col_columns: pd.DataFrame, columnas_lectura: pd.DataFrame, insert: bool, row_hash: str) -> tuple[Dict[str, Any] | None, pd.DataFrame | None]:
+        """
+        Escoge antes de leer la lista entre buscar solo las llaves de data (targeted_upsert) y descargarla (incremental), con `SyncPlanner` y download_done en False.
+        El tamaño de la lista sale de `_tamano_coleccion`. Los conteos salen del diff de una muestra de hasta LOOKUP_KEYS_PER_FILTER * BATCH_MAX_REQUESTS registros, buscada en un solo $batch
+        y escalada al total de data con `SyncPlanner.estimate_from_sample`.
+        Devuelve el plan previo, con el tamaño de la muestra en sample_size, y los elementos encontrados si la muestra es todo data, para no buscarlos dos veces. Si no se conoce el tamaño de la lista devuelve (None, None) y se descarga.
+        """
+
+        rows_collection = self._tamano_coleccion(collection_id, pk)
+        if rows_collection is None:
+            return None, None
+
+        tamano = self.LOOKUP_KEYS_PER_FILTER * self.BATCH_MAX_REQUESTS
+        completa = data.shape[0] <= tamano
+        muestra = data if completa else data.sample(n=tamano, random_state=0)
+        items = self._buscar_por_llaves(collection_id, muestra, pk, columnas_lectura)
+
+        counts = self._contar_diff_muestra(collection_id, items.copy(), muestra, pk, data_col_columns, insert, row_hash)
+        estimated = SyncPlanner.estimate_from_sample(counts, muestra.shape[0], data.shape[0])
+        planner = SyncPlanner(latencies=self._latencias_medidas(), keys_per_lookup=self.LOOKUP_KEYS_PER_FILTER)
+        pre_plan = planner.choose(rows_source=int(data.shape[0]), rows_collection=rows_collection, rows_delete=0, **estimated, delete=False, insert=insert,
+                                  download_done=False, strategies=["incremental", "targeted_upsert"])
+        pre_plan["sample_size"] = int(muestra.shape[0])
+
+        return pre_plan, items if completa else None
+
+    def _tamano_coleccion(self, collection_id: str, pk: List[str]) -> int | None:
+        """
+        Devuelve la cantidad de elementos de la lista sin descargarla: el tamaño del índice de llaves si se reconstruyó con esta PK (ver `set_key_index`),
+        o el id más alto de sus elementos, que es una cota superior porque los ids de los elementos eliminados no se reutilizan. None si no se puede saber.
+        """
+
+        key_index = self._indice_llaves(collection_id)
+        if key_index is not None and key_index.synced_at and key_index.pk == pk:
+            return len(key_index)
+
+        try:
+            page = self._crud.url_request(f"{self._auth.get_url()}/lists/{collection_id}/items?$select=id&$orderby=id%20desc&$top=1")
+        except Exception as e:
+            logger.debug("The size of the collection %s could not be estimated: %s", collection_id, e)
+            return None
+
+        items = page.get("value", [])
+
+        return int(items[0]["id"]) if items else 0
+
+    def _contar_diff_muestra(self, collection_id: str, items: pd.DataFrame, muestra: pd.DataFrame, pk: List[str], data_col_columns: pd.DataFrame, insert: bool, row_hash: str) -> Dict[str, int]:
+        """Compara una muestra de data con sus elementos en la lista como lo hace `_calcular_plan` (sin eliminaciones) y devuelve los conteos rows_insert y rows_update."""
+
+        column_types = dict(zip(data_col_columns['name'], data_col_columns['dataType']))
+        pk_types = {col: column_types[col] for col in pk}
+        muestra = normalizar_valores(quitar_decimales_pk(quitar_duplicados_df(muestra.copy(deep=False), pk=pk), pk), pk_types)
+        if items.empty:
+            return {"rows_insert": int(muestra.shape[0]) if insert else 0, "rows_update": 0}
+
+        items = normalizar_valores(quitar_decimales_pk(self.quitar_duplicados_en_collections(items, pk, collection_id, False), pk), pk_types)
+        if row_hash:
+            # Only the key and the hash are compared, as in the full plan
+            if row_hash not in items.columns:
+                items[row_hash] = ""
+            muestra[row_hash] = huella_registros(muestra, column_types)
+            muestra = muestra[pk + [row_hash]]
+            column_types = {**column_types, row_hash: "str"}
+
+        items = crear_pk(items, pk)
+        muestra = crear_pk(muestra, pk).merge(items[['index_sharepoint']], how="left", left_index=True, right_index=True)
+        action_counts = PandasDiffBackend().compare(items, muestra, False, insert, column_types)["action_type"].value_counts()
+
+        return {"rows_insert": int(action_counts.get("I", 0)), "rows_update": int(action_counts.get("U", 0))}
+
+    def _crear_columna_huella(self, collection_id: str, row_hash: str) -> None:
+        """Crea en la lista la columna oculta de texto donde update_collection guarda la huella de cada registro, si todavía no existe."""
+
+        data_columns = self.get_fields(collection_id=collection_id)
+        if not data_columns.empty and row_hash in data_columns['name'].tolist():
+            return
+
+        definition = {"name": row_hash, "displayName": row_hash, "hidden": True, "text": {}}
+        self._crud.url_posts(f"{self._auth.get_url()}/lists/{collection_id}/columns", json.dumps(definition))
+        logger.info("Created the hidden column '%s' for the row hash in the list %s", row_hash, collection_id)
+
+    def _completar_con_datos(self, df_to_update: pd.DataFrame, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Le pone al plan de la comparación por huella las columnas de data que no se compararon, por la PK, para construir los payloads.
+        La huella no dice qué columnas cambiaron, así que los registros 'U' se envían completos (changed_columns vacío).
+        """
+
+        otras = [col for col in data.columns if col not in df_to_update.columns]
+        df_to_update = df_to_update.join(data[otras])
+        df_to_update['changed_columns'] = ""
+        orden = [col for col in data.columns if col != 'index_sharepoint']
+
+        return df_to_update[list(dict.fromkeys(orden + df_to_update.columns.tolist()))]
+
+    def _reintentar_pendientes(self, policy: ErrorPolicy) -> None:
+        """Recorre la cola de reintentos de la política por rondas, refrescando el token antes de cada una, y cierra el dead letter."""
+
+        try:
+            while policy.pending():
+                logger.info("Reintentando %s operaciones fallidas", policy.pending())
+                self._crud.set_token(self._auth.get_token())
+                policy.retry_round()
+        finally:
+            policy.close()
+
+        if policy.failures:
+            logger.warning("%s operations failed permanently. Dead letter: %s", len(policy.failures), policy.dead_letter_path or "not saved")
+
+    def _resumen_escritura(self, result: pd.DataFrame, policy: ErrorPolicy) -> pd.DataFrame:
+        """Agrega el resumen de la política de errores al resultado en attrs['write_summary'], o devuelve solo el resumen (con los attrs del resultado) si la política tiene summary_only."""
+
+        summary = policy.summary()
+        if policy.summary_only:
+            summary.attrs = {**result.attrs, **summary.attrs}
+            return summary
+
+        result.attrs['write_summary'] = summary.to_dict("index")
+
+        return result
+
+    def _filas_con_payload(self, df_to_update: pd.DataFrame, payload_columns: List[Dict[str, Any]] | None) -> Iterator[Any]:
+        """
+        Recorre las filas del plan. Si el plan no trae json_post lo construye por bloques, así solo hay un bloque de JSON en memoria a la vez.
+        Los bloques empiezan en una fila y se duplican hasta PAYLOAD_CHUNK_SIZE, así la primera solicitud sale sin esperar a que se construya un bloque completo.
+        """
+
+        if payload_columns is None:
+            yield from df_to_update.itertuples()
+            return
+
+        data_col_columns = pd.DataFrame(payload_columns)
+        inicio, filas = 0, 1
+        while inicio < df_to_update.shape[0]:
+            chunk = df_to_update.iloc[inicio:inicio + filas]
+            yield from chunk.assign(json_post=self._construir_payloads(chunk, data_col_columns)).itertuples()
+            inicio += filas
+            filas = min(2 * filas, self.PAYLOAD_CHUNK_SIZE)
+
+    def _construir_payloads(self, df_to_update: pd.DataFrame, data_col_columns: pd.DataFrame) -> pd.Series:
+        """
+        Construye el JSON de cada registro del plan con `construir_json`. Los registros 'U' con changed_columns (ver `columnas_cambiadas`) solo llevan los campos que cambiaron,
+        así el PATCH no vuelve a enviar los textos largos que no se tocaron. Los registros se agrupan por las columnas que cambiaron para filtrar las columnas una vez por grupo.
+        """
+
+        payloads = np.empty(df_to_update.shape[0], dtype=object)
+        if "changed_columns" in df_to_update.columns:
+            cambios = df_to_update["changed_columns"].where(df_to_update["action_type"] == "U", "").fillna("").to_numpy()
         else:
-            raise ValueError("Collection name or ID must be provided.")
-        
-        return df_to_update
+            cambios = np.full(df_to_update.shape[0], "", dtype=object)
+
+        for cambiadas, posiciones in pd.Series(cambios).groupby(cambios).indices.items():
+            columnas = data_col_columns[data_col_columns['name'].isin(json.loads(cambiadas))] if cambiadas else data_col_columns
+            # A row that only changed in columns that are not sent keeps the full payload
+            columnas = columnas if not columnas.empty else data_col_columns
+            filas = df_to_update.iloc[posiciones]
+            payloads[posiciones] = [construir_json(row, columnas) for _, row in filas.iterrows()]
+
+        if logger.isEnabledFor(logging.DEBUG) and "changed_columns" in df_to_update.columns:
+            enviados = sum(len(json.loads(cambiadas)) for cambiadas in cambios if cambiadas)
+            logger.debug("The PATCH payloads carry %s fields instead of %s", enviados, int((cambios != "").sum()) * data_col_columns.shape[0])
+
+        return pd.Series(payloads, index=df_to_update.index, dtype=object)
+
+    def _latencias_medidas(self, percentile: float | None = None) -> Dict[str, float]:
+        """Devuelve la latencia promedio (o el percentil pedido) de cada método HTTP medida por el CRUD, sin los métodos que no se han usado."""
+
+        latencies = {
+            method: self._crud.get_latency(method) if percentile is None else self._crud.get_latency_percentile(method, percentile)
+            for method in ("GET", "POST", "PATCH", "DELETE")
+        }
+
+        return {method: latency for method, latency in latencies.items() if latency is not None}
+
+    def _planear_sincronizacion(self, rows_source: int, rows_collection: int, action_counts: Dict[str, int], delete: bool, insert: bool, strategy: str, strategies: List[str] = [], allow_full_replace: bool = False) -> Dict[str, Any]:
+        """Escoge la estrategia de sincronización a partir de los conteos del diff (cantidad por acción) y de la latencia promedio medida por el CRUD."""
+
+        planner = SyncPlanner(latencies=self._latencias_medidas())
+
+        return planner.choose(
+            rows_source=int(rows_source),
+            rows_collection=int(rows_collection),
+            rows_insert=int(action_counts.get("I", 0)),
+            rows_update=int(action_counts.get("U", 0)),
+            rows_delete=int(action_counts.get("D", 0)),
+            delete=delete,
+            insert=insert,
+            strategy=strategy,
+            strategies=strategies,
+            allow_full_replace=allow_full_replace
+        )
+
+    def _estimar_dry_run(self, df_to_update: pd.DataFrame, sync_plan: Dict[str, Any], delete: bool, insert: bool, sample_size: int = 3) -> Dict[str, Any]:
+        """Resume el plan de un dry run: conteos por acción, payloads de ejemplo y la estimación de solicitudes y tiempo con la latencia promedio y el p95."""
+
+        counts = df_to_update["action_type"].value_counts()
+        samples = {
+            "I": df_to_update.loc[df_to_update["action_type"] == "I", "json_post"].head(sample_size).tolist(),
+            "U": df_to_update.loc[df_to_update["action_type"] == "U", "json_post"].head(sample_size).tolist(),
+            "D": df_to_update.loc[df_to_update["action_type"] == "D", "index_sharepoint"].head(sample_size).tolist()
+        }
+
+        # Requests are sent one by one, so every request is its own batch
+        cost = sync_plan["costs"][sync_plan["strategy"]]
+        planner_p95 = SyncPlanner(latencies=self._latencias_medidas(percentile=95))
+        cost_p95 = planner_p95.estimate(**sync_plan["counts"], delete=delete, insert=insert)[sync_plan["strategy"]]
+
+        return {
+            "strategy": sync_plan["strategy"],
+            "counts": {action: int(counts.get(action, 0)) for action in ("I", "U", "D")},
+            "samples": samples,
+            "requests": cost["requests"],
+            "batches": cost["requests"],
+            "concurrency": 1,
+            "seconds": cost["seconds"],
+            "seconds_p95": cost_p95["seconds"],
+            "duration": segundos_a_horas_minutos_segundos(float(cost["seconds"])),
+            "duration_p95": segundos_a_horas_minutos_segundos(float(cost_p95["seconds"]))
+        }
         
 
 
@@ -675,6 +2179,8 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
 
 
     @check_type_args
+    @traced("quitar_duplicados_en_collections")
+    @profiled
     def quitar_duplicados_en_collections(self, df: pd.DataFrame, pk: List[str], collection_id: str, delete_duplicates: bool) -> pd.DataFrame:
 
         """
@@ -703,27 +2209,13 @@ class ListSharepoint(HandlerSharepointStrategyInterface):
 
         if not df.empty:
             df_col_items_duplicate = df[df.duplicated(subset=pk, keep=False)]
-            print(f"Duplicated items in the collection: \n{df_col_items_duplicate.shape[0]}")
+            logger.info("Duplicated items in the collection: %s", df_col_items_duplicate.shape[0])
             if not df_col_items_duplicate.empty:
                 if delete_duplicates:
-                    print("Deleting duplicated items...")
+                    logger.info("Deleting %s duplicated items from the collection %s", df_col_items_duplicate.shape[0], collection_id)
                     df = self.delete_items(collection_id=collection_id, id_items=df_col_items_duplicate['index_sharepoint'].tolist())
                 
                 # get items uniques
                 df = df[~df['index_sharepoint'].isin(df_col_items_duplicate['index_sharepoint'].tolist())]
 
         return df
-    
-    
-
-
-
-
-            
-
-            
-
-                
-            
-
-            
\ No newline at end of file
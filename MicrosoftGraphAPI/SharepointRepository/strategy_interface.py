@@ -12,18 +12,45 @@ class HandlerSharepointStrategyInterface(ABC):
         pass
     
     @abstractmethod
-    def get_items(self, colection_name="", collection_id=""):
+    def get_items(self, colection_name="", collection_id="", query=None):
         pass
 
     @abstractmethod
-    def create_item (self, data, collection_name="", collection_id=""):
+    def create_item (self, data, collection_name="", collection_id="", chunksize=100000, error_policy=None):
         pass
 
     @abstractmethod
-    def delete_items (self, collection_name="", collection_id ="", id_items=[], delete_all = False):
+    def delete_items (self, collection_name="", collection_id ="", id_items=[], delete_all = False, error_policy = None):
         pass
 
     @abstractmethod
-    def update_collection(self, data, pk, collection_name="", collection_id="", delete = True, insert = True, delete_duplicates = False):
+    def update_collection(self, data, pk, collection_name="", collection_id="", delete = True, insert = True, delete_duplicates = False, strategy = "auto", dry_run = False, journal_dir = "", resume = "", force = False, memory_budget = 0, diff_workers = 1, diff_backend = "auto", pk_encoding = "text", chunksize = 100000, error_policy = None, lookup = "auto", row_hash = "", allow_full_replace = False):
         pass
 
+    @abstractmethod
+    def upsert_items(self, data, pk, collection_name="", collection_id="", error_policy=None):
+        pass
+
+    @abstractmethod
+    def truncate_collection(self, collection_name="", collection_id=""):
+        pass
+
+    @abstractmethod
+    def plan_update(self, data, pk, path, collection_name="", collection_id="", delete = True, insert = True, delete_duplicates = False, strategy = "auto", diff_workers = 1, diff_backend = "auto", pk_encoding = "text"):
+        pass
+
+    @abstractmethod
+    def apply_plan(self, path, shard = 0, of = 1, requests_per_second = 0, error_policy = None):
+        pass
+
+    @abstractmethod
+    def get_metrics(self, format = "dict"):
+        pass
+
+    @abstractmethod
+    def get_timing_tree(self, run = -1):
+        pass
+
+    @abstractmethod
+    def get_memory_report(self, run = -1):
+        pass
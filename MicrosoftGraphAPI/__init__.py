@@ -24,6 +24,7 @@ Subpaquetes:
 
         Funciones: Revisa el docstring de cada función para encontrar la explicación de uso correspondiente.
             - check_type_args: Decorador encargado de verificar tipo de datos de los arguemntos de entrada.
+            - enable_profiling, disable_profiling, Profiler: Perfilado opcional de los métodos públicos de ListSharepoint y de las funciones de helpers, un archivo pstats o de pilas para flamegraph por llamada. También se activa sin tocar el código con la variable de ambiente MSGRAPH_PROFILE_DIR.
     
     helpers:
         En este subpaquete se encuentran funciones que son de ayuda para distintos momentos del tratamiento de los datos, como la toma del tiempo transcurrido, obtener una porción de texto, construir json o comparar dataframes a partir de una Primary Key.
@@ -32,17 +33,27 @@ Subpaquetes:
             - compare_columns: Compara columnas.
             - construir_json: Construe json a partir de un df.
             - segundos_a_horas_minutos_segundos: convierte segundos a horas:minutos:segundos.
+            - segundos_reintento: Segundos a esperar antes de reintentar una solicitud, según Retry-After.
             - crear_pk: Crea una Primary Key en un Datafram.
+            - codificar_pk: Arma la llave compuesta sin colisiones (texto escapado o hash de 64 bits) por columnas.
+            - pk_hash_sin_colisiones: Revisa que la llave hash no tenga colisiones entre varios DataFrames.
+            - huella_registros: Calcula la huella (hash de 64 bits) del contenido normalizado de cada fila.
             - quitar_decimales_pk: Quita decimales de un PK que lo tenga.
+            - normalizar_valores: Lleva los valores a un texto canónico según el tipo de dato de cada columna de la lista.
+            - leer_por_bloques: Recorre por bloques un DataFrame, un archivo CSV o Parquet o un iterador de DataFrames.
             - quitar_duplicados_df: Quitar duplicados de un Dataframe.
             - compare_dataframe: Compara dos dataframes obteniendo los que hay que actualizar, insertar y borrar.
+            - compare_dataframe_por_particiones: Hace la misma comparación por particiones de la PK para acotar la memoria.
             - obtener_index_a_eliminar: Obtiene los elementos a eleminar.
             - obtener_index_a_insertar: Obtiene los elementos a insertar.
             - obtener_index_comunes: Obtiene los elementos comunes.
             - obtener_filas_con_datos_diferentes: Obtener los elementos a actualizar.
+            - columnas_cambiadas: Arma la lista de columnas que cambiaron en cada registro a actualizar.
             - compare_rows: Compara los campos de cada registro.
             - obtener_substrn: Hace la substracción de una porción de texto.
             - cambiar_col_df: Cambiar el nombre de las columnas de un data frame.
+            - limpiar_definicion_columnas: Deja la definición de las columnas de una lista lista para clonar su esquema.
+            - DataFrameSummary: Resumen perezoso de un DataFrame para los mensajes de log.
 
     SharepointRepository:
         En este subpaquetes encontrarás las estrategias de manejo de las listas y de todas las operaciones que tienen que ver con las listas.
@@ -50,7 +61,34 @@ Subpaquetes:
         Clases: Revisa el docstring de cada clase para encontrar la explicación de uso correspondiente.
             - HandlerSharepointStrategyInterface: Clase que funciona como interfaz para las estrategias que se encargan de hacer el manejo de las listas.
             - ListSharepoint: Clase encargada del manejo de las operaciones que se aplican a las listas.
+            - ItemQuery: Consulta de get_items que filtra, ordena, limita y proyecta los elementos en SharePoint para descargar solo las filas y columnas que se necesitan.
     
+    sync:
+        En este subpaquete se encuentran las clases que ayudan a decidir y ejecutar la sincronización de un DataFrame con una lista de SharePoint.
+
+        Clases: Revisa el docstring de cada clase para encontrar la explicación de uso correspondiente.
+            - SyncPlanner: Estima el costo de cada estrategia de sincronización y escoge la más barata.
+            - SyncPlan: Plan de sincronización guardado en disco (Parquet + manifest) que se puede aplicar por porciones.
+            - SharedRateLimiter: Presupuesto de solicitudes por segundo compartido entre procesos.
+            - SyncJournal: Journal de una ejecución de update_collection para poder retomarla donde quedó.
+            - KeyIndex: Índice en disco de la PK de cada registro al id del elemento, para insertar o actualizar pocos registros sin descargar la lista.
+            - ErrorPolicy: Política de errores de las escrituras, con cola de reintentos acotada y dead letter de las operaciones que fallaron.
+            - SortedMergeDiff: Comparación fuera de memoria con corridas ordenadas por la PK en disco.
+            - DiffBackendInterface, PandasDiffBackend, SortedMergeDiffBackend, SQLiteDiffBackend: Motores de comparación que se escogen por nombre en update_collection (diff_backend).
+
+    monitoring:
+        En este subpaquete se encuentran las herramientas para seguir el avance y el comportamiento de las operaciones sobre las listas.
+
+        Clases: Revisa el docstring de cada clase para encontrar la explicación de uso correspondiente.
+            - ProgressReporterInterface: Interfaz de los reportes de avance, con el control de cada cuánto se reporta.
+            - NullProgressReporter, LogProgressReporter, TerminalProgressReporter, CallbackProgressReporter: Reportes de avance que no muestran nada, escriben en el log, muestran una barra en la terminal o llaman una función.
+            - RequestMetrics: Métricas de las solicitudes a SharePoint (latencia, códigos de estado, bytes, filas, reintentos y esperas) por operación y colección, en JSON o texto de Prometheus.
+            - Tracer, SpanExporterInterface, SpanRecorder, OpenTelemetryExporter: Tramos anidados que miden cada fase de las operaciones, con el árbol de tiempos en memoria y la exportación opcional a OpenTelemetry.
+            - MemoryTracker: Memoria residente al inicio, al final y el pico de cada fase, conectada al Tracer.
+
+        Funciones:
+            - set_log_level: Cambia el nivel del log del paquete o de uno de sus módulos. Los mensajes de diagnóstico se escriben con `logging` en el logger de cada módulo; el paquete solo agrega un NullHandler, la aplicación decide dónde se escriben.
+
     Service:
         En este subpaquete tendremos una clase que nos ayuda a la inicialización de todos los subpaquetes anteriores.
 
@@ -67,29 +105,73 @@ from .auth.auth_context import AuthContext
 from .auth.ms_graph_auth import MSGraphAuth
 from .CRUD.sharepoint_crud import CRUDSharepointGraphAPI
 from .decorators.decorators import check_type_args
-from .helpers.helpers import compare_columns, compare_dataframe, compare_rows, construir_json, segundos_a_horas_minutos_segundos, crear_pk, quitar_decimales_pk, quitar_duplicados_df, obtener_filas_con_datos_diferentes, obtener_index_a_eliminar, obtener_index_a_insertar, obtener_index_comunes, obtener_substrn
+from .decorators.profiling import enable_profiling, disable_profiling, Profiler
+from .helpers.helpers import compare_columns, compare_dataframe, compare_dataframe_por_particiones, compare_rows, construir_json, segundos_a_horas_minutos_segundos, segundos_reintento, crear_pk, codificar_pk, pk_hash_sin_colisiones, huella_registros, quitar_decimales_pk, normalizar_valores, leer_por_bloques, quitar_duplicados_df, obtener_filas_con_datos_diferentes, columnas_cambiadas, obtener_index_a_eliminar, obtener_index_a_insertar, obtener_index_comunes, obtener_substrn, limpiar_definicion_columnas, DataFrameSummary
 from .SharepointRepository.list_strategy import ListSharepoint
+from .SharepointRepository.item_query import ItemQuery
 from .Service import ListInitializeSharepoint, InitializerInterface
+from .sync import SyncPlanner, SyncPlan, SharedRateLimiter, SyncJournal, ErrorPolicy, KeyIndex, SortedMergeDiff, DiffBackendInterface, PandasDiffBackend, SortedMergeDiffBackend, SQLiteDiffBackend
+from .monitoring import ProgressReporterInterface, NullProgressReporter, LogProgressReporter, TerminalProgressReporter, CallbackProgressReporter, set_log_level, RequestMetrics, Tracer, SpanExporterInterface, SpanRecorder, OpenTelemetryExporter, MemoryTracker
+import logging
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
 
 __all__ = [
         "AuthContext",
         "MSGraphAuth",
         "CRUDSharepointGraphAPI",
         "check_type_args",
+        "enable_profiling",
+        "disable_profiling",
+        "Profiler",
         "compare_columns",
         "compare_dataframe",
+        "compare_dataframe_por_particiones",
         "compare_rows",
         "construir_json",
         "segundos_a_horas_minutos_segundos",
+        "segundos_reintento",
         "crear_pk",
+        "codificar_pk",
+        "pk_hash_sin_colisiones",
+        "huella_registros",
         "quitar_decimales_pk",
+        "normalizar_valores",
+        "leer_por_bloques",
         "quitar_duplicados_df",
         "obtener_filas_con_datos_diferentes",
+        "columnas_cambiadas",
         "obtener_index_a_eliminar",
         "obtener_index_a_insertar",
         "obtener_index_comunes",
         "obtener_substrn",
+        "limpiar_definicion_columnas",
+        "DataFrameSummary",
         "ListSharepoint",
+        "ItemQuery",
         "ListInitializeSharepoint",
-        "InitializerInterface"
+        "InitializerInterface",
+        "SyncPlanner",
+        "SyncPlan",
+        "SharedRateLimiter",
+        "SyncJournal",
+        "ErrorPolicy",
+        "KeyIndex",
+        "SortedMergeDiff",
+        "DiffBackendInterface",
+        "PandasDiffBackend",
+        "SortedMergeDiffBackend",
+        "SQLiteDiffBackend",
+        "ProgressReporterInterface",
+        "NullProgressReporter",
+        "LogProgressReporter",
+        "TerminalProgressReporter",
+        "CallbackProgressReporter",
+        "set_log_level",
+        "RequestMetrics",
+        "Tracer",
+        "SpanExporterInterface",
+        "SpanRecorder",
+        "OpenTelemetryExporter",
+        "MemoryTracker"
     ]
\ No newline at end of file
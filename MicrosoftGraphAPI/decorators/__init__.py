@@ -1,3 +1,9 @@
 from .decorators import check_type_args
+from .profiling import profiled, enable_profiling, disable_profiling, get_profiler, Profiler
 
-__all__ = ["check_type_args"]
\ No newline at end of file
+__all__ = ["check_type_args",
+           "profiled",
+           "enable_profiling",
+           "disable_profiling",
+           "get_profiler",
+           "Profiler"]
\ No newline at end of file
@@ -1,6 +1,7 @@
 import inspect
+import types
 from functools import wraps
-from typing import get_origin
+from typing import get_origin, get_args, Union
 import pandas as pd
 import numpy as np
 
@@ -39,7 +40,14 @@ def check_type_args(func):
             expected_type = func.__annotations__.get(name)
             if expected_type:
                 origin = get_origin(expected_type) #Si es un tipo generico compara solo con el tipo de base
-                if origin:
+                if origin in (Union, types.UnionType):
+                    # Con una unión (X | Y) basta con que sea de uno de los tipos, comparando los genéricos con su tipo de base
+                    allowed = tuple(get_origin(arg) or arg for arg in get_args(expected_type))
+                    if not isinstance(value, allowed):
+                        expected_types.append(
+                            f"- Argument '{name}' should be of type {' | '.join(arg.__name__ for arg in allowed)}, but got {type(value).__name__}."
+                        )
+                elif origin:
                     if not isinstance(value, origin):
                         expected_types.append(
                             f"- Argument '{name}' should be of type {origin.__name__}, but got {type(value).__name__}."
@@ -0,0 +1,241 @@
+import os
+import re
+import sys
+import cProfile
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+ENV_DIRECTORY = "MSGRAPH_PROFILE_DIR"
+ENV_MODE = "MSGRAPH_PROFILE_MODE"
+ENV_INTERVAL = "MSGRAPH_PROFILE_INTERVAL"
+ENV_MAX_OVERHEAD = "MSGRAPH_PROFILE_MAX_OVERHEAD"
+ENV_MAX_PROFILES = "MSGRAPH_PROFILE_MAX_PROFILES"
+
+
+class Profiler:
+    """
+    Perfilador de los puntos de entrada del paquete (métodos públicos de `ListSharepoint` y funciones de helpers). Cada llamada perfilada escribe un archivo en `directory`:
+        - mode "sampling": muestrea la pila del hilo cada `interval` segundos y escribe las pilas en formato "collapsed" (`.collapsed`), el que leen flamegraph.pl, speedscope o inferno.
+        - mode "deterministic": usa cProfile y escribe un archivo `.pstats` que se lee con `pstats`, snakeviz o gprof2dot.
+
+    Si una llamada perfilada llama otros puntos de entrada, estos quedan dentro del mismo perfil (no se abre otro perfil anidado), y solo se perfila una llamada a la vez en el proceso.
+
+    Control del costo:
+        - En sampling el intervalo se ajusta solo para que el tiempo que toma muestrear no pase de `max_overhead` (fracción del tiempo de la llamada).
+        - En deterministic el costo de cProfile no se puede acotar dentro de una llamada, así que se limita la cantidad de perfiles por punto de entrada con `max_profiles`. También aplica en sampling.
+
+    Args:
+        directory (str): Carpeta donde se escriben los perfiles. Se crea si no existe.
+        mode (str, optional): "sampling" o "deterministic". Por defecto "sampling".
+        interval (float, optional): Segundos entre dos muestras en sampling. Por defecto 0.005.
+        max_overhead (float, optional): Fracción máxima del tiempo de la llamada que se gasta muestreando. Por defecto 0.05.
+        max_profiles (int, optional): Cantidad máxima de perfiles por punto de entrada. Por defecto 20.
+
+    Raises:
+        ValueError: Si el modo no es "sampling" ni "deterministic".
+
+    Ejemplo:
+        # Sin tocar el código, desde el ambiente:
+        #   MSGRAPH_PROFILE_DIR=/tmp/perfiles MSGRAPH_PROFILE_MODE=deterministic python sincronizar.py
+        # O desde el código:
+        enable_profiling("/tmp/perfiles", mode="sampling")
+        list_sharepoint.update_collection(data=data, pk=["Documento"], collection_name="My Collection")
+        disable_profiling()
+    """
+
+    MODES = ["sampling", "deterministic"]
+
+    def __init__(self, directory: str, mode: str = "sampling", interval: float = 0.005, max_overhead: float = 0.05, max_profiles: int = 20) -> None:
+        if mode not in self.MODES:
+            raise ValueError(f"The profiling mode '{mode}' is not available. Use one of {self.MODES}.")
+
+        self.directory = directory
+        self.mode = mode
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_profiles = max_profiles
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sequence = 0
+
+    @classmethod
+    def from_env(cls) -> "Profiler | None":
+        """Crea el perfilador con las variables de ambiente MSGRAPH_PROFILE_DIR, MSGRAPH_PROFILE_MODE, MSGRAPH_PROFILE_INTERVAL, MSGRAPH_PROFILE_MAX_OVERHEAD y MSGRAPH_PROFILE_MAX_PROFILES. Devuelve None si MSGRAPH_PROFILE_DIR no está definida."""
+
+        directory = os.environ.get(ENV_DIRECTORY, "")
+        if not directory:
+            return None
+
+        return cls(
+            directory=directory,
+            mode=os.environ.get(ENV_MODE, "sampling"),
+            interval=float(os.environ.get(ENV_INTERVAL, 0.005)),
+            max_overhead=float(os.environ.get(ENV_MAX_OVERHEAD, 0.05)),
+            max_profiles=int(os.environ.get(ENV_MAX_PROFILES, 20))
+        )
+
+    def run(self, name: str, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Ejecuta la función perfilándola si no hay otro perfil activo y si el punto de entrada no llegó a `max_profiles`; si no, la ejecuta sin perfilar."""
+
+        if getattr(self._local, "active", False) or self._counts[name] >= self.max_profiles or not self._lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+
+        self._local.active = True
+        self._counts[name] += 1
+        try:
+            if self.mode == "deterministic":
+                return self._run_deterministic(name, func, args, kwargs)
+            return self._run_sampling(name, func, args, kwargs)
+        finally:
+            self._local.active = False
+            self._lock.release()
+
+    def _run_deterministic(self, name: str, func: Callable, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            path = self._archivo(name, "pstats")
+            profile.dump_stats(path)
+            logger.info("Perfil de %s guardado en %s", name, path)
+
+    def _run_sampling(self, name: str, func: Callable, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        sampler = _StackSampler(threading.get_ident(), self.interval, self.max_overhead)
+        sampler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sampler.stop()
+            path = self._archivo(name, "collapsed")
+            with open(path, "w") as profile_file:
+                for stack, count in sampler.stacks.most_common():
+                    profile_file.write(f"{stack} {count}\n")
+            logger.info("Perfil de %s guardado en %s (%s muestras, intervalo final %.4fs, costo %.2f%%)",
+                        name, path, sampler.samples, sampler.interval, 100 * sampler.overhead)
+
+    def _archivo(self, name: str, extension: str) -> str:
+        """Ruta del archivo de un perfil: nombre del punto de entrada, fecha, proceso y consecutivo."""
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._sequence += 1
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+        return os.path.join(self.directory, f"{safe_name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}_{os.getpid()}_{self._sequence}.{extension}")
+
+
+class _StackSampler(threading.Thread):
+    """Hilo que toma muestras de la pila de otro hilo y las acumula en formato collapsed, ajustando el intervalo para no pasar del costo máximo."""
+
+    def __init__(self, thread_id: int, interval: float, max_overhead: float) -> None:
+        super().__init__(daemon=True)
+        self._thread_id = thread_id
+        self._detener = threading.Event()
+        self._max_overhead = max_overhead
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._sampling_seconds = 0.0
+        self._inicio = perf_counter()
+
+    def run(self) -> None:
+        while not self._detener.is_set():
+            start = perf_counter()
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.stacks[self._pila(frame)] += 1
+                self.samples += 1
+            cost = perf_counter() - start
+            self._sampling_seconds += cost
+
+            # Back off when sampling would take more than max_overhead of the time
+            if self._max_overhead > 0 and cost > self.interval * self._max_overhead:
+                self.interval = cost / self._max_overhead
+
+            self._detener.wait(self.interval)
+
+    def stop(self) -> None:
+        self._detener.set()
+        self.join()
+
+    @property
+    def overhead(self) -> float:
+        elapsed = perf_counter() - self._inicio
+        return self._sampling_seconds / elapsed if elapsed else 0.0
+
+    @staticmethod
+    def _pila(frame: Any) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+
+        return ";".join(reversed(frames))
+
+
+try:
+    _profiler = Profiler.from_env()
+except ValueError as error:
+    logger.warning("Profiling disabled: %s", error)
+    _profiler = None
+
+
+def enable_profiling(directory: str, mode: str = "sampling", interval: float = 0.005, max_overhead: float = 0.05, max_profiles: int = 20) -> Profiler:
+    """
+    Activa el perfilado de los puntos de entrada del paquete. Es lo mismo que definir la variable de ambiente MSGRAPH_PROFILE_DIR antes de importar el paquete. Ver `Profiler` para los argumentos.
+
+    Returns:
+        Profiler: Perfilador activo.
+
+    Ejemplo:
+        enable_profiling("/tmp/perfiles", mode="deterministic", max_profiles=5)
+    """
+
+    global _profiler
+    _profiler = Profiler(directory=directory, mode=mode, interval=interval, max_overhead=max_overhead, max_profiles=max_profiles)
+
+    return _profiler
+
+
+def disable_profiling() -> None:
+    """Desactiva el perfilado de los puntos de entrada del paquete."""
+
+    global _profiler
+    _profiler = None
+
+
+def get_profiler() -> Profiler | None:
+    """Devuelve el perfilador activo, o None si el perfilado está desactivado."""
+    return _profiler
+
+
+def profiled(func):
+    """
+    Decorador que perfila la función con el perfilador activo (ver `enable_profiling` y la variable de ambiente MSGRAPH_PROFILE_DIR). Si el perfilado está desactivado solo se agrega una comparación por llamada.
+
+    Ejemplo:
+        @profiled
+        def compare_dataframe(...):
+            ...
+    """
+
+    name = func.__qualname__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _profiler
+        if profiler is None:
+            return func(*args, **kwargs)
+        return profiler.run(name, func, *args, **kwargs)
+
+    return wrapper
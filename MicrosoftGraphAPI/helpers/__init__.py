@@ -1,15 +1,24 @@
-from .helpers import compare_columns, construir_json, segundos_a_horas_minutos_segundos, crear_pk, quitar_decimales_pk, quitar_duplicados_df, obtener_filas_con_datos_diferentes, obtener_index_a_eliminar, obtener_index_a_insertar, obtener_index_comunes, obtener_substrn, cambiar_col_df
+from .helpers import compare_columns, construir_json, segundos_a_horas_minutos_segundos, segundos_reintento, crear_pk, codificar_pk, pk_hash_sin_colisiones, huella_registros, quitar_decimales_pk, normalizar_valores, leer_por_bloques, quitar_duplicados_df, obtener_filas_con_datos_diferentes, columnas_cambiadas, obtener_index_a_eliminar, obtener_index_a_insertar, obtener_index_comunes, obtener_substrn, cambiar_col_df, limpiar_definicion_columnas, DataFrameSummary
 __all__ = [
     "compare_columns",
     "construir_json",
     "segundos_a_horas_minutos_segundos",
+    "segundos_reintento",
     "crear_pk",
+    "codificar_pk",
+    "pk_hash_sin_colisiones",
+    "huella_registros",
     "quitar_decimales_pk",
+    "normalizar_valores",
+    "leer_por_bloques",
     "quitar_duplicados_df",
     "obtener_filas_con_datos_diferentes",
+    "columnas_cambiadas",
     "obtener_index_a_eliminar",
     "obtener_index_a_insertar",
     "obtener_index_comunes",
     "obtener_substrn",
-    "cambiar_col_df"
+    "cambiar_col_df",
+    "limpiar_definicion_columnas",
+    "DataFrameSummary"
 ]
\ No newline at end of file
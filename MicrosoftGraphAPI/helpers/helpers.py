@@ -2,9 +2,13 @@ import pandas as pd
 import numpy as np
 import json
 import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from ..decorators import *
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
+
+logger = logging.getLogger(__name__)
 
 ##############################################################################
 ### Comparar las columnas de una lista con las columnas de un DataFrame
@@ -57,7 +61,7 @@ def construir_json(row: pd.Series, df_columns_format: pd.DataFrame) -> str:
     
     Args:
         row (pd.Series): Registro de un DataFrame al que se le quiere hacer un string tipo JSON.
-        df_columns_format (pd.DataFrame): DataFrame con 3 columnas (name_id, name, dataType), que contiene el tipo de dato que debe tener cada Columna de nombre name.
+        df_columns_format (pd.DataFrame): DataFrame con 3 columnas (name_id, name, dataType), que contiene el tipo de dato que debe tener cada Columna de nombre name. Los textos vacíos se envían como "" y los números y fechas vacíos como null.
          
     Return:
         str: Se devuelve el string tipo JSON con cada valor de cada columna con su tipo de dato correspondiente y con el nombre de la columna como name_id.
@@ -85,33 +89,31 @@ def construir_json(row: pd.Series, df_columns_format: pd.DataFrame) -> str:
         # Llama a la función construir_json
         json_str = construir_json(row, df_columns_format)
 
-        print(json_str) # Salida: {"nombre_id":"Juan", "edad_id":30, "salario_id":1234.56}
+        print(json_str) # Salida: {"nombre_id": "Juan", "edad_id": 30, "salario_id": 1234.56}
     """
-    num_total_rows = df_columns_format.shape[0]
-    dic_value = '{'
-    for num_row_act, col_tuple in enumerate(df_columns_format.itertuples(), start=1):
-        column_name_id = col_tuple.name_id
-        column_name = col_tuple.name
+    dic_value = {}
+    for col_tuple in df_columns_format.itertuples():
         column_dataType = col_tuple.dataType
-        column_value = row[column_name]
-        if column_dataType == "str":
-            column_value = '"' + str(column_value) + '"'
+        column_value = row[col_tuple.name]
+        if pd.isna(column_value) or str(column_value).strip().lower() in VALORES_VACIOS:
+            # Empty texts are sent as "" and empty numbers and dates clear the field, see normalizar_valores
+            column_value = "" if column_dataType == "str" else None
+        elif column_dataType == "str":
+            column_value = str(column_value)
         elif column_dataType.__contains__("num"):
             cant_decimales = obtener_substrn(column_dataType, '(', ')')                
             if cant_decimales == "0":
-                column_value = str(int(column_value))
+                column_value = int(float(column_value))
+            elif cant_decimales.isdigit():
+                column_value = round(float(column_value), int(cant_decimales))
             else:
-                cant_decimales = int(cant_decimales)
-                column_value = str(round(float(column_value), cant_decimales))
-        else:
-            column_value = '"' + str(column_value) + '"'
-        dic_value = dic_value + '"' + column_name_id + '":' + column_value  
-        if num_row_act == num_total_rows:
-            dic_value += "}"
+                column_value = float(column_value)
         else:
-            dic_value += ", "
+            column_value = str(column_value)
+        dic_value[col_tuple.name_id] = column_value
 
-    return dic_value
+    # json.dumps escapes quotes, backslashes and control characters of the texts
+    return json.dumps(dic_value)
 
 
 
@@ -166,18 +168,47 @@ def segundos_a_horas_minutos_segundos(segundos: float) -> str:
     return tiempo_str
 
 
+##########################################################################
+### Tiempo de espera antes de reintentar una solicitud
+##########################################################################
+
+def segundos_reintento(headers: Dict[str, str] | None, intento: int) -> float:
+    """
+    Método que se encarga de calcular los segundos a esperar antes de reintentar una solicitud que falló: los que indica el encabezado Retry-After de la respuesta (throttling de SharePoint),
+    o si no viene, 2 elevado al número del intento anterior (1, 2, 4, 8...). El encabezado se busca sin importar mayúsculas y minúsculas.
+
+    Args:
+        headers (Dict[str, str] | None): Encabezados de la respuesta que falló, o None si no hubo respuesta.
+        intento (int): Número del intento que falló, empezando en 1.
+
+    Return:
+        float: Segundos a esperar.
+
+    Ejemplo:
+        print(segundos_reintento({"Retry-After": "10"}, 1))  # Salida: 10.0
+        print(segundos_reintento(None, 3))  # Salida: 4.0
+    """
+    retry_after = next((str(value).strip() for key, value in (headers or {}).items() if key.lower() == "retry-after"), "")
+
+    return float(retry_after) if retry_after.isdigit() else float(2 ** (intento - 1))
+
+
 ###########################################################################
 ### Crear una clave primaria (PK) a partir de una lista de columnas
 ###########################################################################
 
 @check_type_args
-def crear_pk(data: pd.DataFrame, pk: List[str]) -> pd.DataFrame:
+@profiled
+def crear_pk(data: pd.DataFrame, pk: List[str], encoding: str = "text") -> pd.DataFrame:
     """
-    Método encargado de crear una Primary Key de acuerdo a la lista pk en el DataFrame data.
+    Método encargado de crear una Primary Key de acuerdo a la lista pk en el DataFrame data. La llave se arma por columnas (no fila a fila) con `codificar_pk`.
+    Con encoding "text" la llave es el texto de las columnas unido con "-"; si algún valor trae "-" o "\\" se escapan con "\\", así dos combinaciones distintas nunca dan la misma llave (("a-b", "c") y ("a", "b-c") no chocan).
+    Con encoding "hash" la llave es un hash de 64 bits (uint64) de las columnas: ocupa 8 bytes por fila en vez de un texto, pero no se puede leer. Ver `pk_hash_sin_colisiones`.
     
     Args:
         data (pd.DataFrame): DataFrame al que se le quiere crear la Primary Key
         pk (List[str]): Lista con el nombre de las columnas que se quiere que compongan la Primary Key
+        encoding (str, optional): "text" o "hash". Por defecto "text".
     
     Return:
         pd.DataFrame: Dataframe con la Primary Key creada.
@@ -214,16 +245,101 @@ def crear_pk(data: pd.DataFrame, pk: List[str]) -> pd.DataFrame:
     if data.empty:
         data['PK'] = pd.Series(dtype='str')
     else:
-        data['PK'] = data[pk].astype(str).agg('-'.join, axis=1)
+        data['PK'] = codificar_pk(data, pk, encoding)
         data.set_index('PK', inplace=True)
 
     return data
 
+
+@check_type_args
+def codificar_pk(data: pd.DataFrame, pk: List[str], encoding: str = "text") -> pd.Series:
+    """
+    Arma la llave compuesta de cada fila con las columnas pk, operando por columnas. Ver `crear_pk` para los formatos.
+
+    Args:
+        data (pd.DataFrame): DataFrame con las columnas de la llave.
+        pk (List[str]): Columnas que componen la llave.
+        encoding (str, optional): "text" o "hash". Por defecto "text".
+
+    Returns:
+        pd.Series: Llave de cada fila, con el mismo índice de data. De texto con encoding "text" y uint64 con encoding "hash".
+
+    Raises:
+        ValueError: Si el encoding no es "text" ni "hash".
+
+    Ejemplo:
+        codificar_pk(pd.DataFrame({"a": ["a-b", "a"], "b": ["c", "b-c"]}), ["a", "b"])
+        # 0    a\\-b-c
+        # 1    a-b\\-c
+    """
+
+    if encoding == "hash":
+        return pd.util.hash_pandas_object(data[pk].astype(str), index=False)
+    if encoding != "text":
+        raise ValueError(f"The PK encoding '{encoding}' is not available. Use 'text' or 'hash'.")
+
+    columnas = [data[col].astype(str) for col in pk]
+    if len(columnas) == 1:
+        return columnas[0]
+
+    # Escape the separator so different combinations never build the same key
+    columnas = [col.str.replace("\\", "\\\\", regex=False).str.replace("-", "\\-", regex=False) for col in columnas]
+
+    return columnas[0].str.cat(columnas[1:], sep="-")
+
+
+@check_type_args
+def pk_hash_sin_colisiones(frames: List[pd.DataFrame], pk: List[str]) -> bool:
+    """
+    Revisa que la llave "hash" de `crear_pk` no tenga colisiones entre todos los DataFrames que se van a comparar: dos combinaciones distintas de las columnas pk con el mismo hash.
+    Con 64 bits la probabilidad es muy baja (del orden de n² / 2⁶⁵ para n filas), pero si pasa la comparación mezclaría dos registros, así que se revisa antes de usarla.
+
+    Args:
+        frames (List[pd.DataFrame]): DataFrames con las columnas pk.
+        pk (List[str]): Columnas que componen la llave.
+
+    Returns:
+        bool: True si no hay colisiones.
+
+    Ejemplo:
+        if pk_hash_sin_colisiones([df_web, df_to_compare], ["Documento", "Tipo"]):
+            df_web = crear_pk(df_web, ["Documento", "Tipo"], encoding="hash")
+    """
+
+    combinaciones = pd.concat([frame[pk].astype(str) for frame in frames], ignore_index=True).drop_duplicates()
+
+    return not codificar_pk(combinaciones, pk, "hash").duplicated().any()
+
+
+@check_type_args
+def huella_registros(data: pd.DataFrame, column_types: Dict[str, str]) -> pd.Series:
+    """
+    Calcula la huella del contenido de cada fila: el hash de 64 bits de `codificar_pk`, escrito en 16 caracteres hexadecimales, de los valores normalizados (ver `normalizar_valores`) de las columnas de column_types en orden alfabético.
+    Dos filas que SharePoint guarda igual (30 y 30.0 en una columna num(0), por ejemplo) tienen la misma huella, y el orden de las columnas en data no la cambia.
+
+    Args:
+        data (pd.DataFrame): DataFrame con las columnas de column_types.
+        column_types (Dict[str, str]): Columnas que entran en la huella y su tipo de dato en la lista.
+
+    Returns:
+        pd.Series: Huella de cada fila, con el mismo índice de data.
+
+    Ejemplo:
+        df = pd.DataFrame({"Documento": ["doc1", "doc2"], "Edad": [30, "30.0"]})
+        print(huella_registros(df, {"Documento": "str", "Edad": "num(0)"}))
+    """
+
+    columnas = sorted(column_types)
+    valores = normalizar_valores(data[columnas], column_types)
+
+    return codificar_pk(valores, columnas, "hash").map("{:016x}".format)
+
 ###########################################################################
 ### Quitar decimales de los campos claves
 ###########################################################################
 
 @check_type_args
+@profiled
 def quitar_decimales_pk(data: pd.DataFrame, pk: List[str]) -> pd.DataFrame:
     """
     Método encargado de quitar los decimales de la Primary Key
@@ -285,11 +401,145 @@ def quitar_decimales_pk(data: pd.DataFrame, pk: List[str]) -> pd.DataFrame:
 
     return data
 
+###########################################################################
+### Normalizar los valores según el tipo de dato de cada columna
+###########################################################################
+
+VALORES_VACIOS = ["", "nan", "none", "nat", "null", "<na>"]
+
+
+@check_type_args
+def normalizar_valores(data: pd.DataFrame, column_types: Dict[str, str]) -> pd.DataFrame:
+    """
+    Método encargado de llevar los valores de cada columna a un texto canónico según su tipo de dato en la lista (el dataType de `ListSharepoint.get_fields`), así dos valores que SharePoint
+    guarda igual también son iguales al comparar, aunque vengan escritos distinto:
+        - num(n): Se redondean a los n decimales de la columna ("num" sin decimales no se redondea) y se escriben sin ceros de sobra, 30, 30.0 y "30.00" quedan como "30".
+        - date: Fecha y hora, se pasan a UTC y quedan como "2024-01-31T15:00:00Z". Las fechas sin zona horaria se toman como UTC.
+        - datetime: Solo fecha, quedan como "2024-01-31".
+        - str y cualquier otro tipo: Se quitan los espacios al inicio y al final.
+    Los valores vacíos (None, NaN, NaT, "", "nan", "None", "null") quedan todos como "". Los valores que no se pueden leer como número o fecha se dejan como texto sin espacios a los lados.
+    Las columnas que no están en column_types no se modifican.
+
+    Args:
+        data (pd.DataFrame): DataFrame con los valores a normalizar, con los nombres de columnas de la lista (name).
+        column_types (Dict[str, str]): Diccionario con el nombre de cada columna y su tipo de dato.
+
+    Returns:
+        pd.DataFrame: Copia del DataFrame con las columnas de column_types como texto canónico.
+
+    Ejemplo:
+        import pandas as pd
+
+        df = pd.DataFrame({"Edad": [30, "30.0 ", None], "Nombre": [" Juan", "Ana", "nan"], "Ingreso": ["2024-01-31 10:00", "2024-01-31T15:00:00+05:00", ""]})
+        df = normalizar_valores(df, {"Edad": "num(0)", "Nombre": "str", "Ingreso": "date"})
+
+        print(df)
+
+        #Salida esperada:
+          Edad Nombre               Ingreso
+        0   30   Juan  2024-01-31T10:00:00Z
+        1   30    Ana  2024-01-31T10:00:00Z
+        2
+    """
+    columnas = [col for col in data.columns if col in column_types]
+    if not columnas:
+        return data
+
+    data = data.copy()
+    for col in columnas:
+        data[col] = _normalizar_columna(data[col], column_types[col])
+
+    return data
+
+
+def _normalizar_columna(column: pd.Series, data_type: str) -> pd.Series:
+    """Normaliza una columna según su tipo de dato, ver `normalizar_valores`."""
+
+    text = column.astype(str).str.strip()
+    vacio = column.isna() | text.str.lower().isin(VALORES_VACIOS)
+    text = text.mask(vacio, "")
+
+    if data_type.startswith("num"):
+        cant_decimales = obtener_substrn(data_type, '(', ')')
+        numeros = pd.to_numeric(text.mask(vacio), errors="coerce")
+        if cant_decimales.isdigit():
+            numeros = numeros.round(int(cant_decimales))
+        # Adding 0.0 turns a rounded -0.0 into 0.0
+        return _reemplazar_validos(text, numeros + 0.0, lambda validos: [np.format_float_positional(valor, trim='-') for valor in validos])
+
+    if data_type in ("date", "datetime"):
+        if pd.api.types.is_datetime64_any_dtype(column):
+            fechas = pd.to_datetime(column, utc=True)
+        else:
+            fechas = pd.to_datetime(text.mask(vacio), errors="coerce", utc=True, format="mixed")
+        formato = "%Y-%m-%dT%H:%M:%SZ" if data_type == "date" else "%Y-%m-%d"
+        return _reemplazar_validos(text, fechas, lambda validos: validos.dt.strftime(formato).tolist())
+
+    return text
+
+
+def _reemplazar_validos(text: pd.Series, valores: pd.Series, formatear: Any) -> pd.Series:
+    """Reemplaza por posición (el índice puede tener duplicados) los textos cuyo valor se pudo convertir por el valor formateado."""
+
+    validos = valores.notna().to_numpy()
+    if not validos.any():
+        return text
+
+    resultado = text.to_numpy(dtype=object, copy=True)
+    resultado[validos] = formatear(valores[validos])
+
+    return pd.Series(resultado, index=text.index, name=text.name)
+
+###########################################################################
+### Leer la entrada por bloques
+###########################################################################
+
+@check_type_args
+def leer_por_bloques(data: pd.DataFrame | str | Iterator[pd.DataFrame], chunksize: int = 100000) -> Iterator[pd.DataFrame]:
+    """
+    Método encargado de recorrer por bloques los datos que se quieren llevar a una lista, así un archivo de varios GB no se carga completo en memoria. Los datos pueden ser:
+        - pd.DataFrame: Se devuelve como un solo bloque, ya está en memoria.
+        - str: Ruta de un archivo .csv o .parquet, se lee de a chunksize filas (el parquet por lotes con pyarrow).
+        - Iterator[pd.DataFrame]: Se devuelven los bloques tal como vienen, por ejemplo los de pd.read_csv(path, chunksize=50000).
+
+    Args:
+        data (pd.DataFrame | str | Iterator[pd.DataFrame]): Datos a recorrer.
+        chunksize (int, optional): Filas por bloque al leer un archivo. Por defecto 100000.
+
+    Raises:
+        ValueError: Si chunksize es menor a 1 o si la extensión del archivo no es .csv ni .parquet.
+
+    Returns:
+        Iterator[pd.DataFrame]: Bloques de los datos.
+
+    Ejemplo:
+        for bloque in leer_por_bloques("/data/clientes.parquet", chunksize=50000):
+            print(bloque.shape)
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be greater than zero.")
+
+    if isinstance(data, pd.DataFrame):
+        return iter([data])
+
+    if not isinstance(data, str):
+        return data
+
+    extension = os.path.splitext(data)[1].lower()
+    if extension == ".csv":
+        return iter(pd.read_csv(data, chunksize=chunksize))
+    elif extension == ".parquet":
+        import pyarrow.parquet as pq
+        return (batch.to_pandas() for batch in pq.ParquetFile(data).iter_batches(batch_size=chunksize))
+    else:
+        raise ValueError(f"The file '{data}' must be a .csv or a .parquet file.")
+
 ###########################################################################
 ### Quitar duplicados de un DataFrame
 ###########################################################################
 
 @check_type_args
+@profiled
 def quitar_duplicados_df(df: pd.DataFrame, pk: List[str]) -> pd.DataFrame:
     """
     Este método se encarga de quitar los registros duplicados de un DataFrame, para detectar los registros duplicados se toma como clave la lista pk.
@@ -335,18 +585,14 @@ def quitar_duplicados_df(df: pd.DataFrame, pk: List[str]) -> pd.DataFrame:
                     5  Pedro    López
                     6  Pedro    López
 
-        Duplicated items in the DataFrame: 
-        4
-        Deleting duplicated items in the DataFrame...
-
         Después de quitar duplicados:
         index_sharepoint Nombre Apellido
                     1   Juan    Pérez
           """
     df_duplicates = df[df.duplicated(subset=pk, keep=False)]
-    print(f"Duplicated items in the DataFrame: \n{df_duplicates.shape[0]}")
+    logger.info("Duplicated items in the DataFrame: %s", df_duplicates.shape[0])
     if not df_duplicates.empty:
-        print("Deleting duplicated items in the DataFrame...")
+        logger.debug("Deleting duplicated items in the DataFrame: %s", DataFrameSummary(df_duplicates))
         df = df[~df['index_sharepoint'].isin(df_duplicates['index_sharepoint'].tolist())]
     
     return df
@@ -356,7 +602,8 @@ def quitar_duplicados_df(df: pd.DataFrame, pk: List[str]) -> pd.DataFrame:
 ### Editar registro de una lista en específica
 ##############################################################################
 @check_type_args
-def compare_dataframe(df_web = pd.DataFrame(), df_to_compare = pd.DataFrame(), delete: bool =True, insert: bool =True)-> pd.DataFrame:
+@profiled
+def compare_dataframe(df_web = pd.DataFrame(), df_to_compare = pd.DataFrame(), delete: bool =True, insert: bool =True, column_types: Dict[str, str] = {})-> pd.DataFrame:
     """
     Este método se encarga de ahcer una comparación entre dos DataFrames, la comparación la hace teniendo en cuenta que amobs DataFrame tienen un indice igual y sin duplicados, luego hace las siguientes verificaciones:
         - Cuales son los registros que están en df_to_compare y no están en df_web y marca esos registros como 'I' de insert.
@@ -368,9 +615,11 @@ def compare_dataframe(df_web = pd.DataFrame(), df_to_compare = pd.DataFrame(), d
         df_to_compare (pd.DataFrame): DataFrame que se utiliza para la comparación, se entiende que este DataFrame es el que tiene los registros que uno quiere actualizar en el otro DataFrame.
         delete (bool, optional): Booleano que me indica si se quiere que se muestren en el resultado final los registros a eliminar, es decir los registros que están en df_web que no están en df_to_compare. Por defecto es True.
         insert (bool, optional): Booleano que me indica si se quiere que se muestren en el resultado final los registros a insertar, es decir los registros que estén en df_to_compare y que no estén en df_web. Por defecto es True.
+        column_types (Dict[str, str], optional): Tipo de dato de cada columna (ver `normalizar_valores`). Las columnas con tipo se comparan normalizadas y no por su texto, así 30 y "30.0 " son iguales en una columna num(0). Por defecto vacío.
         
     Return:
         pd.Dataframe: Se devuelve el Dataframe df_to_compare con los registros que se necesiten actualizar o con maraca 'U' y si se tiene delete en True e insert en True se le agregan los registros que que se deban eliminar en df_web y los registros que se deben insertar en df_web
+            La columna changed_columns trae en los registros 'U' las columnas que cambiaron (ver `columnas_cambiadas`) y en los demás queda vacía.
         
     Ejemplo:
         import pandas as pd
@@ -397,17 +646,14 @@ def compare_dataframe(df_web = pd.DataFrame(), df_to_compare = pd.DataFrame(), d
         print(df_resultado)
 
         #Salidas Esperadas:
-                        index_sharepoint  Edad action_type
-        Nombre Apellido                                  
-        Juan   Pérez                   1    31          U
-        Luis   Martínez                4    22          I
-        Ana    García                  2    25          D
+                        index_sharepoint  Edad action_type changed_columns
+        Nombre Apellido                                                  
+        Juan   Pérez                   1    31          U        ["Edad"]
+        Luis   Martínez                4    22          I                
+        Ana    García                  2    25          D                
 
         """
-    print('''
-            ---------------------------------------------------------------------------------------------------
-                                Comparando Dataframe con la Lista de Sharepoint
-            ---------------------------------------------------------------------------------------------------''')
+    logger.info("Comparando DataFrame (%s filas) con la lista de SharePoint (%s filas)", df_to_compare.shape[0], df_web.shape[0])
     ##########################################################################
     ### Igualo los tipos de datos de las columnas de dos dataframes
     ##########################################################################
@@ -420,18 +666,18 @@ def compare_dataframe(df_web = pd.DataFrame(), df_to_compare = pd.DataFrame(), d
     df_web = df_web[common_columns]
     df_to_compare = df_to_compare[common_columns]
 
-    # Convertir todas las columnas a string
-    df_web = df_web.astype(str)
-    df_to_compare = df_to_compare.astype(str)
+    # Las columnas con tipo de dato se normalizan, las demás se convierten a string
+    df_web = normalizar_valores(df_web, column_types).astype(str)
+    df_to_compare = normalizar_valores(df_to_compare, column_types).astype(str)
 
-    print(df_to_compare)
+    logger.debug("DataFrame a comparar: %s", DataFrameSummary(df_to_compare))
     # Verificar si hay decimales y enteros flotantes en las columnas
     decimal = df_web.apply(lambda col: col.str.contains(r'\.[1-9]', regex=True).any(), axis=0)
     entero_float = df_web.apply(lambda col: col.str.contains(r'\.0', na=False, regex=True).any(), axis=0)
 
         # Reemplazar ".0" en las columnas si no hay decimales pero hay enteros flotantes
     for col in common_columns:
-        if not decimal[col] and entero_float[col]:
+        if col not in column_types and not decimal[col] and entero_float[col]:
             df_web[col] = df_web[col].str.replace(".0", "")
             df_to_compare[col] = df_to_compare[col].str.replace(".0", "")
 
@@ -462,22 +708,135 @@ def compare_dataframe(df_web = pd.DataFrame(), df_to_compare = pd.DataFrame(), d
         df_to_update = df_to_compare_filter
     
 
-    print(df_to_update)
     columns_name = df_to_update.columns.tolist()
-    print(columns_name)
     lists_columns_name_filter = [col for col in columns_name if (not col.endswith('_y') and not col.endswith('_x'))]
     df_to_update = df_to_update[lists_columns_name_filter]
-    print(df_to_update)
-    print(df_to_update['index_sharepoint'])
+    # Only the 'U' rows have changed columns
+    df_to_update['changed_columns'] = df_to_update['changed_columns'].fillna("")
+
+    if logger.isEnabledFor(logging.INFO):
+        action_counts = df_to_update['action_type'].value_counts() if 'action_type' in df_to_update.columns else {}
+        logger.info("Resultado de la comparación: %s a insertar, %s a actualizar, %s a eliminar",
+                    action_counts.get('I', 0), action_counts.get('U', 0), action_counts.get('D', 0))
+    logger.debug("Registros a actualizar: %s", DataFrameSummary(df_to_update))
 
     return df_to_update
 
 
+##############################################################################
+### Comparar dos DataFrames por particiones de la llave
+##############################################################################
+@check_type_args
+@profiled
+def compare_dataframe_por_particiones(df_web: pd.DataFrame, df_to_compare: pd.DataFrame, delete: bool = True, insert: bool = True, partitions: int = 1, workers: int = 1, column_types: Dict[str, str] = {}) -> pd.DataFrame:
+    """
+    Hace la misma comparación de `compare_dataframe`, pero repartiendo los registros de ambos DataFrames en particiones según el hash del índice (la PK) y comparando una partición a la vez.
+    Como un mismo índice siempre cae en la misma partición el resultado es el mismo, pero las copias intermedias (conversión a texto, merges) solo existen para una partición, así que el pico de memoria baja más o menos en proporción a la cantidad de particiones.
+    Con workers mayor a 1 las particiones se comparan en paralelo en un pool de procesos. A cada proceso solo se le envía su partición, ya convertida a texto y serializada en formato Arrow si pyarrow está instalado (si no, con pickle).
+
+    Args:
+        df_web (pd.DataFrame): DataFrame de referencia, ver `compare_dataframe`.
+        df_to_compare (pd.DataFrame): DataFrame con los registros que se quieren llevar a df_web, ver `compare_dataframe`.
+        delete (bool, optional): Si es True se incluyen los registros a eliminar. Por defecto es True.
+        insert (bool, optional): Si es True se incluyen los registros a insertar. Por defecto es True.
+        partitions (int, optional): Cantidad de particiones. Con 1 es igual a `compare_dataframe`. Por defecto 1.
+        workers (int, optional): Procesos que comparan las particiones. Con 1 se comparan en este proceso y con 0 se usa un proceso por núcleo. Por defecto 1.
+        column_types (Dict[str, str], optional): Tipo de dato de cada columna, ver `compare_dataframe`. Por defecto vacío.
+
+    Returns:
+        pd.DataFrame: Registros a insertar ('I'), actualizar ('U') y eliminar ('D'), con la columna action_type.
+
+    Ejemplo:
+        df_resultado = compare_dataframe_por_particiones(df_web, df_to_compare, delete=True, insert=True, partitions=8)
+        df_resultado = compare_dataframe_por_particiones(df_web, df_to_compare, partitions=32, workers=16)
+    """
+
+    workers = workers or os.cpu_count() or 1
+
+    if partitions <= 1:
+        return compare_dataframe(df_web, df_to_compare, delete, insert, column_types)
+
+    particion_web = pd.util.hash_array(df_web.index.astype(str).to_numpy()) % partitions
+    particion_compare = pd.util.hash_array(df_to_compare.index.astype(str).to_numpy()) % partitions
+
+    if workers > 1:
+        # compare_dataframe only looks at the common columns as text, so only those travel to the workers
+        common_columns = df_web.columns.intersection(df_to_compare.columns).tolist()
+        df_web = df_web[common_columns].astype(str)
+        df_to_compare = df_to_compare[common_columns].astype(str)
+
+    resultados = [None] * partitions
+    tareas = {}
+    pool = ProcessPoolExecutor(max_workers=min(workers, partitions)) if workers > 1 else None
+    try:
+        for particion in range(partitions):
+            parte_web = df_web[particion_web == particion]
+            parte_compare = df_to_compare[particion_compare == particion]
+
+            if parte_compare.empty and parte_web.empty:
+                continue
+            elif parte_web.empty:
+                # Nothing to compare against: every row of the partition is new
+                if insert:
+                    resultados[particion] = normalizar_valores(parte_compare, column_types).assign(action_type='I', changed_columns="")
+            elif pool is not None:
+                tareas[particion] = pool.submit(_comparar_particion, _empaquetar(parte_web), _empaquetar(parte_compare), delete, insert, column_types)
+            else:
+                resultados[particion] = compare_dataframe(parte_web, parte_compare, delete, insert, column_types)
+
+            logger.debug("Partición %s de %s: %s filas de la lista, %s filas del DataFrame", particion + 1, partitions, parte_web.shape[0], parte_compare.shape[0])
+
+        for particion, tarea in tareas.items():
+            resultados[particion] = tarea.result()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    resultados = [resultado for resultado in resultados if resultado is not None]
+    if not resultados:
+        return df_to_compare.iloc[:0].assign(action_type='', changed_columns='')
+
+    return pd.concat(resultados)
+
+
+def _empaquetar(df: pd.DataFrame) -> Any:
+    """Serializa una partición para enviarla a otro proceso: un buffer en formato Arrow IPC si pyarrow está instalado, o el mismo DataFrame (se envía con pickle)."""
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return df
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue()
+
+
+def _desempaquetar(paquete: Any) -> pd.DataFrame:
+    """Recupera la partición serializada con `_empaquetar`."""
+
+    if isinstance(paquete, pd.DataFrame):
+        return paquete
+
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(paquete).read_all().to_pandas()
+
+
+def _comparar_particion(paquete_web: Any, paquete_compare: Any, delete: bool, insert: bool, column_types: Dict[str, str]) -> pd.DataFrame:
+    """Compara una partición en un proceso del pool."""
+    return compare_dataframe(_desempaquetar(paquete_web), _desempaquetar(paquete_compare), delete, insert, column_types)
+
+
 ############################################################################
 ### Obtener las filas que no están en DF_to_compare, pero sí en DF (Eliminar)
 ############################################################################
 
 @check_type_args
+@profiled
 def obtener_index_a_eliminar(df: pd.DataFrame, df_to_compare: pd.DataFrame) -> pd.DataFrame:
     """
     Módulo encargado en comparar dos DataFrames con indices iguales y sin duplicados, obteniendo los elementos que están en df y no están en df_to_compare marcando esos registros con 'D' de delete.
@@ -528,6 +887,7 @@ def obtener_index_a_eliminar(df: pd.DataFrame, df_to_compare: pd.DataFrame) -> p
 ############################################################################
 
 @check_type_args
+@profiled
 def obtener_index_a_insertar(df: pd.DataFrame, df_to_compare: pd.DataFrame) -> pd.DataFrame:
     """
     Método encargado de comparar dos DataFrames con indices iguales y sin duplicados marcando los registros que estén en df_to_compare y no estén en df con 'I'
@@ -635,6 +995,7 @@ def obtener_index_comunes(df: pd.DataFrame, df_to_compare: pd.DataFrame) -> List
 ### Obtener las filas diferentes entre dos dataframes
 ############################################################################
 @check_type_args
+@profiled
 def obtener_filas_con_datos_diferentes(df: pd.DataFrame, df_to_compare: pd.DataFrame) -> pd.DataFrame:
     """
     Método encargado de comparar dos dataframes con indices no duplicados e iguales y revisa de los registros que son comunes entre los dos DataFrames y verifica si tienen algún campo con valor diferente entre ambos DataFrames, si los tiene los marca con 'U' de update.
@@ -645,6 +1006,7 @@ def obtener_filas_con_datos_diferentes(df: pd.DataFrame, df_to_compare: pd.DataF
         
     Return:
         pd.DataFrame: Se devuelve un DataFrame con los registros que estén en ambos DataFrames pero que tengan campos diferentes entre abvmos DataFrams. Se devuelve los valores del DataFrame df_to_compare y se marcan con 'U'
+            En la columna changed_columns queda la lista de columnas que cambiaron en cada registro (ver `columnas_cambiadas`).
         
     Ejemplo:
         import pandas as pd
@@ -671,10 +1033,10 @@ def obtener_filas_con_datos_diferentes(df: pd.DataFrame, df_to_compare: pd.DataF
         print(df_diferentes)
 
         #Salida Esperada
-                        index_sharepoint  Edad action_type
-        Nombre Apellido                                  
-        Juan   Pérez                   1    31          U
-        Pedro  López                   3    41          U
+                        index_sharepoint  Edad action_type changed_columns
+        Nombre Apellido                                                  
+        Juan   Pérez                   1    31          U        ["Edad"]
+        Pedro  López                   3    41          U        ["Edad"]
         """
     # Realizar el merge para obtener las filas comunes
     df_columns_key_eq = pd.merge(
@@ -708,25 +1070,53 @@ def obtener_filas_con_datos_diferentes(df: pd.DataFrame, df_to_compare: pd.DataF
     columns_name = df_merged.columns.tolist()
     lists_columns_name_filter = [col for col in columns_name if (not col.endswith('_y') and not col.endswith('_x'))]
     df_merged = df_merged[lists_columns_name_filter]
-    print(df_merged.columns.tolist())
     df_merged = df_merged.loc[:, ~df_merged.columns.duplicated()]
     df_merged = df_merged[~df_merged.index.duplicated(keep='first')]
 
-    print(df_merged.head())
-    print(df_merged.columns.tolist())
+    logger.debug("Registros comunes a comparar: %s", DataFrameSummary(df_merged))
 
-    # Aplicar la función de comparación
-    df_merged['action_type'] = df_merged.apply(compare_rows, axis=1)
+    # Comparar columna por columna (mismo criterio de compare_rows) para saber qué campos cambiaron en cada registro
+    columnas = [col[:-len('_df1')] for col in df_merged.columns if col.endswith('_df1')]
+    diferentes = pd.DataFrame({col: df_merged[col + '_df1'] != df_merged[col + '_df2'] for col in columnas}, index=df_merged.index)
+    df_merged['action_type'] = np.where(diferentes.any(axis=1), 'U', 'Ok')
 
     # Filtrar los registros que se deben actualizar
     df_to_compare_filter['action_type'] = df_merged.loc[df_to_compare_filter.index, 'action_type']
     df_to_compare_filter = df_to_compare_filter[df_to_compare_filter["action_type"] == "U"]
-    print(df_to_compare_filter)
+    df_to_compare_filter['changed_columns'] = columnas_cambiadas(diferentes.loc[df_to_compare_filter.index])
+    logger.debug("Registros con datos diferentes: %s", DataFrameSummary(df_to_compare_filter))
 
     return df_to_compare_filter
     
 
 
+############################################################################
+##### Columnas que cambiaron en cada registro
+############################################################################
+@check_type_args
+def columnas_cambiadas(diferentes: pd.DataFrame) -> List[str]:
+    """
+    Arma, por cada registro, la lista de columnas con valores diferentes como un texto JSON (así se puede guardar en parquet con el plan). index_sharepoint no se incluye.
+    Con estas columnas el PATCH de un registro 'U' solo envía los campos que cambiaron (ver `ListSharepoint._construir_payloads`).
+
+    Args:
+        diferentes (pd.DataFrame): DataFrame booleano con una columna por campo comparado, True donde el valor cambió.
+
+    Returns:
+        List[str]: Un texto JSON por registro con la lista de columnas que cambiaron.
+
+    Ejemplo:
+        import pandas as pd
+
+        diferentes = pd.DataFrame({"Telefono": [True, False], "Edad": [True, True]}, index=["1", "2"])
+        print(columnas_cambiadas(diferentes))  # Salida: ['["Telefono", "Edad"]', '["Edad"]']
+    """
+    nombres = np.array([col for col in diferentes.columns if col != 'index_sharepoint'], dtype=object)
+    valores = diferentes[list(nombres)].to_numpy(dtype=bool)
+
+    return [json.dumps(nombres[fila].tolist(), ensure_ascii=False) for fila in valores]
+
+
 ############################################################################
 ##### Comparar las columnas de una fila o registro
 ############################################################################
@@ -827,6 +1217,7 @@ def obtener_substrn(cadena: str, Key_ini: str, Key_fin: str) -> str:
 ##############################################################################
 
 @check_type_args
+@profiled
 def cambiar_col_df(data: pd.DataFrame, df_columns: pd.DataFrame, col_name_id: str, col_name: str) -> pd.DataFrame:
     """
     Cambia el nombre de las columnas de un DataFrame según un mapeo definido en otro DataFrame.
@@ -865,4 +1256,85 @@ def cambiar_col_df(data: pd.DataFrame, df_columns: pd.DataFrame, col_name_id: st
     mapping = dict(zip(df_columns[col_name_id], df_columns[col_name]))
     data = data.rename(columns= mapping)
 
-    return data
\ No newline at end of file
+    return data
+
+
+##############################################################################
+### Función para limpiar la definición de las columnas de una lista y poder clonarlas
+##############################################################################
+
+COLUMNAS_SISTEMA = ['Title', 'ContentType', 'Attachments', 'LinkTitle', 'LinkTitleNoMenu', 'Edit', 'DocIcon', 'ItemChildCount',
+                    'FolderChildCount', 'AppAuthor', 'AppEditor', 'Author', 'Editor', 'Created', 'Modified', 'ID', 'ComplianceAssetId',
+                    '_ColorTag', '_ComplianceFlags', '_ComplianceTag', '_ComplianceTagWrittenTime', '_ComplianceTagUserId', '_IsRecord',
+                    '_UIVersionString']
+
+FACETAS_COLUMNA = ['boolean', 'calculated', 'choice', 'currency', 'dateTime', 'defaultValue', 'geolocation', 'hyperlinkOrPicture',
+                   'lookup', 'number', 'personOrGroup', 'term', 'text', 'thumbnail']
+
+PROPIEDADES_COLUMNA = ['name', 'displayName', 'description', 'columnGroup', 'enforceUniqueValues', 'hidden', 'indexed', 'required']
+
+@check_type_args
+def limpiar_definicion_columnas(columns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Este método se encarga de tomar la definición de las columnas que devuelve la API (/lists/{list-id}/columns) y dejar solo las columnas y propiedades que se pueden enviar para crear una lista nueva con el mismo esquema.
+    Se quitan las columnas de solo lectura y las columnas del sistema (Title, ContentType, Attachments, etc.), y de cada columna se quitan las propiedades que asigna el sitio como el id.
+
+    Args:
+        columns (List[Dict[str, Any]]): Lista con la definición de las columnas tal como la devuelve la API.
+
+    Return:
+        List[Dict[str, Any]]: Lista con la definición de las columnas lista para enviarse en la creación de una lista.
+
+    Ejemplo:
+        columns = [
+            {"id": "fa564e0f", "name": "Title", "displayName": "Título", "readOnly": False, "text": {}},
+            {"id": "0cc3c9b4", "name": "field_1", "displayName": "Documento", "readOnly": False, "indexed": True, "text": {"maxLength": 255}}
+        ]
+        columnas = limpiar_definicion_columnas(columns)
+        print(columnas) # Salida: [{"name": "field_1", "displayName": "Documento", "indexed": True, "text": {"maxLength": 255}}]
+    """
+    columnas_limpias = []
+    for column in columns:
+        if column.get('readOnly', False) or column.get('name', '').strip() in COLUMNAS_SISTEMA:
+            continue
+
+        columna = {prop: column[prop] for prop in PROPIEDADES_COLUMNA + FACETAS_COLUMNA if prop in column}
+        columna['name'] = columna['name'].strip()
+        columnas_limpias.append(columna)
+
+    return columnas_limpias
+
+
+
+##############################################################################
+### Resumen perezoso de un DataFrame para los mensajes de log
+##############################################################################
+class DataFrameSummary:
+    """
+    Resumen perezoso de un DataFrame para los mensajes de log: filas, columnas y las primeras filas.
+    El resumen solo se arma cuando el mensaje se va a escribir, así que pasarlo a `logger.debug` no cuesta nada cuando el nivel DEBUG está apagado.
+
+    Args:
+        df (pd.DataFrame): DataFrame que se quiere resumir.
+        rows (int, optional): Cantidad de filas que se muestran. Por defecto 5.
+
+    Ejemplo:
+        logger.debug("Items de la lista: %s", DataFrameSummary(df_col_items))
+        # Items de la lista: 1500 filas x 4 columnas ['Documento', 'Telefono', 'Edad', 'index_sharepoint']
+        #   Documento   Telefono  Edad index_sharepoint
+        # ...
+    """
+
+    def __init__(self, df: Any, rows: int = 5) -> None:
+        self._df = df
+        self._rows = rows
+
+    def __str__(self) -> str:
+        if not isinstance(self._df, pd.DataFrame):
+            return repr(self._df)
+
+        header = f"{self._df.shape[0]} filas x {self._df.shape[1]} columnas {self._df.columns.tolist()}"
+        if self._df.empty or self._rows <= 0:
+            return header
+
+        return f"{header}\n{self._df.head(self._rows).to_string()}"
@@ -0,0 +1,41 @@
+"""
+monitoring:
+    En este subpaquete se encuentran las herramientas para seguir el avance y el comportamiento de las operaciones sobre las listas de SharePoint.
+
+    Clases: Revisa el docstring de cada clase para encontrar la explicación de uso correspondiente.
+        - ProgressReporterInterface: Interfaz de los reportes de avance, con el control de cada cuánto se reporta.
+        - NullProgressReporter: Reporte de avance que no muestra nada.
+        - LogProgressReporter: Reporte de avance que escribe en el log.
+        - TerminalProgressReporter: Reporte de avance con una barra en la terminal.
+        - CallbackProgressReporter: Reporte de avance que llama una función.
+        - RequestMetrics: Métricas de las solicitudes a SharePoint por operación y colección, con histogramas de latencia y salida en JSON o Prometheus.
+        - Tracer: Mide las fases de una operación con tramos anidados y entrega el árbol a sus exportadores.
+        - SpanExporterInterface: Interfaz de los exportadores de tramos.
+        - SpanRecorder: Exportador que guarda en memoria los árboles de tiempos de las últimas operaciones.
+        - OpenTelemetryExporter: Exportador que envía los tramos a OpenTelemetry (requiere opentelemetry-api).
+        - MemoryTracker: Mide la memoria residente y el pico de cada fase de una operación.
+
+    Funciones:
+        - set_log_level: Cambia el nivel del log del paquete o de uno de sus módulos.
+
+Autor: Juan Esteban Rivera Pérez
+"""
+from .progress_interface import ProgressReporterInterface
+from .progress import NullProgressReporter, LogProgressReporter, TerminalProgressReporter, CallbackProgressReporter
+from .logs import set_log_level
+from .metrics import RequestMetrics
+from .memory import MemoryTracker
+from .tracing import Tracer, SpanExporterInterface, SpanRecorder, OpenTelemetryExporter
+
+__all__ = ["ProgressReporterInterface",
+           "NullProgressReporter",
+           "LogProgressReporter",
+           "TerminalProgressReporter",
+           "CallbackProgressReporter",
+           "set_log_level",
+           "RequestMetrics",
+           "Tracer",
+           "SpanExporterInterface",
+           "SpanRecorder",
+           "OpenTelemetryExporter",
+           "MemoryTracker"]
@@ -0,0 +1,27 @@
+import logging
+
+PACKAGE_LOGGER = "MicrosoftGraphAPI"
+
+
+def set_log_level(level: int | str, module: str = "") -> logging.Logger:
+    """
+    Cambia el nivel del log del paquete o de uno de sus módulos. Cada módulo escribe en su propio logger (`logging.getLogger(__name__)`), así que se puede subir el detalle solo donde interesa.
+    El paquete no configura handlers (solo un `NullHandler`), para ver los mensajes la aplicación debe configurar el logging, por ejemplo con `logging.basicConfig()`.
+
+    Args:
+        level (int | str): Nivel del log, por ejemplo logging.DEBUG o "INFO".
+        module (str, optional): Módulo dentro del paquete, por ejemplo "helpers" o "SharepointRepository.list_strategy". Por defecto todo el paquete.
+
+    Returns:
+        logging.Logger: Logger al que se le cambió el nivel.
+
+    Ejemplo:
+        logging.basicConfig(level=logging.WARNING)
+        set_log_level(logging.INFO)                   # Resúmenes de cada fase
+        set_log_level(logging.DEBUG, "helpers")       # Resumen de los DataFrames de la comparación
+    """
+
+    logger = logging.getLogger(f"{PACKAGE_LOGGER}.{module}" if module else PACKAGE_LOGGER)
+    logger.setLevel(level)
+
+    return logger
@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+from typing import Dict, Any
+
+MB = 1024 * 1024
+
+
+class MemoryTracker:
+    """
+    Mide la memoria residente (RSS) del proceso durante las fases de una operación: al inicio, al final y el pico, que se toma con un hilo que muestrea la memoria cada `interval` segundos mientras haya fases abiertas.
+    Se conecta a un `Tracer` para que cada tramo guarde los atributos rss_start_mb, rss_peak_mb y rss_end_mb, y así el árbol de tiempos muestra también la memoria de cada fase.
+
+    La memoria se lee con psutil si está instalado, si no de /proc/self/statm (Linux). Si ninguno está disponible se usa el pico del proceso de `resource` (no baja nunca) y los picos por fase son aproximados.
+
+    Args:
+        interval (float, optional): Segundos entre dos muestras de memoria. Por defecto 0.05.
+
+    Ejemplo:
+        tracer = Tracer(memory=MemoryTracker())
+        list_sharepoint = ListSharepoint(crud=crud, auth=auth, tracer=tracer)
+        list_sharepoint.update_collection(data=data, pk=["Documento"], collection_name="My Collection")
+        print(list_sharepoint.get_memory_report())
+    """
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._open = {}
+        self._sampler = None
+        self._detener = None
+
+    @staticmethod
+    def rss() -> int:
+        """Devuelve la memoria residente actual del proceso en bytes."""
+
+        try:
+            import psutil
+            return psutil.Process().memory_info().rss
+        except ImportError:
+            pass
+
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            pass
+
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            return peak if sys.platform == "darwin" else peak * 1024
+        except ImportError:
+            return 0
+
+    def open(self, key: int) -> None:
+        """Empieza a medir una fase. Arranca el hilo de muestreo si es la primera fase abierta."""
+
+        rss = self.rss()
+        with self._lock:
+            self._open[key] = {"start": rss, "peak": rss}
+            if self._sampler is None:
+                self._detener = threading.Event()
+                self._sampler = threading.Thread(target=self._muestrear, args=(self._detener,), daemon=True)
+                self._sampler.start()
+
+    def close(self, key: int) -> Dict[str, float]:
+        """
+        Termina de medir una fase. Detiene el hilo de muestreo si ya no hay fases abiertas.
+
+        Returns:
+            Dict[str, float]: rss_start_mb, rss_peak_mb, rss_end_mb y rss_delta_mb (pico menos inicio) de la fase.
+        """
+
+        rss = self.rss()
+        sampler = None
+        with self._lock:
+            phase = self._open.pop(key, {"start": rss, "peak": rss})
+            phase["peak"] = max(phase["peak"], rss)
+            if not self._open and self._sampler is not None:
+                sampler, self._sampler = self._sampler, None
+                self._detener.set()
+
+        if sampler is not None and sampler is not threading.current_thread():
+            sampler.join()
+
+        return {
+            "rss_start_mb": round(phase["start"] / MB, 1),
+            "rss_peak_mb": round(phase["peak"] / MB, 1),
+            "rss_end_mb": round(rss / MB, 1),
+            "rss_delta_mb": round((phase["peak"] - phase["start"]) / MB, 1)
+        }
+
+    def _muestrear(self, detener: threading.Event) -> None:
+        while not detener.wait(self.interval):
+            rss = self.rss()
+            with self._lock:
+                for phase in self._open.values():
+                    phase["peak"] = max(phase["peak"], rss)
+
+    @staticmethod
+    def available(memory_budget: int) -> int:
+        """Devuelve los bytes que quedan del presupuesto de memoria (en MB) con la memoria residente actual. Puede ser negativo si ya se pasó."""
+        return memory_budget * MB - MemoryTracker.rss()
+
+    @staticmethod
+    def report(tree: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+        """Saca del árbol de tiempos (ver `SpanRecorder.timing_tree`) la memoria de cada fase, con el camino de la fase como llave (por ejemplo "update_collection/diff")."""
+
+        report = {}
+
+        def recorrer(node: Dict[str, Any], path: str) -> None:
+            path = f"{path}/{node['name']}" if path else node["name"]
+            memory = {name: value for name, value in node["attributes"].items() if name.startswith("rss_")}
+            if memory:
+                # A phase that runs more than once keeps one entry per run
+                key, repeticion = path, 1
+                while key in report:
+                    repeticion += 1
+                    key = f"{path}#{repeticion}"
+                report[key] = memory
+            for child in node["children"]:
+                recorrer(child, path)
+
+        if tree:
+            recorrer(tree, "")
+
+        return report
@@ -0,0 +1,258 @@
+import json
+import threading
+from collections import deque
+from time import time
+from typing import Dict, Any, List, Tuple
+
+
+class RequestMetrics:
+    """
+    Métricas de las solicitudes hechas al sitio de SharePoint: latencia, código de estado, bytes enviados y recibidos, filas, reintentos y esperas por el límite de solicitudes.
+    Cada solicitud se registra en una serie identificada por la operación (list, columns, items-page, post, patch, delete, batch) y el id de la colección, y la latencia se acumula en un histograma.
+    `CRUDSharepointGraphAPI` registra cada solicitud automáticamente; el resumen se obtiene con `snapshot`, `to_json` o `to_prometheus`.
+
+    Args:
+        sample_size (int, optional): Cantidad de latencias que se guardan por serie para calcular los percentiles. Por defecto 1000.
+
+    Ejemplo:
+        crud = CRUDSharepointGraphAPI()
+        ...
+        metrics = crud.get_metrics()
+        print(metrics.snapshot()["collections"])
+        print(metrics.to_prometheus())
+    """
+
+    OPERATIONS = ["list", "columns", "items-page", "post", "patch", "delete", "batch"]
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, sample_size: int = 1000) -> None:
+        self._sample_size = sample_size
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, operation: str, collection_id: str, status: int, seconds: float, bytes_in: int = 0, bytes_out: int = 0, rows: int = 0, started: float | None = None) -> None:
+        """
+        Registra una solicitud.
+
+        Args:
+            operation (str): Operación de la solicitud, ver `OPERATIONS`.
+            collection_id (str): ID de la colección (lista) de la solicitud. Vacío si la solicitud no es sobre una lista.
+            status (int): Código de estado HTTP de la respuesta.
+            seconds (float): Latencia de la solicitud en segundos.
+            bytes_in (int, optional): Bytes recibidos en el cuerpo de la respuesta.
+            bytes_out (int, optional): Bytes enviados en el cuerpo de la solicitud.
+            rows (int, optional): Filas leídas o escritas por la solicitud.
+            started (float, optional): Momento (time.time()) en que empezó la solicitud. Por defecto ahora menos la latencia.
+        """
+
+        started = time() - seconds if started is None else started
+
+        with self._lock:
+            serie = self._serie(operation, collection_id)
+            serie["requests"] += 1
+            serie["status"][status] = serie["status"].get(status, 0) + 1
+            serie["bytes_in"] += bytes_in
+            serie["bytes_out"] += bytes_out
+            serie["rows"] += rows
+            serie["seconds"] += seconds
+            serie["latencies"].append(seconds)
+            serie["first"] = started if serie["first"] is None else min(serie["first"], started)
+            serie["last"] = max(serie["last"], started + seconds)
+
+            for num_bucket, limit in enumerate(self.LATENCY_BUCKETS):
+                if seconds <= limit:
+                    serie["buckets"][num_bucket] += 1
+                    break
+
+    def record_retry(self, operation: str, collection_id: str, amount: int = 1) -> None:
+        """Registra reintentos de una solicitud de la serie."""
+
+        with self._lock:
+            self._serie(operation, collection_id)["retries"] += amount
+
+    def record_throttle_wait(self, operation: str, collection_id: str, seconds: float) -> None:
+        """Registra el tiempo en segundos que se esperó antes de una solicitud por el límite de solicitudes (del cliente o de SharePoint)."""
+
+        if seconds <= 0:
+            return
+
+        with self._lock:
+            serie = self._serie(operation, collection_id)
+            serie["throttle_waits"] += 1
+            serie["throttle_wait_seconds"] += seconds
+
+    def reset(self) -> None:
+        """Borra todas las series registradas."""
+
+        with self._lock:
+            self._series = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Devuelve el resumen de las métricas.
+
+        Returns:
+            Dict[str, Any]: Diccionario con:
+                - series: Lista con el resumen de cada serie (operation, collection_id, requests, status, errors, bytes_in, bytes_out, rows, retries, throttle_waits, throttle_wait_seconds, latency y rows_per_second). La latencia trae sum, mean, p50, p95, max y el histograma acumulado por límite (buckets).
+                - collections: Resumen por colección con requests, rows, seconds, rows_per_second y la latencia p50 y p95 de todas sus solicitudes.
+        """
+
+        with self._lock:
+            series = [(key, dict(serie, status=dict(serie["status"]), latencies=list(serie["latencies"]), buckets=list(serie["buckets"])))
+                      for key, serie in self._series.items()]
+
+        resumen_series = [self._resumir_serie(operation, collection_id, serie) for (operation, collection_id), serie in series]
+
+        collections = {}
+        for (operation, collection_id), serie in series:
+            collection = collections.setdefault(collection_id, {"requests": 0, "rows": 0, "seconds": 0.0, "first": None, "last": 0.0, "latencies": []})
+            collection["requests"] += serie["requests"]
+            collection["rows"] += serie["rows"]
+            collection["seconds"] += serie["seconds"]
+            collection["latencies"] += serie["latencies"]
+            if serie["first"] is not None:
+                collection["first"] = serie["first"] if collection["first"] is None else min(collection["first"], serie["first"])
+            collection["last"] = max(collection["last"], serie["last"])
+
+        resumen_collections = {
+            collection_id: {
+                "requests": collection["requests"],
+                "rows": collection["rows"],
+                "seconds": round(collection["seconds"], 6),
+                "rows_per_second": self._tasa(collection["rows"], collection["first"], collection["last"]),
+                "p50": self._percentil(collection["latencies"], 50),
+                "p95": self._percentil(collection["latencies"], 95)
+            }
+            for collection_id, collection in collections.items()
+        }
+
+        return {"series": resumen_series, "collections": resumen_collections}
+
+    def to_json(self, indent: int | None = None) -> str:
+        """Devuelve el resumen de `snapshot` en formato JSON."""
+
+        return json.dumps(self.snapshot(), indent=indent, default=str)
+
+    def to_prometheus(self, prefix: str = "msgraph") -> str:
+        """
+        Devuelve las métricas en el formato de texto de Prometheus: contadores de solicitudes, bytes, filas, reintentos y esperas, el histograma de latencia, los percentiles p50/p95 y las filas por segundo de cada colección.
+
+        Args:
+            prefix (str, optional): Prefijo del nombre de las métricas. Por defecto "msgraph".
+
+        Returns:
+            str: Métricas en formato de texto de Prometheus.
+        """
+
+        snapshot = self.snapshot()
+        lines = []
+
+        def metrica(name: str, kind: str, help_text: str, samples: List[Tuple[str, Dict[str, Any], float]]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{prefix}_{name}{suffix}{self._etiquetas(labels)} {value}")
+
+        series = snapshot["series"]
+        etiquetas = lambda serie, **extra: {"operation": serie["operation"], "collection_id": serie["collection_id"], **extra}
+
+        metrica("requests_total", "counter", "Solicitudes hechas a SharePoint.",
+                [("", etiquetas(serie, status=status), count) for serie in series for status, count in serie["status"].items()])
+        metrica("request_bytes_in_total", "counter", "Bytes recibidos en las respuestas.", [("", etiquetas(serie), serie["bytes_in"]) for serie in series])
+        metrica("request_bytes_out_total", "counter", "Bytes enviados en las solicitudes.", [("", etiquetas(serie), serie["bytes_out"]) for serie in series])
+        metrica("request_rows_total", "counter", "Filas leídas o escritas.", [("", etiquetas(serie), serie["rows"]) for serie in series])
+        metrica("request_retries_total", "counter", "Reintentos de solicitudes.", [("", etiquetas(serie), serie["retries"]) for serie in series])
+        metrica("request_throttle_wait_seconds_total", "counter", "Segundos de espera por el límite de solicitudes.",
+                [("", etiquetas(serie), serie["throttle_wait_seconds"]) for serie in series])
+
+        histograma = []
+        for serie in series:
+            for limit, count in serie["latency"]["buckets"].items():
+                histograma.append(("_bucket", etiquetas(serie, le=limit), count))
+            histograma.append(("_sum", etiquetas(serie), serie["latency"]["sum"]))
+            histograma.append(("_count", etiquetas(serie), serie["requests"]))
+        metrica("request_duration_seconds", "histogram", "Latencia de las solicitudes.", histograma)
+
+        metrica("request_latency_seconds", "gauge", "Percentiles de latencia de las últimas solicitudes.",
+                [("", etiquetas(serie, quantile=quantile), serie["latency"][name]) for serie in series
+                 for quantile, name in (("0.5", "p50"), ("0.95", "p95")) if serie["latency"][name] is not None])
+        metrica("collection_rows_per_second", "gauge", "Filas por segundo de cada colección.",
+                [("", {"collection_id": collection_id}, collection["rows_per_second"]) for collection_id, collection in snapshot["collections"].items()])
+
+        return "\n".join(lines) + "\n"
+
+    def _serie(self, operation: str, collection_id: str) -> Dict[str, Any]:
+        """Devuelve la serie de la operación y la colección, creándola si no existe. Se llama con el bloqueo tomado."""
+
+        key = (operation, collection_id)
+        if key not in self._series:
+            self._series[key] = {
+                "requests": 0, "status": {}, "bytes_in": 0, "bytes_out": 0, "rows": 0, "retries": 0,
+                "throttle_waits": 0, "throttle_wait_seconds": 0.0, "seconds": 0.0, "first": None, "last": 0.0,
+                "latencies": deque(maxlen=self._sample_size), "buckets": [0] * len(self.LATENCY_BUCKETS)
+            }
+
+        return self._series[key]
+
+    def _resumir_serie(self, operation: str, collection_id: str, serie: Dict[str, Any]) -> Dict[str, Any]:
+        """Arma el resumen de una serie con el histograma acumulado y los percentiles."""
+
+        buckets = {}
+        acumulado = 0
+        for limit, count in zip(self.LATENCY_BUCKETS, serie["buckets"]):
+            acumulado += count
+            buckets[str(limit)] = acumulado
+        buckets["+Inf"] = serie["requests"]
+
+        return {
+            "operation": operation,
+            "collection_id": collection_id,
+            "requests": serie["requests"],
+            "status": serie["status"],
+            "errors": sum(count for status, count in serie["status"].items() if status >= 400),
+            "bytes_in": serie["bytes_in"],
+            "bytes_out": serie["bytes_out"],
+            "rows": serie["rows"],
+            "retries": serie["retries"],
+            "throttle_waits": serie["throttle_waits"],
+            "throttle_wait_seconds": round(serie["throttle_wait_seconds"], 6),
+            "latency": {
+                "sum": round(serie["seconds"], 6),
+                "mean": round(serie["seconds"] / serie["requests"], 6) if serie["requests"] else None,
+                "p50": self._percentil(serie["latencies"], 50),
+                "p95": self._percentil(serie["latencies"], 95),
+                "max": round(max(serie["latencies"]), 6) if serie["latencies"] else None,
+                "buckets": buckets
+            },
+            "rows_per_second": self._tasa(serie["rows"], serie["first"], serie["last"])
+        }
+
+    @staticmethod
+    def _percentil(latencias: List[float], percentile: float) -> float | None:
+        """Percentil de una lista de latencias, con el mismo criterio de `CRUDSharepointGraphAPI.get_latency_percentile`."""
+
+        latencias = sorted(latencias)
+        if not latencias:
+            return None
+
+        return round(latencias[min(len(latencias) - 1, int(len(latencias) * percentile / 100))], 6)
+
+    @staticmethod
+    def _tasa(rows: int, first: float | None, last: float) -> float:
+        """Filas por segundo entre el inicio de la primera solicitud y el final de la última."""
+
+        if first is None or last <= first:
+            return 0.0
+
+        return round(rows / (last - first), 3)
+
+    @staticmethod
+    def _etiquetas(labels: Dict[str, Any]) -> str:
+        """Arma las etiquetas de una muestra de Prometheus escapando los valores."""
+
+        if not labels:
+            return ""
+
+        escape = lambda value: str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+        return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
@@ -0,0 +1,99 @@
+import sys
+import logging
+from typing import Dict, Any, Callable
+from .progress_interface import ProgressReporterInterface
+from ..helpers.helpers import segundos_a_horas_minutos_segundos
+
+
+class NullProgressReporter(ProgressReporterInterface):
+    """
+    Reporte de avance que no muestra nada. Útil en procesos desatendidos donde solo interesa el resultado.
+
+    Ejemplo:
+        list_sharepoint = ListSharepoint(crud=crud, auth=auth, progress=NullProgressReporter())
+    """
+
+    def advance(self, counter: str = "processed", amount: int = 1) -> None:
+        if counter != "processed":
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+        self._counters["processed"] += amount
+
+    def report(self, snapshot: Dict[str, Any]) -> None:
+        pass
+
+
+class LogProgressReporter(ProgressReporterInterface):
+    """
+    Reporte de avance que escribe una línea en el log cada `interval` segundos.
+
+    Args:
+        interval (float, optional): Segundos mínimos entre dos reportes. Por defecto 30.0.
+        logger (logging.Logger, optional): Logger donde se escribe. Por defecto el logger de este módulo.
+        level (int, optional): Nivel de los mensajes. Por defecto logging.INFO.
+
+    Ejemplo:
+        list_sharepoint = ListSharepoint(crud=crud, auth=auth, progress=LogProgressReporter(interval=60.0))
+    """
+
+    def __init__(self, interval: float = 30.0, logger: logging.Logger | None = None, level: int = logging.INFO) -> None:
+        super().__init__(interval)
+        self._logger = logger or logging.getLogger(__name__)
+        self._level = level
+
+    def report(self, snapshot: Dict[str, Any]) -> None:
+        counters = ", ".join(f"{name}={value}" for name, value in snapshot["counters"].items())
+        self._logger.log(self._level, "%s: %s/%s (%s%%) %s, %.1f rows/s, elapsed %s%s",
+                         snapshot["operation"], snapshot["processed"], snapshot["total"], snapshot["percent"], counters, snapshot["rate"],
+                         segundos_a_horas_minutos_segundos(snapshot["elapsed"]),
+                         "" if snapshot["eta"] is None else f", ETA {segundos_a_horas_minutos_segundos(snapshot['eta'])}")
+
+
+class TerminalProgressReporter(ProgressReporterInterface):
+    """
+    Reporte de avance con una barra en la terminal que se reescribe en la misma línea. Es el reporte por defecto de `ListSharepoint`.
+
+    Args:
+        interval (float, optional): Segundos mínimos entre dos reportes. Por defecto 0.5.
+        width (int, optional): Cantidad de caracteres de la barra. Por defecto 30.
+        stream (optional): Donde se escribe la barra. Por defecto sys.stdout.
+
+    Ejemplo:
+        list_sharepoint = ListSharepoint(crud=crud, auth=auth, progress=TerminalProgressReporter())
+        # Actualizando [##########--------------------]  33.33% 1000/3000 U=800 I=150 D=50 | 25.3 rows/s | 00:00:39 ETA 00:01:19
+    """
+
+    def __init__(self, interval: float = 0.5, width: int = 30, stream: Any = None) -> None:
+        super().__init__(interval)
+        self._width = width
+        self._stream = stream or sys.stdout
+
+    def report(self, snapshot: Dict[str, Any]) -> None:
+        filled = int(self._width * snapshot["percent"] / 100)
+        counters = " ".join(f"{name}={value}" for name, value in snapshot["counters"].items() if name != "processed")
+        eta = "" if snapshot["eta"] is None else f" ETA {segundos_a_horas_minutos_segundos(snapshot['eta'])}"
+        line = (f"\r{snapshot['operation']} [{'#' * filled}{'-' * (self._width - filled)}] {snapshot['percent']:6.2f}% "
+                f"{snapshot['processed']}/{snapshot['total']} {counters} | {snapshot['rate']:.1f} rows/s | "
+                f"{segundos_a_horas_minutos_segundos(snapshot['elapsed'])}{eta}")
+        self._stream.write(line + ("\n" if snapshot["finished"] else ""))
+        self._stream.flush()
+
+
+class CallbackProgressReporter(ProgressReporterInterface):
+    """
+    Reporte de avance que llama una función con el resumen del avance cada `interval` segundos. Útil para llevar el avance a una interfaz, una base de datos o una herramienta de monitoreo.
+
+    Args:
+        callback (Callable[[Dict[str, Any]], None]): Función que recibe el resumen del avance (ver `ProgressReporterInterface.snapshot`).
+        interval (float, optional): Segundos mínimos entre dos reportes. Por defecto 1.0.
+
+    Ejemplo:
+        reporter = CallbackProgressReporter(callback=lambda snapshot: print(snapshot["percent"]), interval=5.0)
+        list_sharepoint = ListSharepoint(crud=crud, auth=auth, progress=reporter)
+    """
+
+    def __init__(self, callback: Callable[[Dict[str, Any]], None], interval: float = 1.0) -> None:
+        super().__init__(interval)
+        self._callback = callback
+
+    def report(self, snapshot: Dict[str, Any]) -> None:
+        self._callback(snapshot)
@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+from time import monotonic
+from typing import Dict, Any
+
+
+class ProgressReporterInterface(ABC):
+    """
+    ProgressReporterInterface:
+    Clase encargada de ser la interfaz para reportar el avance de las operaciones largas (create_item, delete_items, update_collection).
+    Los ciclos solo llaman `advance`, que incrementa un contador; el reporte (`report`) solo se hace cuando pasaron `interval` segundos desde el último, así el costo por registro es constante sin importar qué tan caro sea el reporte.
+
+    Args:
+        interval (float, optional): Segundos mínimos entre dos reportes. Por defecto 1.0.
+
+    Los métodos son:
+        - start: Inicia una operación con el total de registros y la información adicional que se quiera mostrar.
+        - advance: Incrementa un contador (por defecto "processed") y reporta si ya pasó el intervalo.
+        - finish: Hace el último reporte de la operación.
+
+    El método abstracto es:
+        - report: Recibe el resumen del avance y lo muestra o lo envía a donde corresponda.
+    """
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self._interval = interval
+        self._operation = ""
+        self._total = 0
+        self._info = {}
+        self._counters = {"processed": 0}
+        self._start_time = monotonic()
+        self._last_report = self._start_time
+
+    def start(self, operation: str, total: int, **info: Any) -> None:
+        """Inicia el avance de una operación con el total de registros a procesar y la información adicional que acompaña los reportes."""
+        self._operation = operation
+        self._total = total
+        self._info = info
+        self._counters = {"processed": 0}
+        self._start_time = monotonic()
+        self._last_report = self._start_time
+
+    def advance(self, counter: str = "processed", amount: int = 1) -> None:
+        """Incrementa el contador indicado (y el de procesados) y reporta si ya pasó el intervalo desde el último reporte."""
+        if counter != "processed":
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+        self._counters["processed"] += amount
+
+        now = monotonic()
+        if now - self._last_report >= self._interval:
+            self._last_report = now
+            self.report(self.snapshot())
+
+    def finish(self) -> None:
+        """Hace el último reporte de la operación."""
+        self.report({**self.snapshot(), "finished": True})
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Devuelve el resumen del avance: operación, total, contadores, tiempo transcurrido, registros por segundo y tiempo estimado para terminar."""
+        elapsed = monotonic() - self._start_time
+        processed = self._counters["processed"]
+        rate = processed / elapsed if elapsed > 0 else 0.0
+
+        return {
+            "operation": self._operation,
+            "total": self._total,
+            "processed": processed,
+            "percent": round(processed / self._total * 100, 2) if self._total else 100.0,
+            "counters": dict(self._counters),
+            "info": self._info,
+            "elapsed": elapsed,
+            "rate": rate,
+            # Without a total (input read by blocks) there is no estimate
+            "eta": (self._total - processed) / rate if rate > 0 and self._total else None,
+            "finished": False
+        }
+
+    @abstractmethod
+    def report(self, snapshot: Dict[str, Any]) -> None:
+        """Método abstracto encargado de mostrar o enviar el resumen del avance."""
+        pass
@@ -0,0 +1,267 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from time import time, perf_counter
+from typing import Dict, Any, List, Iterator
+from .memory import MemoryTracker
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """
+    Tramo de tiempo de una fase de una operación. Los tramos se anidan: cada tramo guarda los tramos que se abrieron mientras estaba activo.
+
+    Args:
+        name (str): Nombre de la fase, por ejemplo "download" o "diff".
+        attributes (Dict[str, Any], optional): Atributos de la fase, por ejemplo el id de la colección o la cantidad de filas.
+    """
+
+    def __init__(self, name: str, attributes: Dict[str, Any] = {}) -> None:
+        self.name = name
+        self.attributes = dict(attributes)
+        self.children = []
+        self.start_time = time()
+        self.end_time = None
+        self._start = perf_counter()
+        self._end = None
+
+    def set_attribute(self, name: str, value: Any) -> None:
+        """Agrega o cambia un atributo del tramo."""
+        self.attributes[name] = value
+
+    def finish(self) -> None:
+        """Cierra el tramo."""
+        self._end = perf_counter()
+        self.end_time = self.start_time + (self._end - self._start)
+
+    @property
+    def seconds(self) -> float:
+        """Duración del tramo en segundos. Si el tramo sigue abierto es el tiempo transcurrido hasta ahora."""
+        return (self._end if self._end is not None else perf_counter()) - self._start
+
+    def to_dict(self, origin: float | None = None) -> Dict[str, Any]:
+        """Devuelve el tramo y sus hijos como un árbol de diccionarios con name, start (segundos desde el inicio del tramo raíz), seconds, attributes y children."""
+
+        origin = self._start if origin is None else origin
+
+        return {
+            "name": self.name,
+            "start": round(self._start - origin, 6),
+            "seconds": round(self.seconds, 6),
+            "attributes": self.attributes,
+            "children": [child.to_dict(origin) for child in self.children]
+        }
+
+
+class SpanExporterInterface(ABC):
+    """
+    Interfaz de los exportadores de tramos. El `Tracer` llama `export` con el tramo raíz cuando termina una operación, con todos sus tramos hijos ya cerrados.
+    """
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """Método abstracto encargado de enviar el árbol de tramos a su destino."""
+        pass
+
+
+class SpanRecorder(SpanExporterInterface):
+    """
+    Exportador que guarda en memoria los árboles de tramos de las últimas operaciones. Es el que usa `ListSharepoint` por defecto.
+
+    Args:
+        max_runs (int, optional): Cantidad de operaciones que se guardan. Por defecto 20.
+
+    Ejemplo:
+        recorder = SpanRecorder()
+        tracer = Tracer(exporters=[recorder])
+        ...
+        print(recorder.format())
+    """
+
+    def __init__(self, max_runs: int = 20) -> None:
+        self._runs = deque(maxlen=max_runs)
+
+    def export(self, span: Span) -> None:
+        self._runs.append(span)
+
+    def runs(self) -> List[Span]:
+        """Devuelve los tramos raíz guardados, del más viejo al más reciente."""
+        return list(self._runs)
+
+    def timing_tree(self, run: int = -1) -> Dict[str, Any]:
+        """
+        Devuelve el árbol de tiempos de una operación guardada.
+
+        Args:
+            run (int, optional): Posición de la operación, como en una lista. Por defecto -1, la última.
+
+        Returns:
+            Dict[str, Any]: Árbol con name, start, seconds, attributes y children de cada tramo. Vacío si no hay operaciones guardadas.
+        """
+
+        if not self._runs:
+            return {}
+
+        return self._runs[run].to_dict()
+
+    def format(self, run: int = -1) -> str:
+        """Devuelve el árbol de tiempos de una operación como texto, un tramo por línea con su duración y el porcentaje del tramo raíz."""
+
+        tree = self.timing_tree(run)
+        if not tree:
+            return ""
+
+        lines = []
+
+        def escribir(node: Dict[str, Any], level: int) -> None:
+            percent = 100 * node["seconds"] / tree["seconds"] if tree["seconds"] else 0.0
+            attributes = " ".join(f"{name}={value}" for name, value in node["attributes"].items())
+            lines.append(f"{'  ' * level}{node['name']:<{max(1, 40 - 2 * level)}} {node['seconds']:10.3f}s {percent:6.1f}% {attributes}".rstrip())
+            for child in node["children"]:
+                escribir(child, level + 1)
+
+        escribir(tree, 0)
+
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        """Borra las operaciones guardadas."""
+        self._runs.clear()
+
+
+class OpenTelemetryExporter(SpanExporterInterface):
+    """
+    Exportador que envía los tramos a OpenTelemetry, con su jerarquía, sus atributos y sus tiempos reales. Requiere el paquete `opentelemetry-api` (y un SDK configurado para que los tramos lleguen a algún lado).
+
+    Args:
+        tracer_name (str, optional): Nombre del tracer de OpenTelemetry. Por defecto "MicrosoftGraphAPI".
+        tracer_provider (optional): TracerProvider de OpenTelemetry. Por defecto el global.
+
+    Raises:
+        ImportError: Si `opentelemetry-api` no está instalado.
+
+    Ejemplo:
+        tracer = Tracer(exporters=[SpanRecorder(), OpenTelemetryExporter()])
+        list_sharepoint = ListSharepoint(crud=crud, auth=auth, tracer=tracer)
+    """
+
+    def __init__(self, tracer_name: str = "MicrosoftGraphAPI", tracer_provider: Any = None) -> None:
+        try:
+            from opentelemetry import trace
+        except ImportError as error:
+            raise ImportError("OpenTelemetryExporter requires the package 'opentelemetry-api'. Install it with: pip install opentelemetry-api opentelemetry-sdk") from error
+
+        self._trace = trace
+        self._tracer = trace.get_tracer(tracer_name, tracer_provider=tracer_provider)
+
+    def export(self, span: Span, parent: Any = None) -> None:
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self._tracer.start_span(span.name, context=context, attributes=self._atributos(span.attributes), start_time=int(span.start_time * 1e9))
+
+        for child in span.children:
+            self.export(child, otel_span)
+
+        otel_span.end(end_time=int((span.end_time or span.start_time + span.seconds) * 1e9))
+
+    @staticmethod
+    def _atributos(attributes: Dict[str, Any]) -> Dict[str, Any]:
+        """OpenTelemetry solo acepta atributos str, bool, int o float, el resto se convierte a texto."""
+        return {name: value if isinstance(value, (str, bool, int, float)) else str(value) for name, value in attributes.items()}
+
+
+class Tracer:
+    """
+    Mide la duración de las fases de una operación con tramos anidados. Cuando termina el tramo raíz (la operación completa) se entrega el árbol a los exportadores.
+
+    Args:
+        exporters (List[SpanExporterInterface], optional): Exportadores que reciben cada árbol terminado. Por defecto un `SpanRecorder`.
+        memory (MemoryTracker, optional): Si se pasa, cada tramo guarda la memoria residente al inicio, al final y el pico de la fase (rss_start_mb, rss_peak_mb, rss_end_mb, rss_delta_mb). Por defecto no se mide la memoria.
+
+    Ejemplo:
+        tracer = Tracer()
+        with tracer.span("update_collection", collection_id="abc"):
+            with tracer.span("download") as span:
+                ...
+                span.set_attribute("rows", 1500)
+        print(tracer.recorder.format())
+    """
+
+    def __init__(self, exporters: List[SpanExporterInterface] = [], memory: MemoryTracker | None = None) -> None:
+        self._exporters = list(exporters) or [SpanRecorder()]
+        self.memory = memory
+        self._local = threading.local()
+
+    @property
+    def recorder(self) -> SpanRecorder | None:
+        """Primer `SpanRecorder` de los exportadores, o None si no hay ninguno."""
+        return next((exporter for exporter in self._exporters if isinstance(exporter, SpanRecorder)), None)
+
+    def _pila(self) -> List[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self) -> Span | None:
+        """Devuelve el tramo activo en este hilo, o None si no hay ninguno."""
+        stack = self._pila()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Abre un tramo hijo del tramo activo (o un tramo raíz si no hay ninguno) y lo cierra al salir del bloque, aunque haya una excepción. Si hay una excepción el tramo guarda el tipo de error en el atributo "error".
+        """
+
+        stack = self._pila()
+        span = Span(name, attributes)
+        if stack:
+            stack[-1].children.append(span)
+        stack.append(span)
+        if self.memory is not None:
+            self.memory.open(id(span))
+
+        try:
+            yield span
+        except BaseException as error:
+            span.set_attribute("error", type(error).__name__)
+            raise
+        finally:
+            span.finish()
+            if self.memory is not None:
+                span.attributes.update(self.memory.close(id(span)))
+            stack.pop()
+            if not stack:
+                for exporter in self._exporters:
+                    # A failing exporter must not break the measured operation
+                    try:
+                        exporter.export(span)
+                    except Exception:
+                        logger.warning("The span exporter %s failed to export '%s'", type(exporter).__name__, span.name, exc_info=True)
+
+
+def traced(name: str):
+    """
+    Decorador que abre un tramo con el nombre dado alrededor de un método, usando el tracer guardado en `self._tracer`. Si el objeto no tiene tracer el método se ejecuta sin medir.
+
+    Ejemplo:
+        class ListSharepoint:
+            @traced("get_items")
+            def get_items(self, ...):
+                ...
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            tracer = getattr(self, "_tracer", None)
+            if tracer is None:
+                return func(self, *args, **kwargs)
+            with tracer.span(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+
+    return decorator
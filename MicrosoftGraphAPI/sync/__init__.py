@@ -0,0 +1,40 @@
+"""
+sync:
+    En este subpaquete se encuentran las clases que ayudan a decidir y ejecutar la sincronización de un DataFrame con una lista de SharePoint.
+
+    Clases: Revisa el docstring de cada clase para encontrar la explicación de uso correspondiente.
+        - SyncPlanner: Estima el costo de cada estrategia de sincronización (incremental, full_replace, targeted_upsert) y escoge la más barata.
+        - SyncPlan: Plan de sincronización guardado en disco (Parquet + manifest) que se puede aplicar por porciones.
+        - SharedRateLimiter: Presupuesto de solicitudes por segundo compartido entre procesos a través de un archivo.
+        - SyncJournal: Journal de una ejecución de update_collection para poder retomarla donde quedó.
+        - KeyIndex: Índice en disco (SQLite) de cada colección que lleva la PK de cada registro al id del elemento, para upsert_items.
+        - ErrorPolicy: Política de errores de las escrituras: fallar rápido o seguir, con cola de reintentos acotada y dead letter en JSONL o Parquet.
+        - SortedMergeDiff: Comparación fuera de memoria con corridas ordenadas por la PK en disco, para listas que no caben en memoria.
+        - DiffBackendInterface: Interfaz de los motores de comparación que se escogen por nombre en update_collection.
+        - PandasDiffBackend: Motor de comparación en memoria con pandas, por particiones y procesos.
+        - SortedMergeDiffBackend: Motor de comparación en disco con SortedMergeDiff.
+        - SQLiteDiffBackend: Motor de comparación en una base de datos SQLite embebida, con joins por la PK.
+
+Autor: Juan Esteban Rivera Pérez
+"""
+from .planner import SyncPlanner
+from .plan import SyncPlan
+from .rate_limit import SharedRateLimiter
+from .journal import SyncJournal
+from .error_policy import ErrorPolicy
+from .key_index import KeyIndex
+from .sorted_merge import SortedMergeDiff
+from .diff_interface import DiffBackendInterface
+from .diff_backends import PandasDiffBackend, SortedMergeDiffBackend, SQLiteDiffBackend
+
+__all__ = ["SyncPlanner",
+           "SyncPlan",
+           "SharedRateLimiter",
+           "SyncJournal",
+           "ErrorPolicy",
+           "KeyIndex",
+           "SortedMergeDiff",
+           "DiffBackendInterface",
+           "PandasDiffBackend",
+           "SortedMergeDiffBackend",
+           "SQLiteDiffBackend"]
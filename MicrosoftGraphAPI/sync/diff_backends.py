@@ -0,0 +1,193 @@
+import os
+import json
+import logging
+import sqlite3
+import tempfile
+import pandas as pd
+from typing import List, Dict, Any
+from ..decorators import *
+from ..helpers.helpers import compare_dataframe_por_particiones, normalizar_valores
+from .diff_interface import DiffBackendInterface
+from .sorted_merge import SortedMergeDiff
+
+logger = logging.getLogger(__name__)
+
+
+class PandasDiffBackend(DiffBackendInterface):
+    """
+    Motor de comparación en memoria con pandas (`compare_dataframe`), opcionalmente por particiones de la PK y en un pool de procesos (ver `compare_dataframe_por_particiones`).
+
+    Args:
+        partitions (int, optional): Cantidad de particiones de la PK. Por defecto 1.
+        workers (int, optional): Procesos que comparan las particiones. Con 0 se usa un proceso por núcleo. Por defecto 1.
+
+    Ejemplo:
+        list_sharepoint.set_diff_backend(PandasDiffBackend(partitions=32, workers=16))
+        list_sharepoint.update_collection(data=data, pk=["Documento"], collection_name="My Collection", diff_backend="pandas")
+    """
+
+    name = "pandas"
+
+    def __init__(self, partitions: int = 1, workers: int = 1) -> None:
+        self.partitions = partitions
+        self.workers = workers
+
+    @check_type_args
+    def compare(self, df_web: pd.DataFrame, df_to_compare: pd.DataFrame, delete: bool = True, insert: bool = True, column_types: Dict[str, str] = {}) -> pd.DataFrame:
+        return compare_dataframe_por_particiones(df_web, df_to_compare, delete, insert, self.partitions, self.workers, column_types)
+
+
+class SortedMergeDiffBackend(DiffBackendInterface):
+    """
+    Motor de comparación fuera de memoria: escribe ambos lados en disco en corridas ordenadas por la PK y los recorre a la vez (ver `SortedMergeDiff`).
+
+    Args:
+        run_rows (int, optional): Filas por corrida. Por defecto 100000.
+        directory (str, optional): Carpeta de las corridas. Por defecto una carpeta temporal.
+
+    Ejemplo:
+        list_sharepoint.update_collection(data=data, pk=["Documento"], collection_name="My Collection", diff_backend="sorted_merge")
+    """
+
+    name = "sorted_merge"
+
+    def __init__(self, run_rows: int = 100000, directory: str = "") -> None:
+        self.run_rows = run_rows
+        self.directory = directory
+        self.stats = {}
+
+    @check_type_args
+    def compare(self, df_web: pd.DataFrame, df_to_compare: pd.DataFrame, delete: bool = True, insert: bool = True, column_types: Dict[str, str] = {}) -> pd.DataFrame:
+        with SortedMergeDiff(directory=self.directory, run_rows=self.run_rows, delete=delete, insert=insert, column_types=column_types) as diff:
+            for inicio in range(0, df_web.shape[0], self.run_rows):
+                diff.add_web(df_web.iloc[inicio:inicio + self.run_rows])
+            for inicio in range(0, df_to_compare.shape[0], self.run_rows):
+                diff.add_source(df_to_compare.iloc[inicio:inicio + self.run_rows])
+            df_to_update = diff.compare()
+
+        self.stats = diff.stats
+
+        return df_to_update
+
+
+class SQLiteDiffBackend(DiffBackendInterface):
+    """
+    Motor de comparación en una base de datos SQLite embebida (módulo sqlite3 de Python, sin servidor), como hacía `AppiSharepoint.obtain_df_to_compare` con tablas en la LZ:
+    ambos lados se cargan en tablas por bloques, se indexan por la PK y los registros a insertar, actualizar y eliminar salen de joins por la PK.
+    Por defecto la base de datos es un archivo temporal, así SQLite baja a disco lo que no le cabe en su caché y la comparación no depende de la memoria disponible.
+
+    Args:
+        path (str, optional): Archivo de la base de datos, o ":memory:" para tenerla en memoria. Por defecto un archivo temporal que se borra al terminar.
+        batch_rows (int, optional): Filas por bloque al cargar las tablas y al leer los resultados. Por defecto 50000.
+        cache_mb (int, optional): Memoria de la caché de páginas de SQLite en MB. Por defecto 64.
+
+    Ejemplo:
+        list_sharepoint.update_collection(data=data, pk=["Documento"], collection_name="My Collection", diff_backend="sqlite")
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = "", batch_rows: int = 50000, cache_mb: int = 64) -> None:
+        self.path = path
+        self.batch_rows = batch_rows
+        self.cache_mb = cache_mb
+
+    @check_type_args
+    def compare(self, df_web: pd.DataFrame, df_to_compare: pd.DataFrame, delete: bool = True, insert: bool = True, column_types: Dict[str, str] = {}) -> pd.DataFrame:
+        comunes = [col for col in df_web.columns.intersection(df_to_compare.columns).tolist() if col != "index_sharepoint"]
+        # Same rule as compare_dataframe: ".0" is dropped from the untyped columns of the list without real decimals
+        sin_decimales = [col for col in comunes if col not in column_types and self._enteros_flotantes(df_web[col])]
+
+        path = self.path or self._archivo_temporal()
+        connection = sqlite3.connect(path)
+        try:
+            connection.execute(f"PRAGMA cache_size = -{self.cache_mb * 1024}")
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+
+            # Positional column names so any column name of the list is valid in SQL
+            columnas_sql = [f"c{num}" for num in range(len(comunes))]
+            self._cargar(connection, "web", df_web, comunes, sin_decimales, columnas_sql, column_types, with_id=True)
+            self._cargar(connection, "src", df_to_compare, comunes, sin_decimales, columnas_sql, column_types, with_id=False)
+
+            seleccion = ", ".join(f"s.{col}" for col in columnas_sql)
+            diferentes = " OR ".join(f"s.{col} IS NOT w.{col}" for col in columnas_sql) or "0"
+            consultas = []
+            if insert:
+                consultas.append(("I", f"SELECT s.pk, {seleccion or 'NULL'}, '' FROM src s WHERE NOT EXISTS (SELECT 1 FROM web w WHERE w.pk = s.pk) ORDER BY s.rowid"))
+            # The values of the item come after index_sharepoint to know which columns changed
+            seleccion_actual = "".join(f", w.{col}" for col in columnas_sql)
+            consultas.append(("U", f"SELECT s.pk, {seleccion or 'NULL'}, w.index_sharepoint{seleccion_actual} FROM src s JOIN web w ON w.pk = s.pk WHERE {diferentes} ORDER BY s.rowid"))
+            if delete:
+                seleccion_web = ", ".join(f"w.{col}" for col in columnas_sql) or "NULL"
+                consultas.append(("D", f"SELECT w.pk, {seleccion_web}, w.index_sharepoint FROM web w WHERE NOT EXISTS (SELECT 1 FROM src s WHERE s.pk = w.pk) ORDER BY w.rowid"))
+
+            bloques = []
+            for action, consulta in consultas:
+                cursor = connection.execute(consulta)
+                while True:
+                    filas = cursor.fetchmany(self.batch_rows)
+                    if not filas:
+                        break
+                    bloques.append(self._bloque(filas, comunes, action))
+        finally:
+            connection.close()
+            if not self.path:
+                os.remove(path)
+
+        if not bloques:
+            return pd.DataFrame(columns=comunes + ["index_sharepoint", "action_type", "changed_columns"], index=pd.Index([], name="PK"))
+
+        df_to_update = pd.concat(bloques)
+        if logger.isEnabledFor(logging.INFO):
+            action_counts = df_to_update["action_type"].value_counts()
+            logger.info("Resultado de la comparación en SQLite: %s a insertar, %s a actualizar, %s a eliminar",
+                        action_counts.get("I", 0), action_counts.get("U", 0), action_counts.get("D", 0))
+
+        return df_to_update
+
+    @staticmethod
+    def _archivo_temporal() -> str:
+        descriptor, path = tempfile.mkstemp(prefix="msgraph_diff_", suffix=".sqlite")
+        os.close(descriptor)
+        return path
+
+    @staticmethod
+    def _enteros_flotantes(column: pd.Series) -> bool:
+        text = column.astype(str)
+        return not text.str.contains(r'\.[1-9]', regex=True).any() and bool(text.str.contains(r'\.0', na=False, regex=True).any())
+
+    def _cargar(self, connection: sqlite3.Connection, table: str, df: pd.DataFrame, comunes: List[str], sin_decimales: List[str], columnas_sql: List[str], column_types: Dict[str, str], with_id: bool) -> None:
+        """Carga un lado en su tabla por bloques de batch_rows filas y crea el índice de la PK."""
+
+        columnas = ["pk"] + columnas_sql + (["index_sharepoint"] if with_id else [])
+        connection.execute(f"CREATE TABLE {table} ({', '.join(f'{col} TEXT' for col in columnas)})")
+        insertar = f"INSERT INTO {table} VALUES ({', '.join('?' * len(columnas))})"
+
+        for inicio in range(0, df.shape[0], self.batch_rows):
+            bloque = df.iloc[inicio:inicio + self.batch_rows]
+            text = normalizar_valores(bloque[comunes + (["index_sharepoint"] if with_id else [])], column_types).astype(str)
+            for col in sin_decimales:
+                text[col] = text[col].str.replace(".0", "")
+            connection.executemany(insertar, zip(bloque.index.astype(str), *(text[col] for col in text.columns)))
+
+        connection.execute(f"CREATE INDEX {table}_pk ON {table} (pk)")
+        connection.commit()
+
+    @staticmethod
+    def _bloque(filas: List[tuple], comunes: List[str], action: str) -> pd.DataFrame:
+        columnas = len(comunes)
+        cambiadas = [""] * len(filas)
+        if action == "U":
+            # The 'U' rows bring the values of the item after index_sharepoint
+            cambiadas = [json.dumps([col for col, nuevo, actual in zip(comunes, fila[1:columnas + 1], fila[columnas + 2:]) if nuevo != actual], ensure_ascii=False) for fila in filas]
+            filas = [fila[:columnas + 2] for fila in filas]
+        if not comunes:
+            # The queries select a NULL placeholder when there are no common columns
+            filas = [(fila[0], fila[-1]) for fila in filas]
+
+        df = pd.DataFrame(filas, columns=["PK"] + comunes + ["index_sharepoint"]).set_index("PK")
+        df["action_type"] = action
+        df["changed_columns"] = cambiadas
+
+        return df
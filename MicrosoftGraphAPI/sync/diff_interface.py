@@ -0,0 +1,29 @@
+from abc import ABC, abstractmethod
+import pandas as pd
+from typing import Dict
+
+
+class DiffBackendInterface(ABC):
+    """
+    DiffBackendInterface:
+    Clase encargada de ser la interfaz de los motores que comparan los items de una lista de SharePoint con el DataFrame que se quiere llevar a la lista.
+    `ListSharepoint.update_collection` y `plan_update` escogen el motor por su nombre (argumento diff_backend), así el mismo plan se puede calcular en pandas, en disco o en una base de datos embebida.
+
+    Todos los motores reciben ambos DataFrames con la PK como índice (ver `crear_pk`) y devuelven los registros a insertar ('I'), actualizar ('U') y eliminar ('D') con la columna action_type
+    y la columna changed_columns, que en los 'U' trae las columnas que cambiaron (ver `columnas_cambiadas`) para enviar solo esos campos en el PATCH,
+    con los mismos criterios de `compare_dataframe`: solo se comparan las columnas comunes, las que tienen tipo de dato en column_types normalizadas con `normalizar_valores`
+    y las demás como texto y sin el ".0" de las columnas de la lista que no tienen decimales.
+
+    El atributo es:
+        - name: Nombre con el que se escoge el motor.
+
+    El método abstracto es:
+        - compare: Compara los dos DataFrames y devuelve el plan.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def compare(self, df_web: pd.DataFrame, df_to_compare: pd.DataFrame, delete: bool = True, insert: bool = True, column_types: Dict[str, str] = {}) -> pd.DataFrame:
+        """Método abstracto encargado de comparar los items de la lista (df_web) con el DataFrame (df_to_compare) y devolver el plan con la columna action_type."""
+        pass
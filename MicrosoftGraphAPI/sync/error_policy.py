@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import requests
+import pandas as pd
+from collections import deque
+from typing import Callable, Dict, Any
+from ..decorators import *
+
+
+class ErrorPolicy:
+    """
+    Clase encargada de decidir qué pasa cuando falla una escritura de `create_item`, `delete_items`, `update_collection` o `apply_plan`.
+    Con mode "fail_fast" la primera operación que falla del todo levanta el error, como siempre. Con mode "continue" la ejecución sigue:
+        - Las fallas transitorias (RETRYABLE_STATUS o sin respuesta del servidor) pasan a una cola de reintentos, que se recorre por rondas al final de la ejecución, hasta max_attempts intentos por operación.
+        - Las operaciones que fallan del todo (sin reintentos o con un error que no es transitorio) se escriben en el archivo de dead letter con su acción, PK, id, payload, código de estado, error e intentos, para revisarlas o reenviarlas después.
+
+    Args:
+        mode (str, optional): "fail_fast" o "continue". Por defecto "fail_fast".
+        max_attempts (int, optional): Intentos máximos de cada operación, contando el primero. Por defecto 3.
+        dead_letter_path (str, optional): Ruta del archivo .jsonl o .parquet con las operaciones que fallaron del todo. El .jsonl se escribe línea a línea y el .parquet al terminar cada operación. Si no se pasa solo quedan en `failures`.
+        retry_delay (float, optional): Segundos de espera antes de la primera ronda de reintentos; cada ronda espera el doble que la anterior. Por defecto 1.
+        summary_only (bool, optional): Si es True los métodos devuelven el resumen por acción (ver `summary`) en lugar de un registro por operación. Por defecto False.
+
+    Raises:
+        ValueError: Si el mode no es "fail_fast" ni "continue", si max_attempts es menor que 1 o si el archivo de dead letter no es .jsonl ni .parquet.
+
+    Ejemplo:
+        policy = ErrorPolicy(mode="continue", max_attempts=4, dead_letter_path="/data/clientes_fallidos.jsonl", summary_only=True)
+        summary = list_sharepoint.update_collection(data=data, pk=["Documento"], collection_name="Clientes", error_policy=policy)
+        print(summary)
+    """
+
+    MODES = ("fail_fast", "continue")
+    # Status codes worth retrying: timeouts, throttling and server errors
+    RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+
+    @check_type_args
+    def __init__(self, mode: str = "fail_fast", max_attempts: int = 3, dead_letter_path: str = "", retry_delay: float = 1.0, summary_only: bool = False) -> None:
+
+        if mode not in self.MODES:
+            raise ValueError(f"The error policy mode must be one of {self.MODES}, got '{mode}'.")
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        if dead_letter_path and os.path.splitext(dead_letter_path)[1].lower() not in (".jsonl", ".parquet"):
+            raise ValueError(f"The dead letter file must be .jsonl or .parquet, got '{dead_letter_path}'.")
+
+        self.mode = mode
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+        self.retry_delay = retry_delay
+        self.summary_only = summary_only
+        self.start()
+
+    def start(self, on_retry: Callable[[str], None] | None = None) -> None:
+        """
+        Empieza una ejecución nueva: vacía la cola de reintentos, las fallas y los conteos de la anterior.
+
+        Args:
+            on_retry (Callable[[str], None], optional): Función que se llama con la serie de las métricas de cada operación reintentada, por ejemplo `RequestMetrics.record_retry`.
+        """
+
+        self._on_retry = on_retry
+        self.failures = []
+        self._queue = deque()
+        self._rounds = 0
+        self._counts = {}
+        self._dead_letter = None
+
+    @staticmethod
+    def status_of(error: Exception) -> int:
+        """Devuelve el código de estado de la respuesta que produjo el error, o 0 si no hubo respuesta (conexión caída, timeout...)."""
+        return int(getattr(getattr(error, "response", None), "status_code", 0) or 0)
+
+    def retryable(self, error: Exception) -> bool:
+        """Indica si el error es transitorio y vale la pena reintentar la operación."""
+
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+
+        return isinstance(error, requests.HTTPError) and self.status_of(error) in self.RETRYABLE_STATUS
+
+    def submit(self, send: Callable[[], int], confirm: Callable[[int], None], action: str, pk: str = "", item_id: str = "", payload: str = "", operation: str = "") -> None:
+        """
+        Método encargado de enviar una operación según la política. confirm se llama con el código de estado final de la operación: el de la solicitud exitosa, o el del último error si falló del todo.
+        Con "continue" la operación puede quedar en la cola de reintentos y confirm se llama en `retry_round`. Con "fail_fast" confirm se llama con el código del error justo antes de levantarlo.
+
+        Args:
+            send (Callable[[], int]): Función que hace la solicitud y devuelve el código de estado, o levanta el error.
+            confirm (Callable[[int], None]): Función que recibe el código de estado final de la operación.
+            action (str): Acción de la operación ('I', 'U' o 'D').
+            pk (str, optional): PK del registro, para el dead letter.
+            item_id (str, optional): Id del elemento en SharePoint, para el dead letter.
+            payload (str, optional): JSON enviado, para el dead letter.
+            operation (str, optional): Serie de las métricas ("post", "patch" o "delete") donde se cuentan los reintentos.
+
+        Raises:
+            Exception: Con "fail_fast", el error de la operación cuando falla del todo.
+        """
+
+        self._intentar({"send": send, "confirm": confirm, "action": action, "pk": pk, "item_id": item_id, "payload": payload, "operation": operation, "attempts": 0})
+
+    def pending(self) -> int:
+        """Cantidad de operaciones en la cola de reintentos."""
+        return len(self._queue)
+
+    def retry_round(self) -> None:
+        """
+        Método encargado de reintentar una vez las operaciones de la cola, después de esperar retry_delay duplicado por cada ronda anterior.
+        Las que vuelven a fallar con un error transitorio y todavía tienen intentos quedan en la cola para la siguiente ronda.
+        """
+
+        if not self._queue:
+            return
+
+        time.sleep(self.retry_delay * 2 ** self._rounds)
+        self._rounds += 1
+
+        for _ in range(len(self._queue)):
+            self._intentar(self._queue.popleft())
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Método encargado de devolver el resumen de la ejecución por acción.
+
+        Returns:
+            pd.DataFrame: Una fila por acción (action_type como índice) con requests (operaciones), succeeded, failed y retries (reintentos hechos).
+                En `attrs['dead_letter']` queda la ruta del archivo de dead letter.
+        """
+
+        summary = pd.DataFrame.from_dict(self._counts, orient="index", columns=["requests", "succeeded", "failed", "retries"]).astype(int)
+        summary.index.name = "action_type"
+        summary.attrs["dead_letter"] = self.dead_letter_path
+
+        return summary
+
+    def close(self) -> None:
+        """Termina de escribir el archivo de dead letter."""
+
+        if self._dead_letter is not None:
+            self._dead_letter.close()
+            self._dead_letter = None
+        if self.failures and self.dead_letter_path.lower().endswith(".parquet"):
+            pd.DataFrame(self.failures).to_parquet(self.dead_letter_path, index=False)
+
+    def _intentar(self, operation: Dict[str, Any]) -> None:
+        """Hace un intento de la operación y decide si se confirma, se reintenta o va al dead letter."""
+
+        counts = self._counts.setdefault(operation["action"], [0, 0, 0, 0])
+
+        while True:
+            if operation["attempts"]:
+                counts[3] += 1
+                if self._on_retry is not None:
+                    self._on_retry(operation["operation"])
+            else:
+                counts[0] += 1
+            operation["attempts"] += 1
+            try:
+                status = operation["send"]()
+            except Exception as error:
+                if not self.retryable(error) or operation["attempts"] >= self.max_attempts:
+                    if self.mode == "fail_fast":
+                        counts[2] += 1
+                        operation["confirm"](self.status_of(error))
+                        raise
+                    self._descartar(operation, error)
+                    counts[2] += 1
+                    return
+                if self.mode == "continue":
+                    self._queue.append(operation)
+                    return
+                # Fail fast retries right away before giving up
+                time.sleep(self.retry_delay * 2 ** (operation["attempts"] - 1))
+                continue
+
+            counts[1] += 1
+            operation["confirm"](status)
+            return
+
+    def _descartar(self, operation: Dict[str, Any], error: Exception) -> None:
+        """Pasa una operación que falló del todo al dead letter y la confirma con el código de estado del error."""
+
+        status = self.status_of(error)
+        failure = {"action": operation["action"], "pk": operation["pk"], "item_id": operation["item_id"], "payload": operation["payload"],
+                   "status": status, "error": str(error), "attempts": operation["attempts"]}
+        self.failures.append(failure)
+
+        if self.dead_letter_path.lower().endswith(".jsonl"):
+            if self._dead_letter is None:
+                self._dead_letter = open(self.dead_letter_path, "a", encoding="utf-8")
+            self._dead_letter.write(json.dumps(failure, ensure_ascii=False) + "\n")
+            self._dead_letter.flush()
+
+        operation["confirm"](status)
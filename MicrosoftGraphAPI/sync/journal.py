@@ -0,0 +1,129 @@
+import os
+import json
+import shutil
+import pandas as pd
+from uuid import uuid4
+from datetime import datetime
+from typing import List, Dict, Any
+from ..decorators import *
+from .plan import SyncPlan
+
+
+class SyncJournal:
+    """
+    Clase encargada de llevar el journal (registro previo a la escritura) de una ejecución de `update_collection`, para poder retomarla si se cae a mitad de camino.
+    Cada ejecución tiene su carpeta <directory>/<run_id> con:
+        - El plan completo (operations.parquet y manifest.json, ver `SyncPlan`), que se guarda antes de la primera escritura.
+        - writes.jsonl: Una línea por cada escritura confirmada con el PK, la acción, el id del elemento y el código de estado.
+
+    Al retomar una ejecución se carga el plan del journal, sin volver a descargar la lista ni a comparar, y se saltan las operaciones que ya quedaron confirmadas.
+
+    Args:
+        directory (str): Carpeta donde se guardan los journals de las ejecuciones.
+        run_id (str, optional): Id de la ejecución. Si no se pasa se crea uno nuevo con la fecha y un sufijo aleatorio.
+
+    Ejemplo:
+        journal = SyncJournal(directory="/data/journal")
+        journal.save_plan(df_to_update, {"collection_id": "my_collection_id"})
+        journal.record(pk="doc1", action="U", item_id="15", status=200)
+        print(journal.completed())
+    """
+
+    WRITES_FILE = "writes.jsonl"
+
+    def __init__(self, directory: str, run_id: str = "") -> None:
+        self.run_id = run_id or f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid4().hex[:6]}"
+        self.path = os.path.join(directory, self.run_id)
+        self.manifest = {}
+        self._writes = None
+
+    def exists(self) -> bool:
+        """Indica si la ejecución ya tiene un plan guardado en el journal."""
+        return os.path.isfile(os.path.join(self.path, SyncPlan.MANIFEST_FILE))
+
+    def discard(self) -> None:
+        """Elimina el journal de la ejecución (plan y escrituras confirmadas)."""
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.manifest = {}
+
+    @check_type_args
+    def save_plan(self, operations: pd.DataFrame, manifest: Dict[str, Any]) -> SyncPlan:
+        """
+        Método encargado de guardar el plan de la ejecución antes de hacer cualquier escritura.
+
+        Args:
+            operations (pd.DataFrame): Plan con las columnas action_type, index_sharepoint y json_post, y el PK como índice.
+            manifest (Dict[str, Any]): Información del plan. Debe tener la llave collection_id.
+
+        Returns:
+            SyncPlan: Plan guardado.
+        """
+
+        plan = SyncPlan(operations=operations, manifest={**manifest, "run_id": self.run_id})
+        plan.save(self.path)
+        self.manifest = plan.manifest
+
+        return plan
+
+    def load_plan(self) -> SyncPlan:
+        """Carga el plan guardado en el journal de la ejecución."""
+        plan = SyncPlan.load(self.path)
+        self.manifest = plan.manifest
+
+        return plan
+
+    def update_manifest(self, **values: Any) -> None:
+        """Actualiza llaves del manifest del plan, por ejemplo el id de la colección después de vaciarla con full_replace."""
+        self.manifest = {**self.manifest, **values}
+        with open(os.path.join(self.path, SyncPlan.MANIFEST_FILE), "w", encoding="utf-8") as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=4, ensure_ascii=False)
+
+    @check_type_args
+    def record(self, pk: str, action: str, item_id: str, status: int) -> None:
+        """
+        Método encargado de registrar una escritura confirmada. La línea se escribe y se vacía al disco de inmediato, para que sobreviva si el proceso muere.
+
+        Args:
+            pk (str): PK del registro del plan.
+            action (str): Acción aplicada ('I', 'U' o 'D').
+            item_id (str): Id del elemento en SharePoint (en las inserciones es el id del elemento creado).
+            status (int): Código de estado de la solicitud.
+        """
+
+        if self._writes is None:
+            self._writes = open(os.path.join(self.path, self.WRITES_FILE), "a", encoding="utf-8")
+
+        self._writes.write(json.dumps({"pk": pk, "action": action, "item_id": item_id, "status": status}, ensure_ascii=False) + "\n")
+        self._writes.flush()
+
+    def completed(self) -> Dict[str, int]:
+        """
+        Método encargado de devolver las operaciones ya confirmadas de la ejecución.
+
+        Returns:
+            Dict[str, int]: Diccionario con el PK de cada operación confirmada y su código de estado.
+        """
+
+        writes_path = os.path.join(self.path, self.WRITES_FILE)
+        if not os.path.isfile(writes_path):
+            return {}
+
+        completed = {}
+        with open(writes_path, "r", encoding="utf-8") as writes_file:
+            for line in writes_file:
+                try:
+                    write = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line can be cut if the process died while writing it
+                    continue
+                if write["status"] in (200, 201, 204):
+                    completed[write["pk"]] = write["status"]
+
+        return completed
+
+    def close(self) -> None:
+        """Cierra el archivo de escrituras confirmadas."""
+        if self._writes is not None:
+            self._writes.close()
+            self._writes = None
@@ -0,0 +1,136 @@
+import os
+import json
+import sqlite3
+import pandas as pd
+from datetime import datetime, timezone
+from typing import List, Dict
+from ..decorators import *
+
+
+class KeyIndex:
+    """
+    Clase encargada de guardar en disco el índice de una colección que lleva la llave de cada registro (la PK de `crear_pk` con encoding "text") al id del elemento en SharePoint.
+    El índice es una base de datos SQLite, <directory>/<collection_id>.keys.sqlite, con la llave como clave primaria: buscar un registro no depende del tamaño de la lista y no hay que descargarla.
+    Se mantiene al día con las escrituras confirmadas (inserciones y eliminaciones) y con las lecturas de la lista: la descarga completa de `update_collection` lo reconstruye y las búsquedas de `upsert_items` agregan lo que encuentran.
+
+    Args:
+        directory (str): Carpeta donde se guardan los índices de las colecciones.
+        collection_id (str): Id de la colección.
+
+    Ejemplo:
+        index = KeyIndex(directory="/data/key_index", collection_id="my_collection_id")
+        index.update({"doc1": "15"})
+        print(index.lookup(["doc1", "doc2"]))  # {'doc1': '15'}
+    """
+
+    # SQLite accepts at most 999 parameters per statement in old versions
+    LOOKUP_BATCH = 900
+
+    def __init__(self, directory: str, collection_id: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.collection_id = collection_id
+        self.path = os.path.join(directory, f"{collection_id}.keys.sqlite")
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS keys (pk TEXT PRIMARY KEY, item_id TEXT NOT NULL) WITHOUT ROWID")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS keys_item_id ON keys (item_id)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._connection.commit()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    @property
+    def pk(self) -> List[str]:
+        """Columnas de la llave con las que se armó el índice, vacío si todavía no tiene registros."""
+        return json.loads(self._meta("pk") or "[]")
+
+    @property
+    def synced_at(self) -> str:
+        """Fecha (UTC, ISO 8601) de la última reconstrucción con la lista completa, vacío si nunca se ha reconstruido."""
+        return self._meta("synced_at")
+
+    @check_type_args
+    def check_pk(self, pk: List[str]) -> None:
+        """
+        Método encargado de revisar que el índice sea de las mismas columnas de la llave. Si el índice está vacío queda con estas columnas.
+
+        Raises:
+            ValueError: Si el índice se armó con otras columnas de la llave.
+        """
+
+        if not self.pk:
+            self._set_meta(pk=json.dumps(pk))
+        elif self.pk != pk:
+            raise ValueError(f"The key index of the collection '{self.collection_id}' was built with the key {self.pk}, not {pk}. Run update_collection with this key to rebuild it.")
+
+    @check_type_args
+    def lookup(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Método encargado de buscar el id de los elementos de varias llaves.
+
+        Args:
+            keys (List[str]): Llaves a buscar.
+
+        Returns:
+            Dict[str, str]: Id del elemento de cada llave encontrada. Las llaves que no están en el índice no aparecen.
+        """
+
+        found = {}
+        for inicio in range(0, len(keys), self.LOOKUP_BATCH):
+            bloque = keys[inicio:inicio + self.LOOKUP_BATCH]
+            cursor = self._connection.execute(f"SELECT pk, item_id FROM keys WHERE pk IN ({', '.join('?' * len(bloque))})", bloque)
+            found.update(cursor.fetchall())
+
+        return found
+
+    @check_type_args
+    def update(self, mapping: Dict[str, str]) -> None:
+        """Agrega o reemplaza el id del elemento de cada llave."""
+
+        with self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO keys VALUES (?, ?)", mapping.items())
+
+    @check_type_args
+    def remove(self, keys: List[str] = [], item_ids: List[str] = []) -> None:
+        """Quita del índice las llaves indicadas y las de los elementos con los ids indicados, por ejemplo después de eliminarlos de la lista."""
+
+        with self._connection:
+            self._connection.executemany("DELETE FROM keys WHERE pk = ?", ((key,) for key in keys))
+            self._connection.executemany("DELETE FROM keys WHERE item_id = ?", ((item_id,) for item_id in item_ids))
+
+    @check_type_args
+    def rebuild(self, keys: pd.Series, item_ids: pd.Series, pk: List[str]) -> None:
+        """
+        Método encargado de reemplazar todo el índice con la lista completa recién descargada.
+
+        Args:
+            keys (pd.Series): Llave de cada elemento de la lista.
+            item_ids (pd.Series): Id de cada elemento, en el mismo orden de keys.
+            pk (List[str]): Columnas de la llave.
+        """
+
+        with self._connection:
+            self._connection.execute("DELETE FROM keys")
+            self._connection.executemany("INSERT OR REPLACE INTO keys VALUES (?, ?)", zip(keys.astype(str), item_ids.astype(str)))
+        self._set_meta(pk=json.dumps(pk), synced_at=datetime.now(timezone.utc).isoformat(timespec="seconds"))
+
+    def close(self) -> None:
+        """Cierra la conexión con el índice."""
+        self._connection.close()
+
+    def delete(self) -> None:
+        """Cierra la conexión y elimina el índice del disco, por ejemplo cuando la colección se recrea y sus ids de elementos ya no existen."""
+
+        self.close()
+        for path in (self.path, f"{self.path}-wal", f"{self.path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _meta(self, key: str) -> str:
+        fila = self._connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return fila[0] if fila else ""
+
+    def _set_meta(self, **values: str) -> None:
+        with self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", values.items())
@@ -0,0 +1,141 @@
+import os
+import json
+import pandas as pd
+from datetime import datetime
+from typing import List, Dict, Any
+from ..decorators import *
+
+
+class SyncPlan:
+    """
+    Clase que representa un plan de sincronización guardado en disco, para calcular el diff una sola vez y repartir su aplicación entre varios procesos o máquinas.
+    El plan es una carpeta con dos archivos:
+        - operations.parquet: Una fila por operación con las columnas PK, action_type ('I', 'U', 'D'), index_sharepoint y json_post.
+        - manifest.json: Información del plan, como el id de la colección, la estrategia, los conteos por acción y la fecha de creación.
+
+    Args:
+        operations (pd.DataFrame): DataFrame con las columnas action_type, index_sharepoint y json_post, y el PK como índice o como columna.
+        manifest (Dict[str, Any]): Diccionario con la información del plan. Debe tener la llave collection_id.
+
+    Raises:
+        ValueError: Si al DataFrame le falta alguna de las columnas necesarias o si el manifest no tiene collection_id.
+
+    Ejemplo:
+        plan = SyncPlan(operations=df_to_update, manifest={"collection_id": "my_collection_id"})
+        plan.save("/tmp/plan_clientes")
+        plan = SyncPlan.load("/tmp/plan_clientes")
+        shard = plan.shard(0, 4)
+    """
+
+    OPERATIONS_FILE = "operations.parquet"
+    MANIFEST_FILE = "manifest.json"
+    COLUMNS = ["PK", "action_type", "index_sharepoint", "json_post"]
+
+    def __init__(self, operations: pd.DataFrame, manifest: Dict[str, Any]) -> None:
+
+        if "PK" not in operations.columns:
+            operations = operations.rename_axis("PK").reset_index()
+
+        missing = set(self.COLUMNS) - set(operations.columns)
+        if missing:
+            raise ValueError(f"The following columns were not found in the plan operations: {list(missing)}")
+        if not manifest.get("collection_id"):
+            raise ValueError("The plan manifest must have a collection_id.")
+
+        self.operations = operations[self.COLUMNS].astype(str).reset_index(drop=True)
+        self.manifest = manifest
+
+    ##############################################################################
+    ### Guardar el plan en disco
+    ##############################################################################
+    @check_type_args
+    def save(self, path: str) -> str:
+        """
+        Método encargado de guardar el plan en la carpeta path (operations.parquet y manifest.json). Si la carpeta no existe se crea.
+
+        Args:
+            path (str): Carpeta donde se guarda el plan.
+
+        Returns:
+            str: Ruta de la carpeta donde quedó guardado el plan.
+
+        Ejemplo:
+            plan.save("/tmp/plan_clientes")
+        """
+
+        os.makedirs(path, exist_ok=True)
+        self.operations.to_parquet(os.path.join(path, self.OPERATIONS_FILE), index=False)
+
+        action_counts = self.operations["action_type"].value_counts()
+        self.manifest = {
+            **self.manifest,
+            "created": self.manifest.get("created", datetime.now().isoformat(timespec="seconds")),
+            "rows": int(self.operations.shape[0]),
+            "counts": {action: int(action_counts.get(action, 0)) for action in ("I", "U", "D")},
+            "operations_file": self.OPERATIONS_FILE
+        }
+
+        with open(os.path.join(path, self.MANIFEST_FILE), "w", encoding="utf-8") as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=4, ensure_ascii=False)
+
+        return path
+
+    ##############################################################################
+    ### Cargar un plan desde disco
+    ##############################################################################
+    @classmethod
+    def load(cls, path: str) -> "SyncPlan":
+        """
+        Método encargado de cargar un plan guardado con `save`.
+
+        Args:
+            path (str): Carpeta donde está guardado el plan.
+
+        Returns:
+            SyncPlan: Plan cargado.
+
+        Raises:
+            ValueError: Si en la carpeta no se encuentra el manifest.json.
+
+        Ejemplo:
+            plan = SyncPlan.load("/tmp/plan_clientes")
+        """
+
+        manifest_path = os.path.join(path, cls.MANIFEST_FILE)
+        if not os.path.isfile(manifest_path):
+            raise ValueError(f"The plan manifest was not found in '{path}'.")
+
+        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+
+        operations = pd.read_parquet(os.path.join(path, manifest.get("operations_file", cls.OPERATIONS_FILE)))
+
+        return cls(operations=operations, manifest=manifest)
+
+    ##############################################################################
+    ### Obtener una porción (shard) del plan
+    ##############################################################################
+    @check_type_args
+    def shard(self, shard: int = 0, of: int = 1) -> pd.DataFrame:
+        """
+        Método encargado de devolver las operaciones de una porción del plan. Las porciones se reparten por posición (fila % of == shard), por lo que son disjuntas y de tamaño parecido.
+
+        Args:
+            shard (int, optional): Número de la porción, empieza en 0. Por defecto 0.
+            of (int, optional): Cantidad total de porciones. Por defecto 1.
+
+        Returns:
+            pd.DataFrame: Operaciones de la porción, con el PK como índice.
+
+        Raises:
+            ValueError: Si of es menor a 1 o si shard no está entre 0 y of - 1.
+
+        Ejemplo:
+            plan = SyncPlan.load("/tmp/plan_clientes")
+            operaciones = plan.shard(shard=1, of=4)
+        """
+
+        if of < 1 or not 0 <= shard < of:
+            raise ValueError(f"The shard must be between 0 and {of - 1} and 'of' must be greater than zero.")
+
+        return self.operations.iloc[shard::of].set_index("PK")
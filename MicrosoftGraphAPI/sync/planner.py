@@ -0,0 +1,170 @@
+from typing import List, Dict, Any
+from math import ceil
+from ..decorators import *
+
+
+class SyncPlanner:
+    """
+    Clase encargada de escoger la estrategia más barata para llevar una lista de SharePoint al estado de un DataFrame.
+    El costo de cada estrategia se estima como la cantidad de solicitudes que necesita por la latencia medida de cada tipo de solicitud (GET, POST, PATCH, DELETE).
+
+    Las estrategias son:
+        - incremental: Aplica el diff registro a registro (insertar, actualizar y eliminar).
+        - full_replace: Vacía la lista con `truncate_collection` y vuelve a insertar todos los registros del DataFrame. Solo aplica cuando se insertan y eliminan registros, porque el resultado tiene que ser el mismo que el del diff.
+          Como cambia el id de la lista y de sus elementos, con "auto" solo se escoge si se permite con allow_full_replace; si no, queda como recomendación en la explicación.
+        - targeted_upsert: Busca solo las llaves del DataFrame con $filter, sin descargar la lista, y aplica las inserciones y actualizaciones. Solo aplica cuando no hay registros para eliminar.
+          Su ventaja sobre incremental es no descargar la lista, por eso se compara con download_done en False (ver `estimate`).
+
+    Args:
+        latencies (Dict[str, float], optional): Latencia en segundos por método HTTP. Los métodos que no vengan toman la latencia por defecto.
+        default_latency (float, optional): Latencia en segundos que se usa cuando no se ha medido un método. Por defecto 0.25.
+        keys_per_lookup (int, optional): Cantidad de llaves que se pueden buscar en una sola solicitud en la estrategia targeted_upsert. Por defecto 15.
+        page_size (int, optional): Cantidad de elementos que devuelve cada página al descargar la lista. Por defecto 200.
+        truncate_requests (int, optional): Cantidad de solicitudes que cuesta vaciar la lista con `truncate_collection` (las dos lecturas de la definición, la eliminación y la creación). Por defecto 4.
+
+    Ejemplo:
+        planner = SyncPlanner(latencies={"POST": 0.3, "PATCH": 0.25, "DELETE": 0.2})
+        plan = planner.choose(rows_source=1000, rows_collection=1000, rows_insert=0, rows_update=950, rows_delete=0)
+        print(plan["strategy"], plan["explanation"])
+    """
+
+    STRATEGIES = ["incremental", "full_replace", "targeted_upsert"]
+
+    def __init__(self, latencies: Dict[str, float] = {}, default_latency: float = 0.25, keys_per_lookup: int = 15, page_size: int = 200, truncate_requests: int = 4) -> None:
+        self._default_latency = default_latency
+        self._latencies = {method: latencies.get(method) or default_latency for method in ("GET", "POST", "PATCH", "DELETE")}
+        self._keys_per_lookup = keys_per_lookup
+        self._page_size = page_size
+        self._truncate_requests = truncate_requests
+
+    ##############################################################################
+    ### Estimar el costo de cada estrategia
+    ##############################################################################
+    @check_type_args
+    def estimate(self, rows_source: int, rows_collection: int, rows_insert: int, rows_update: int, rows_delete: int, delete: bool = True, insert: bool = True, download_done: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Método encargado de estimar la cantidad de solicitudes y el tiempo en segundos de cada estrategia.
+
+        Args:
+            rows_source (int): Cantidad de registros del DataFrame que se quiere llevar a la lista.
+            rows_collection (int): Cantidad de elementos que tiene la lista.
+            rows_insert (int): Cantidad de registros a insertar según el diff.
+            rows_update (int): Cantidad de registros a actualizar según el diff.
+            rows_delete (int): Cantidad de registros a eliminar según el diff.
+            delete (bool, optional): Si la sincronización elimina los registros que no están en el DataFrame. Por defecto es True.
+            insert (bool, optional): Si la sincronización inserta los registros que no están en la lista. Por defecto es True.
+            download_done (bool, optional): Si la lista ya se descargó, en ese caso la descarga no se cuenta en el costo. Por defecto es True.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Diccionario con la llave de cada estrategia y como valor las llaves requests, seconds y eligible.
+        """
+
+        get, post, patch, delete_latency = (self._latencies[method] for method in ("GET", "POST", "PATCH", "DELETE"))
+        download_requests = 0 if download_done else max(1, ceil(rows_collection / self._page_size))
+
+        costs = {
+            "incremental": {
+                "requests": download_requests + rows_insert + rows_update + rows_delete,
+                "seconds": download_requests * get + rows_insert * post + rows_update * patch + rows_delete * delete_latency,
+                "eligible": True
+            },
+            "full_replace": {
+                "requests": self._truncate_requests + rows_source,
+                "seconds": self._truncate_requests * self._default_latency + rows_source * post,
+                "eligible": delete and insert
+            },
+        }
+
+        lookup_requests = 0 if download_done else ceil(rows_source / self._keys_per_lookup)
+        costs["targeted_upsert"] = {
+            "requests": lookup_requests + rows_insert + rows_update,
+            "seconds": lookup_requests * get + rows_insert * post + rows_update * patch,
+            "eligible": rows_delete == 0
+        }
+
+        for cost in costs.values():
+            cost["seconds"] = round(cost["seconds"], 3)
+
+        return costs
+
+    ##############################################################################
+    ### Escoger la estrategia más barata
+    ##############################################################################
+    @check_type_args
+    def choose(self, rows_source: int, rows_collection: int, rows_insert: int, rows_update: int, rows_delete: int, delete: bool = True, insert: bool = True, download_done: bool = True, strategy: str = "auto", strategies: List[str] = [], allow_full_replace: bool = False) -> Dict[str, Any]:
+        """
+        Método encargado de escoger la estrategia más barata entre las que aplican, o de validar la estrategia forzada por el usuario.
+        Ante un empate se prefiere el orden de `STRATEGIES`, es decir primero incremental.
+
+        Args:
+            rows_source, rows_collection, rows_insert, rows_update, rows_delete, delete, insert, download_done: Ver `estimate`.
+            strategy (str, optional): "auto" para escoger la más barata o el nombre de una estrategia para forzarla. Por defecto "auto".
+            strategies (List[str], optional): Estrategias que se pueden usar. Por defecto todas las de `STRATEGIES`.
+            allow_full_replace (bool, optional): Si es True, "auto" puede escoger full_replace. Si es False solo se usa cuando se fuerza con strategy, y si era la más barata la explicación lo dice. Por defecto es False.
+
+        Returns:
+            Dict[str, Any]: Diccionario con la estrategia escogida (strategy), la estrategia pedida (requested), los conteos usados (counts), los costos de cada estrategia (costs) y la explicación de la decisión (explanation).
+
+        Raises:
+            ValueError: Si la estrategia no existe o si se fuerza una estrategia que no aplica para la sincronización.
+
+        Ejemplo:
+            planner = SyncPlanner()
+            plan = planner.choose(rows_source=10, rows_collection=5000, rows_insert=0, rows_update=10, rows_delete=4990, allow_full_replace=True)
+            print(plan["strategy"])  # Salida: full_replace
+        """
+
+        allowed = [name for name in self.STRATEGIES if not strategies or name in strategies]
+        if strategy != "auto" and strategy not in allowed:
+            raise ValueError(f"The strategy '{strategy}' is not available. Use 'auto' or one of {allowed}.")
+
+        costs = self.estimate(rows_source, rows_collection, rows_insert, rows_update, rows_delete, delete, insert, download_done)
+        for name in costs:
+            costs[name]["eligible"] = costs[name]["eligible"] and name in allowed
+        summary = ", ".join(f"{name}: {cost['requests']} requests ~{cost['seconds']}s" + ("" if cost["eligible"] else " (not eligible)") for name, cost in costs.items())
+
+        if strategy == "auto":
+            # Recreating the list changes its id, so auto only takes it when the caller allows it
+            eligible = [name for name in allowed if costs[name]["eligible"] and (name != "full_replace" or allow_full_replace)]
+            chosen = min(eligible, key=lambda name: costs[name]["seconds"])
+            explanation = f"'{chosen}' is the cheapest eligible strategy ({summary})."
+            if "full_replace" not in eligible and costs["full_replace"]["eligible"] and costs["full_replace"]["seconds"] < costs[chosen]["seconds"]:
+                explanation += " 'full_replace' would be cheaper, but it recreates the list and changes the ids of the list and its items; pass allow_full_replace=True to let it be chosen."
+        else:
+            if not costs[strategy]["eligible"]:
+                raise ValueError(f"The strategy '{strategy}' does not apply to this sync ({summary}).")
+            chosen = strategy
+            explanation = f"'{chosen}' was forced by the caller ({summary})."
+
+        counts = {"rows_source": rows_source, "rows_collection": rows_collection, "rows_insert": rows_insert, "rows_update": rows_update, "rows_delete": rows_delete}
+
+        return {"strategy": chosen, "requested": strategy, "counts": counts, "costs": costs, "explanation": explanation}
+
+    ##############################################################################
+    ### Escalar los conteos de una muestra
+    ##############################################################################
+    @staticmethod
+    @check_type_args
+    def estimate_from_sample(sample_counts: Dict[str, int], sample_size: int, total_size: int) -> Dict[str, int]:
+        """
+        Método encargado de escalar los conteos de un diff hecho sobre una muestra al total de registros, útil para decidir la estrategia sin comparar todo.
+
+        Args:
+            sample_counts (Dict[str, int]): Conteos del diff de la muestra, con las llaves rows_insert, rows_update y rows_delete.
+            sample_size (int): Cantidad de registros de la muestra.
+            total_size (int): Cantidad total de registros.
+
+        Returns:
+            Dict[str, int]: Conteos estimados para el total de registros.
+
+        Ejemplo:
+            SyncPlanner.estimate_from_sample({"rows_insert": 2, "rows_update": 10, "rows_delete": 0}, sample_size=100, total_size=10000)
+            # Salida: {"rows_insert": 200, "rows_update": 1000, "rows_delete": 0}
+        """
+
+        if sample_size <= 0:
+            raise ValueError("The sample size must be greater than zero.")
+
+        factor = total_size / sample_size
+
+        return {name: int(round(count * factor)) for name, count in sample_counts.items()}
@@ -0,0 +1,68 @@
+import os
+import time
+from ..decorators import *
+
+
+class SharedRateLimiter:
+    """
+    Clase encargada de repartir un presupuesto de solicitudes por segundo entre varios procesos que escriben en el mismo sitio de SharePoint.
+    El presupuesto se guarda en un archivo (por defecto dentro de la carpeta del plan), así todos los procesos que usen el mismo archivo comparten el mismo límite sin importar cuántos sean.
+    Cada llamado a `acquire` reserva el siguiente turno libre y espera hasta que llegue.
+
+    Args:
+        path (str): Ruta del archivo donde se guarda el siguiente turno libre. Debe ser la misma para todos los procesos que comparten el presupuesto.
+        requests_per_second (float): Cantidad de solicitudes por segundo para todos los procesos juntos. Si es 0 no se limita.
+        lock_timeout (float, optional): Segundos que se espera por el bloqueo del archivo antes de tomarlo como abandonado. Por defecto 10.
+
+    Ejemplo:
+        limiter = SharedRateLimiter(path="/tmp/plan_clientes/rate_limit.budget", requests_per_second=20)
+        limiter.acquire()
+        crud.url_posts(url, data)
+    """
+
+    def __init__(self, path: str, requests_per_second: float, lock_timeout: float = 10.0) -> None:
+        self._path = path
+        self._lock_path = f"{path}.lock"
+        self._interval = 1 / requests_per_second if requests_per_second > 0 else 0.0
+        self._lock_timeout = lock_timeout
+
+    def acquire(self) -> float:
+        """Reserva el siguiente turno libre del presupuesto compartido y espera hasta que llegue. Devuelve los segundos que se esperó."""
+
+        if not self._interval:
+            return 0.0
+
+        self._bloquear()
+        try:
+            now = time.time()
+            try:
+                with open(self._path, "r") as budget_file:
+                    next_slot = float(budget_file.read() or 0)
+            except (FileNotFoundError, ValueError):
+                next_slot = 0.0
+
+            slot = max(now, next_slot)
+            with open(self._path, "w") as budget_file:
+                budget_file.write(repr(slot + self._interval))
+        finally:
+            os.remove(self._lock_path)
+
+        if slot > now:
+            time.sleep(slot - now)
+
+        return max(0.0, slot - now)
+
+    def _bloquear(self) -> None:
+        """Toma el bloqueo del archivo de presupuesto creándolo de forma exclusiva. Si el bloqueo es más viejo que lock_timeout se toma como abandonado."""
+
+        while True:
+            try:
+                os.close(os.open(self._lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self._lock_path) > self._lock_timeout:
+                        os.remove(self._lock_path)
+                except FileNotFoundError:
+                    pass
+                time.sleep(0.001)
@@ -0,0 +1,344 @@
+import os
+import json
+import heapq
+import shutil
+import logging
+import tempfile
+import pandas as pd
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Dict, Any, Iterator, Tuple
+from ..decorators import *
+from ..helpers.helpers import quitar_decimales_pk, crear_pk, normalizar_valores, leer_por_bloques
+
+logger = logging.getLogger(__name__)
+
+WEB = "web"
+SOURCE = "source"
+
+
+class SortedMergeDiff:
+    """
+    Comparación fuera de memoria entre los items de una lista de SharePoint (web) y el DataFrame que se quiere llevar a la lista (source), para listas que no caben en memoria.
+    Cada lado se recibe por bloques y se escribe en disco en corridas (runs) ordenadas por la PK de a `run_rows` filas. Al comparar, las corridas de cada lado se mezclan en orden
+    y los dos lados se recorren a la vez (merge-join), marcando cada PK como 'I', 'U' o 'D' con los mismos criterios de `compare_dataframe`. La memoria usada depende de `run_rows` y no del tamaño de la lista.
+
+    Diferencias con `compare_dataframe`:
+        - El resultado queda ordenado por la PK y no por acción.
+        - Si una PK está repetida en el DataFrame se descartan todas sus filas (como `quitar_duplicados_df`). Si está repetida en la lista se compara con el primer item y los demás se ignoran;
+          sus ids quedan en `web_duplicates` para poder eliminarlos (ver `quitar_duplicados_en_collections`).
+        - La comparación se puede recorrer varias veces (las corridas quedan en disco hasta `close`): `count` solo cuenta las acciones y `diff` entrega los bloques, así el plan no tiene que quedar completo en memoria.
+        - index_sharepoint no se compara: en 'U' y 'D' trae el id del item de la lista y en 'I' queda vacío.
+
+    Args:
+        directory (str, optional): Carpeta donde se escriben las corridas. Por defecto una carpeta temporal que se borra al cerrar.
+        run_rows (int, optional): Filas por corrida y por bloque del resultado. Por defecto 100000.
+        delete (bool, optional): Si es True se incluyen los items a eliminar. Por defecto es True.
+        insert (bool, optional): Si es True se incluyen los registros a insertar. Por defecto es True.
+        column_types (Dict[str, str], optional): Tipo de dato de cada columna, las columnas con tipo se comparan normalizadas (ver `normalizar_valores`). Por defecto vacío.
+
+    Raises:
+        ValueError: Si run_rows es menor a 1.
+
+    Ejemplo:
+        with SortedMergeDiff(run_rows=50000) as diff:
+            for pagina in paginas_de_la_lista:
+                diff.add_web(crear_pk(pagina, ["Documento"]))
+            diff.add_source_file("/data/clientes.csv", pk=["Documento"])
+            for bloque in diff.diff():
+                print(bloque["action_type"].value_counts())
+    """
+
+    # Runs merged at the same time; more runs are merged in several passes
+    MAX_FAN_IN = 64
+
+    def __init__(self, directory: str = "", run_rows: int = 100000, delete: bool = True, insert: bool = True, column_types: Dict[str, str] = {}) -> None:
+        if run_rows < 1:
+            raise ValueError("run_rows must be greater than zero.")
+
+        self._owns_directory = not directory
+        self.directory = directory or tempfile.mkdtemp(prefix="msgraph_diff_")
+        os.makedirs(self.directory, exist_ok=True)
+        self.run_rows = run_rows
+        self.delete = delete
+        self.insert = insert
+        self.column_types = dict(column_types)
+        self._columns = {WEB: None, SOURCE: None}
+        self._buffers = {WEB: [], SOURCE: []}
+        self._runs = {WEB: [], SOURCE: []}
+        self._sequence = 0
+        self._decimal = {}
+        self._entero_float = {}
+        self.stats = {"web_rows": 0, "source_rows": 0, "runs": 0, "duplicates": 0, "I": 0, "U": 0, "D": 0}
+        self.web_duplicates = []
+
+    def __enter__(self) -> "SortedMergeDiff":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    ##############################################################################
+    ### Agregar bloques de cada lado
+    ##############################################################################
+    @check_type_args
+    def add_web(self, df: pd.DataFrame) -> None:
+        """
+        Agrega un bloque de items de la lista. El índice debe ser la PK (ver `crear_pk`) y debe traer la columna index_sharepoint.
+
+        Raises:
+            ValueError: Si falta la columna index_sharepoint o si las columnas no son las mismas de los bloques anteriores.
+        """
+
+        if "index_sharepoint" not in df.columns:
+            raise ValueError("The SharePoint items must have the column index_sharepoint.")
+
+        # Same rule as compare_dataframe: ".0" is dropped from the untyped columns of the list without real decimals
+        for col in df.columns:
+            if col == "index_sharepoint" or col in self.column_types:
+                continue
+            text = df[col].astype(str)
+            self._decimal[col] = self._decimal.get(col, False) or bool(text.str.contains(r'\.[1-9]', regex=True).any())
+            self._entero_float[col] = self._entero_float.get(col, False) or bool(text.str.contains(r'\.0', na=False, regex=True).any())
+
+        self._agregar(WEB, df)
+
+    @check_type_args
+    def add_source(self, df: pd.DataFrame) -> None:
+        """
+        Agrega un bloque del DataFrame que se quiere llevar a la lista. El índice debe ser la PK (ver `crear_pk`).
+
+        Raises:
+            ValueError: Si las columnas no son las mismas de los bloques anteriores.
+        """
+
+        self._agregar(SOURCE, df)
+
+    @check_type_args
+    def add_source_file(self, path: str, pk: List[str], chunksize: int = 0) -> None:
+        """
+        Agrega por bloques un archivo CSV o Parquet como DataFrame a llevar a la lista, sin cargarlo completo en memoria (ver `leer_por_bloques`). La PK de cada bloque se arma con `quitar_decimales_pk` y `crear_pk`.
+
+        Args:
+            path (str): Ruta del archivo (.csv o .parquet).
+            pk (List[str]): Columnas que componen la PK.
+            chunksize (int, optional): Filas por bloque leído. Por defecto run_rows.
+
+        Raises:
+            ValueError: Si la extensión del archivo no es .csv ni .parquet.
+
+        Ejemplo:
+            diff.add_source_file("/data/clientes.parquet", pk=["Documento"])
+        """
+
+        for chunk in leer_por_bloques(path, chunksize or self.run_rows):
+            self.add_source(crear_pk(quitar_decimales_pk(chunk, pk), pk))
+
+    def _agregar(self, side: str, df: pd.DataFrame) -> None:
+        columns = [str(col) for col in df.columns]
+        if self._columns[side] is None:
+            self._columns[side] = columns
+        elif columns != self._columns[side]:
+            raise ValueError(f"Every {side} block must have the columns {self._columns[side]}, got {columns}.")
+
+        text = normalizar_valores(df, self.column_types).astype(str)
+        buffer = self._buffers[side]
+        buffer.extend(zip(text.index.astype(str), text.itertuples(index=False, name=None)))
+        self.stats[f"{side}_rows"] += df.shape[0]
+
+        while len(buffer) >= self.run_rows:
+            self._volcar(side, buffer[:self.run_rows])
+            del buffer[:self.run_rows]
+
+    ##############################################################################
+    ### Corridas ordenadas en disco
+    ##############################################################################
+    def _volcar(self, side: str, rows: List[Tuple[str, tuple]]) -> None:
+        """Escribe las filas ordenadas por la PK en una corrida nueva del lado."""
+
+        rows = sorted(rows, key=itemgetter(0))
+        self._runs[side].append(self._escribir(side, rows))
+
+    def _escribir(self, side: str, rows: Any) -> str:
+        self._sequence += 1
+        self.stats["runs"] += 1
+        path = os.path.join(self.directory, f"{side}_{self._sequence:06d}.jsonl")
+
+        with open(path, "w", encoding="utf-8") as run_file:
+            for pk, values in rows:
+                run_file.write(json.dumps([pk, *values], ensure_ascii=False) + "\n")
+
+        return path
+
+    @staticmethod
+    def _leer(path: str) -> Iterator[Tuple[str, tuple]]:
+        with open(path, "r", encoding="utf-8") as run_file:
+            for line in run_file:
+                row = json.loads(line)
+                yield row[0], tuple(row[1:])
+
+    def _ordenadas(self, side: str) -> Iterator[Tuple[str, tuple]]:
+        """Recorre todas las filas del lado ordenadas por la PK. Si caben en una corrida no se escriben en disco."""
+
+        runs = self._runs[side]
+        buffer = self._buffers[side]
+
+        if not runs:
+            return iter(sorted(buffer, key=itemgetter(0)))
+
+        if buffer:
+            self._volcar(side, buffer)
+            buffer.clear()
+
+        # Merge in several passes so no more than MAX_FAN_IN files are open at once
+        while len(runs) > self.MAX_FAN_IN:
+            grupo = runs[:self.MAX_FAN_IN]
+            # The merged run takes the place of its group to keep the first row of a repeated PK first
+            runs[:self.MAX_FAN_IN] = [self._escribir(side, heapq.merge(*(self._leer(path) for path in grupo), key=itemgetter(0)))]
+            for path in grupo:
+                os.remove(path)
+
+        return heapq.merge(*(self._leer(path) for path in runs), key=itemgetter(0))
+
+    def _unicas(self, side: str) -> Iterator[Tuple[str, tuple]]:
+        """Recorre las filas ordenadas del lado con una sola fila por PK."""
+
+        posicion_id = self._columns[WEB].index("index_sharepoint") if side == WEB else 0
+        for pk, grupo in groupby(self._ordenadas(side), key=itemgetter(0)):
+            first = next(grupo)
+            repetidas = 0
+            for _, values in grupo:
+                repetidas += 1
+                if side == WEB:
+                    self.web_duplicates.append(values[posicion_id])
+            if repetidas:
+                self.stats["duplicates"] += repetidas + (1 if side == SOURCE else 0)
+                if side == SOURCE:
+                    continue
+            yield first
+
+    ##############################################################################
+    ### Comparación
+    ##############################################################################
+    def diff(self) -> Iterator[pd.DataFrame]:
+        """
+        Compara los dos lados en una sola pasada y devuelve el resultado por bloques de hasta run_rows filas. Cada llamada vuelve a recorrer las corridas y reinicia los conteos de acciones y duplicados.
+
+        Returns:
+            Iterator[pd.DataFrame]: Bloques con la PK como índice, las columnas comunes de ambos lados, index_sharepoint, action_type ('I', 'U' o 'D') y changed_columns (en los 'U', ver `columnas_cambiadas`).
+        """
+
+        comunes = self._comunes()
+        salida = []
+
+        for fila in self._recorrer():
+            salida.append(fila)
+            if len(salida) >= self.run_rows:
+                yield self._bloque(salida, comunes)
+                salida = []
+
+        if salida:
+            yield self._bloque(salida, comunes)
+
+    def count(self) -> Dict[str, int]:
+        """
+        Hace la comparación de `diff` sin armar los bloques, solo para contar las acciones. Deja los conteos en stats y los ids de los items repetidos de la lista en web_duplicates.
+
+        Returns:
+            Dict[str, int]: Cantidad de registros a insertar ('I'), actualizar ('U') y eliminar ('D').
+        """
+
+        for _ in self._recorrer():
+            pass
+
+        return {action: self.stats[action] for action in ("I", "U", "D")}
+
+    def _comunes(self) -> List[str]:
+        """Columnas que se comparan: las que están en los dos lados, sin index_sharepoint."""
+
+        return [col for col in (self._columns[WEB] or []) if col in (self._columns[SOURCE] or []) and col != "index_sharepoint"]
+
+    def _recorrer(self) -> Iterator[Tuple[str, tuple, str, str, str]]:
+        """Recorre los dos lados a la vez (merge-join) y entrega (PK, valores, id del item, columnas cambiadas, acción) por cada registro del resultado, contando las acciones en stats."""
+
+        for key in ("duplicates", "I", "U", "D"):
+            self.stats[key] = 0
+        self.web_duplicates = []
+
+        web_columns = self._columns[WEB] or ["index_sharepoint"]
+        source_columns = self._columns[SOURCE] or []
+        comunes = self._comunes()
+        posiciones_web = [web_columns.index(col) for col in comunes]
+        posiciones_source = [source_columns.index(col) for col in comunes]
+        posicion_id = web_columns.index("index_sharepoint")
+        sin_decimales = [not self._decimal.get(col, False) and self._entero_float.get(col, False) for col in comunes]
+
+        def valores(row: tuple, posiciones: List[int]) -> tuple:
+            return tuple(row[pos].replace(".0", "") if quitar else row[pos] for pos, quitar in zip(posiciones, sin_decimales))
+
+        web = self._unicas(WEB) if self._columns[WEB] else iter([])
+        source = self._unicas(SOURCE)
+        fila_web = next(web, None)
+        fila_source = next(source, None)
+
+        while fila_web is not None or fila_source is not None:
+            fila = None
+            if fila_source is None or (fila_web is not None and fila_web[0] < fila_source[0]):
+                if self.delete:
+                    fila = (fila_web[0], valores(fila_web[1], posiciones_web), fila_web[1][posicion_id], "", "D")
+                fila_web = next(web, None)
+            elif fila_web is None or fila_source[0] < fila_web[0]:
+                if self.insert:
+                    fila = (fila_source[0], valores(fila_source[1], posiciones_source), "", "", "I")
+                fila_source = next(source, None)
+            else:
+                nuevos = valores(fila_source[1], posiciones_source)
+                actuales = valores(fila_web[1], posiciones_web)
+                if nuevos != actuales:
+                    cambiadas = [col for col, nuevo, actual in zip(comunes, nuevos, actuales) if nuevo != actual]
+                    fila = (fila_source[0], nuevos, fila_web[1][posicion_id], json.dumps(cambiadas, ensure_ascii=False), "U")
+                fila_web = next(web, None)
+                fila_source = next(source, None)
+
+            if fila is not None:
+                self.stats[fila[4]] += 1
+                yield fila
+
+        if self.stats["duplicates"]:
+            logger.warning("%s rows with a repeated PK were skipped in the sorted merge comparison", self.stats["duplicates"])
+        logger.info("Resultado de la comparación en disco (%s corridas): %s a insertar, %s a actualizar, %s a eliminar",
+                    self.stats["runs"], self.stats["I"], self.stats["U"], self.stats["D"])
+
+    def _bloque(self, salida: List[tuple], comunes: List[str]) -> pd.DataFrame:
+        return pd.DataFrame(
+            [(*values, item_id, action, cambiadas) for _, values, item_id, cambiadas, action in salida],
+            columns=comunes + ["index_sharepoint", "action_type", "changed_columns"],
+            index=pd.Index([pk for pk, *_ in salida], name="PK")
+        )
+
+    def compare(self) -> pd.DataFrame:
+        """
+        Hace la comparación de `diff` y junta todos los bloques en un solo DataFrame. Solo el resultado queda en memoria, no los dos lados completos; para que tampoco quede el resultado se recorre `diff`.
+
+        Returns:
+            pd.DataFrame: Registros a insertar ('I'), actualizar ('U') y eliminar ('D'), ordenados por la PK.
+        """
+
+        bloques = list(self.diff())
+        if bloques:
+            return pd.concat(bloques)
+
+        return pd.DataFrame(columns=self._comunes() + ["index_sharepoint", "action_type", "changed_columns"], index=pd.Index([], name="PK"))
+
+    def close(self) -> None:
+        """Borra las corridas escritas en disco, y la carpeta si es temporal."""
+
+        for side in (WEB, SOURCE):
+            for path in self._runs[side]:
+                if os.path.isfile(path):
+                    os.remove(path)
+            self._runs[side] = []
+            self._buffers[side] = []
+
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)